@@ -1,23 +1,317 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Query, UploadFile
-from fastapi.responses import Response
+import asyncio
+import uuid
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from typing import Any
 
-from ...services.audio_encode import encode_wav_to_mp3
+import anyio
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from ...schemas.export import (
+    ExportJobFile,
+    ExportJobRequest,
+    ExportJobStatus,
+    ExportStemsRequest,
+    MixRenderRequest,
+    VideoMuxRequest,
+)
+from ...services.audio_encode import mp3_command, open_encoder, pcm_input_args
+from ...services.export_jobs import ExportJob, ExportQueueFull, encoder_pool, export_jobs, parse_output_specs
+from ...services.mix_engine import pcm_stream, wav_stream
+from ...services.stem_cache import plan_stem_mix
 
 
 router = APIRouter()
 
+_UPLOAD_CHUNK = 256 * 1024
+
+
+class _PipedResponse(StreamingResponse):
+    def __init__(self, content: AsyncIterator[bytes], *, body_done: asyncio.Event | None = None, **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self.body_done = body_done
+
+    async def listen_for_disconnect(self, receive: Receive) -> None:
+        if self.body_done is not None:
+            await self.body_done.wait()
+        await super().listen_for_disconnect(receive)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+class _JobFileResponse(FileResponse):
+    def __init__(self, path: str, *, on_close: Callable[[], None], **kwargs: Any) -> None:
+        super().__init__(path, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+async def _upload_chunks(request: Request, done: asyncio.Event | None = None) -> AsyncIterator[bytes]:
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise ValueError("Envie o arquivo WAV no campo 'file'.")
+            while chunk := await upload.read(_UPLOAD_CHUNK):
+                yield chunk
+            return
+        async for chunk in request.stream():
+            yield chunk
+    finally:
+        if done is not None:
+            done.set()
+
+
+async def _pooled_encoder(cmd: list[str], chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    ticket = uuid.uuid4().hex
+    await encoder_pool.acquire(ticket)
+    return await open_encoder(cmd, chunks, on_exit=lambda: encoder_pool.release(ticket))
+
+
+def _token(fs_token: str | None, x_freesound_token: str | None) -> str | None:
+    return (x_freesound_token or "").strip() or (fs_token or "").strip() or None
+
+
+def _export_job_status(job: ExportJob) -> ExportJobStatus:
+    return ExportJobStatus(
+        job_id=job.job_id,
+        kind=job.kind,
+        status=job.status,
+        position=export_jobs.position(job),
+        progress=job.progress,
+        files=[
+            ExportJobFile(
+                name=o.name,
+                fmt=o.fmt,
+                bitrate_kbps=o.bitrate_kbps,
+                media_type=o.media_type,
+                size_bytes=o.size_bytes,
+                url=f"/api/export/jobs/{job.job_id}/files/{o.name}" if job.status == "done" else None,
+            )
+            for o in job.outputs
+        ],
+        error=job.error,
+        elapsed_s=job.elapsed_s,
+    )
+
+
+def _get_export_job(job_id: str) -> ExportJob:
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada.")
+    return job
+
 
 @router.post("/mp3")
 async def export_mp3(
-    file: UploadFile,
+    request: Request,
     bitrate_kbps: int = Query(192, ge=32, le=320),
-) -> Response:
+) -> StreamingResponse:
+    body_done = asyncio.Event()
+    try:
+        mp3 = await _pooled_encoder(mp3_command(bitrate_kbps), _upload_chunks(request, body_done))
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except Exception as e:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _PipedResponse(mp3, media_type="audio/mpeg", body_done=body_done)
+
+
+@router.post("/render")
+async def export_render(
+    req: MixRenderRequest,
+    fs_token: str | None = Query(default=None),
+    x_freesound_token: str | None = Header(default=None),
+) -> StreamingResponse:
+    try:
+        plan = await plan_stem_mix(
+            req.project,
+            sample_rate=req.sample_rate,
+            channels=req.channels,
+            track_id=req.track_id,
+            token=_token(fs_token, x_freesound_token),
+        )
+        scale = 1.0
+        if req.normalize:
+            peak = await run_in_threadpool(plan.peak)
+            scale = min(1.0, 0.99 / peak) if peak > 0 else 1.0
+        headers = {"X-Render-Duration-S": f"{plan.duration_s:.3f}", "X-Render-Scale": f"{scale:.6f}"}
+        if req.fmt == "wav":
+            return StreamingResponse(iterate_in_threadpool(wav_stream(plan, scale)), media_type="audio/wav", headers=headers)
+        mp3 = await _pooled_encoder(
+            mp3_command(req.bitrate_kbps, pcm_input_args(plan.sample_rate, plan.channels)),
+            iterate_in_threadpool(pcm_stream(plan, scale)),
+        )
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except Exception as e:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _PipedResponse(mp3, media_type="audio/mpeg", headers=headers)
+
+
+@router.post("/jobs", response_model=ExportJobStatus, status_code=202)
+async def submit_export_job(
+    req: ExportJobRequest,
+    fs_token: str | None = Query(default=None),
+    x_freesound_token: str | None = Header(default=None),
+) -> ExportJobStatus:
+    try:
+        job = export_jobs.submit_render(
+            req.project,
+            [o.model_dump() for o in req.outputs],
+            sample_rate=req.sample_rate,
+            channels=req.channels,
+            normalize=req.normalize,
+            track_id=req.track_id,
+            token=_token(fs_token, x_freesound_token),
+        )
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _export_job_status(job)
+
+
+@router.post("/stems", response_model=ExportJobStatus, status_code=202)
+async def submit_export_stems(
+    req: ExportStemsRequest,
+    fs_token: str | None = Query(default=None),
+    x_freesound_token: str | None = Header(default=None),
+) -> ExportJobStatus:
     try:
-        wav_bytes = await file.read()
-        mp3 = encode_wav_to_mp3(wav_bytes, bitrate_kbps=bitrate_kbps)
-        return Response(content=mp3, media_type="audio/mpeg")
+        job = export_jobs.submit_stems(
+            req.project,
+            [o.model_dump() for o in req.outputs],
+            track_ids=req.track_ids,
+            sample_rate=req.sample_rate,
+            channels=req.channels,
+            normalize=req.normalize,
+            token=_token(fs_token, x_freesound_token),
+        )
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _export_job_status(job)
+
+
+@router.post("/jobs/upload", response_model=ExportJobStatus, status_code=202)
+async def submit_export_upload(
+    request: Request,
+    outputs: str = Query(..., min_length=1),
+) -> ExportJobStatus:
+    try:
+        job = await export_jobs.submit_upload(_upload_chunks(request), parse_output_specs(outputs))
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
     except Exception as e:  # noqa: BLE001
         raise HTTPException(status_code=400, detail=str(e)) from e
+    return _export_job_status(job)
+
+
+@router.post("/video", response_model=ExportJobStatus, status_code=202)
+async def submit_video_mux(
+    req: VideoMuxRequest,
+    fs_token: str | None = Query(default=None),
+    x_freesound_token: str | None = Header(default=None),
+) -> ExportJobStatus:
+    try:
+        job = await export_jobs.submit_mux(
+            req.video_id,
+            {
+                "container": req.container,
+                "bitrate_kbps": req.audio_bitrate_kbps,
+                "original_audio": req.original_audio,
+                "original_gain_db": req.original_gain_db,
+            },
+            project=req.project,
+            render={
+                "sample_rate": req.sample_rate,
+                "channels": req.channels,
+                "normalize": req.normalize,
+                "track_id": req.track_id,
+                "token": _token(fs_token, x_freesound_token),
+            },
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _export_job_status(job)
+
+
+@router.post("/video/upload", response_model=ExportJobStatus, status_code=202)
+async def submit_video_mux_upload(
+    request: Request,
+    video_id: str = Query(..., min_length=1),
+    container: str = Query("mp4"),
+    audio_bitrate_kbps: int = Query(192, ge=32, le=320),
+    original_audio: str = Query("none"),
+    original_gain_db: float = Query(-12.0, ge=-60.0, le=12.0),
+) -> ExportJobStatus:
+    try:
+        job = await export_jobs.submit_mux(
+            video_id,
+            {
+                "container": container,
+                "bitrate_kbps": audio_bitrate_kbps,
+                "original_audio": original_audio,
+                "original_gain_db": original_gain_db,
+            },
+            chunks=_upload_chunks(request),
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ExportQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except Exception as e:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _export_job_status(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJobStatus)
+async def export_job_status(job_id: str) -> ExportJobStatus:
+    return _export_job_status(_get_export_job(job_id))
+
+
+@router.delete("/jobs/{job_id}", response_model=ExportJobStatus)
+async def cancel_export_job(job_id: str) -> ExportJobStatus:
+    _get_export_job(job_id)
+    return _export_job_status(export_jobs.cancel(job_id))
+
+
+@router.get("/jobs/{job_id}/files/{name}")
+async def export_job_file(job_id: str, name: str) -> FileResponse:
+    job = _get_export_job(job_id)
+    output = job.output(name)
+    if output is None or job.status != "done":
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado.")
+    export_jobs.acquire_reader(job.job_id)
+    return _JobFileResponse(
+        output.path,
+        media_type=output.media_type,
+        filename=output.name,
+        on_close=lambda: export_jobs.release_reader(job.job_id),
+    )
+
 
+@router.get("/stats")
+async def export_stats() -> dict:
+    return export_jobs.stats()
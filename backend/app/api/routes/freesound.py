@@ -1,17 +1,89 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Header, HTTPException, Query
-from fastapi.responses import Response
+from email.utils import formatdate
 
-from ...schemas.freesound import FreesoundSearchResponse
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from ...core.config import settings
+from ...schemas.freesound import (
+    FreesoundSearchResponse,
+    PreviewPrefetchRequest,
+    PreviewPrefetchStatus,
+)
 from ...services.freesound_client import FreesoundClient
+from ...services.freesound_scheduler import scheduler
+from ...services.preview_cache import CachedPreview, preview_cache
+from ...services.preview_prefetch import PrefetchJob, preview_prefetcher
 from ...services.query_ai_mapper import map_pt_to_freesound_ai, model_status
 from ...services.query_mapper import map_pt_to_freesound
+from ...services.search_cache import search_cache
+from ...services.sound_index import sound_index
+from ...services.waveform_peaks import peak_builder, read_peaks_level
 
 
 router = APIRouter()
 
 
+def _preview_response(request: Request, cached: CachedPreview) -> Response:
+    etag = f'"{cached.etag}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(cached.mtime, usegmt=True),
+        "Cache-Control": f"public, max-age={settings.preview_http_max_age_s}",
+        "X-Cache": "HIT",
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(cached.path, media_type=cached.media_type, headers=headers)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match") or ""
+    return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+
+async def _search_page(
+    client: FreesoundClient,
+    q: str,
+    *,
+    lang: str,
+    page_size: int,
+    page: int,
+    token: str | None,
+) -> FreesoundSearchResponse:
+    if lang.lower().startswith("pt"):
+        mapped_ai = map_pt_to_freesound_ai(q)
+        mapped = map_pt_to_freesound(q)
+        tags = list(dict.fromkeys([*(mapped_ai.tags or []), *(mapped.tags or [])]))[:8]
+        return await client.search_text(
+            query=(mapped_ai.query or mapped.query or q),
+            tags=tags or None,
+            page_size=page_size,
+            page=page,
+            token=token,
+        )
+    return await client.search_text(
+        query=q,
+        tags=None,
+        page_size=page_size,
+        page=page,
+        token=token,
+    )
+
+
+def _prefetch_status(job: PrefetchJob) -> PreviewPrefetchStatus:
+    return PreviewPrefetchStatus(
+        job_id=job.job_id,
+        total=len(job.sound_ids),
+        ready=[sid for sid in job.sound_ids if sid in job.ready],
+        pending=job.pending,
+        failed=dict(job.failed),
+        done=job.done,
+    )
+
+
 @router.get("/search", response_model=FreesoundSearchResponse)
 async def search(
     q: str = Query(..., min_length=1),
@@ -22,20 +94,10 @@ async def search(
 ) -> FreesoundSearchResponse:
     client = FreesoundClient()
     try:
-        if lang.lower().startswith("pt"):
-            mapped_ai = map_pt_to_freesound_ai(q)
-            mapped = map_pt_to_freesound(q)
-            tags = list(dict.fromkeys([*(mapped_ai.tags or []), *(mapped.tags or [])]))[:8]
-            return await client.search_text(
-                query=(mapped_ai.query or mapped.query or q),
-                tags=tags or None,
-                page_size=page_size,
-                page=page,
-                token=x_freesound_token,
-            )
-        return await client.search_text(
-            query=q,
-            tags=None,
+        return await _search_page(
+            client,
+            q,
+            lang=lang,
             page_size=page_size,
             page=page,
             token=x_freesound_token,
@@ -44,6 +106,46 @@ async def search(
         raise HTTPException(status_code=400, detail=str(e)) from e
 
 
+@router.post("/prefetch", response_model=PreviewPrefetchStatus, status_code=202)
+async def prefetch(
+    req: PreviewPrefetchRequest,
+    x_freesound_token: str | None = Header(default=None),
+) -> PreviewPrefetchStatus:
+    client = FreesoundClient()
+    sound_ids = list(req.sound_ids)
+    if req.q and req.q.strip():
+        try:
+            page = await _search_page(
+                client,
+                req.q.strip(),
+                lang=req.lang,
+                page_size=req.page_size,
+                page=req.page,
+                token=x_freesound_token,
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        sound_ids.extend(s.id for s in page.results)
+    if not sound_ids:
+        raise HTTPException(status_code=400, detail="Informe sound_ids ou q.")
+    job = preview_prefetcher.submit(
+        client,
+        sound_ids,
+        quality=req.quality,
+        fmt=req.fmt,
+        token=(x_freesound_token or "").strip() or None,
+    )
+    return _prefetch_status(job)
+
+
+@router.get("/prefetch/{job_id}", response_model=PreviewPrefetchStatus)
+async def prefetch_status(job_id: str) -> PreviewPrefetchStatus:
+    job = preview_prefetcher.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Prefetch não encontrado.")
+    return _prefetch_status(job)
+
+
 @router.get("/pt_mapper/status")
 async def pt_mapper_status() -> dict:
     return model_status()
@@ -61,23 +163,89 @@ async def pt_mapper_debug(q: str = Query(..., min_length=1)) -> dict:
     }
 
 
+@router.get("/cache/stats")
+async def cache_stats() -> dict:
+    return {
+        "previews": preview_cache.stats(),
+        "search": search_cache.stats(),
+        "sounds": sound_index.stats(),
+        "peaks": peak_builder.stats(),
+    }
+
+
+@router.get("/scheduler/stats")
+async def scheduler_stats() -> dict:
+    return scheduler.stats()
+
+
 @router.get("/sounds/{sound_id}/preview")
 async def preview(
     sound_id: int,
+    request: Request,
     quality: str = Query("lq"),
     fmt: str = Query("mp3"),
     fs_token: str | None = Query(default=None),
     x_freesound_token: str | None = Header(default=None),
 ) -> Response:
     client = FreesoundClient()
+    cached = client.cached_preview(sound_id, quality=quality, fmt=fmt)
+    if cached is not None:
+        return _preview_response(request, cached)
     try:
         resolved = (x_freesound_token or "").strip() or (fs_token or "").strip() or None
-        data, media_type = await client.fetch_preview_bytes(
+        stream = await client.open_preview_stream(
             sound_id,
             quality=quality,
             fmt=fmt,
             token=resolved,
+            range_header=request.headers.get("range"),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return StreamingResponse(
+        stream.iter_bytes(),
+        status_code=stream.status_code,
+        media_type=stream.media_type,
+        headers={
+            **stream.headers,
+            "Cache-Control": f"public, max-age={settings.preview_http_max_age_s}",
+            "X-Cache": "MISS",
+        },
+    )
+
+
+@router.get("/sounds/{sound_id}/peaks")
+async def peaks(
+    sound_id: int,
+    request: Request,
+    level: int | None = Query(default=None, ge=0),
+    quality: str = Query("lq"),
+    fmt: str = Query("mp3"),
+    fs_token: str | None = Query(default=None),
+    x_freesound_token: str | None = Header(default=None),
+) -> Response:
+    client = FreesoundClient()
+    try:
+        cached, _hit = await client.fetch_preview_file(
+            sound_id,
+            quality=quality,
+            fmt=fmt,
+            token=(x_freesound_token or "").strip() or (fs_token or "").strip() or None,
         )
-        return Response(content=data, media_type=media_type)
+        path = await peak_builder.ensure(cached)
+        info, level, data = await run_in_threadpool(read_peaks_level, path, level)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    etag = f'"{cached.etag}-p{level}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.preview_http_max_age_s}",
+        "X-Peaks-Level": str(level),
+        "X-Peaks-Levels": str(info.levels),
+        "X-Peaks-Sample-Rate": str(info.sample_rate),
+        "X-Peaks-Samples-Per-Bin": str(info.level_samples_per_bin(level)),
+        "X-Peaks-Duration": f"{info.duration_s:.6f}",
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="application/octet-stream", headers=headers)
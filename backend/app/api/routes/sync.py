@@ -1,57 +1,372 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 
 from ...core.config import settings
 from ...schemas.sync import (
     MotionAnalyzeRequest,
     MotionAnalyzeResponse,
+    MotionJobStatus,
+    ResumableUploadFinalize,
+    ResumableUploadInit,
+    ResumableUploadStatus,
+    VideoProxyStatus,
     VideoUploadResponse,
 )
-from ...services.video_motion import analyze_motion_events
-from ...storage.temp_files import TempFileStore
+from ...services.motion_jobs import MotionJob, MotionQueueFull, motion_jobs
+from ...services.video_frames import video_frames
+from ...services.video_proxy import VideoProxy, video_proxies
+from ...storage.temp_files import ResumableUpload, StoredFile, UploadFinalizing, video_store
 
 
 router = APIRouter()
-_store = TempFileStore(settings.temp_dir)
+
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+_STREAM_TICK_S = 0.5
 
 
 @router.post("/video/upload", response_model=VideoUploadResponse)
 async def upload_video(file: UploadFile) -> VideoUploadResponse:
-    content = await file.read()
-    stored = _store.put(filename=file.filename or "video.mp4", content=content)
+    writer = video_store.writer(file.filename or "video.mp4")
+    try:
+        while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+            await run_in_threadpool(writer.write, chunk)
+        stored, deduplicated = await run_in_threadpool(writer.commit)
+    except BaseException:
+        writer.abort()
+        raise
+    return _upload_response(stored, deduplicated)
+
+
+def _upload_response(stored: StoredFile, deduplicated: bool) -> VideoUploadResponse:
+    proxy = video_proxies.schedule(stored)
     return VideoUploadResponse(
         video_id=stored.file_id,
         filename=stored.filename,
         size_bytes=stored.size_bytes,
+        sha256=stored.sha256,
+        deduplicated=deduplicated,
+        proxy=proxy.status,
     )
 
 
-@router.post("/motion", response_model=MotionAnalyzeResponse)
-async def motion(req: MotionAnalyzeRequest) -> MotionAnalyzeResponse:
-    stored = _store.get(req.video_id)
+def _get_video(video_id: str) -> StoredFile:
+    stored = video_store.get(video_id)
     if not stored:
         raise HTTPException(status_code=404, detail="Vídeo não encontrado. Reimporte.")
+    return stored
+
+
+def _proxy_status(proxy: VideoProxy) -> VideoProxyStatus:
+    return VideoProxyStatus(
+        video_id=proxy.video_id,
+        status=proxy.status,
+        width=proxy.width,
+        height=proxy.height,
+        elapsed_s=proxy.elapsed_s,
+        error=proxy.error,
+    )
+
+
+@router.get("/video/{video_id}/proxy", response_model=VideoProxyStatus)
+async def video_proxy_status(video_id: str) -> VideoProxyStatus:
+    stored = _get_video(video_id)
+    proxy = video_proxies.get(video_id) or video_proxies.schedule(stored)
+    return _proxy_status(proxy)
+
+
+def _image_headers() -> dict[str, str]:
+    return {"Cache-Control": f"private, max-age={settings.frame_http_max_age_s}"}
+
+
+@router.get("/video/{video_id}/frame")
+async def video_frame(
+    video_id: str,
+    t: float = Query(ge=0.0, default=0.0),
+    height: int = Query(ge=16, le=1080, default=180),
+) -> FileResponse:
+    with video_store.lease(video_id) as stored:
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Vídeo não encontrado. Reimporte.")
+        try:
+            path = await run_in_threadpool(video_frames.frame, stored, t, height)
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+    return FileResponse(path, media_type="image/jpeg", headers=_image_headers())
+
+
+@router.get("/video/{video_id}/filmstrip")
+async def video_filmstrip(
+    video_id: str,
+    start_s: float = Query(ge=0.0, default=0.0),
+    duration_s: float | None = Query(ge=0.0, default=None),
+    count: int = Query(ge=1, le=200, default=20),
+    height: int = Query(ge=16, le=360, default=72),
+) -> FileResponse:
+    with video_store.lease(video_id) as stored:
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Vídeo não encontrado. Reimporte.")
+        try:
+            path, times = await run_in_threadpool(video_frames.filmstrip, stored, start_s, duration_s, count, height)
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+    headers = _image_headers()
+    headers["X-Filmstrip-Count"] = str(len(times))
+    headers["X-Filmstrip-Times"] = ",".join(f"{t:.3f}" for t in times)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+def _upload_status(upload: ResumableUpload) -> ResumableUploadStatus:
+    return ResumableUploadStatus(
+        upload_id=upload.upload_id,
+        filename=upload.filename,
+        size_bytes=upload.size_bytes,
+        chunk_size=upload.chunk_size,
+        total_chunks=upload.total_chunks,
+        received_chunks=sorted(upload.received),
+        received_bytes=upload.received_bytes,
+        complete=len(upload.received) == upload.total_chunks,
+    )
+
+
+def _get_upload(upload_id: str) -> ResumableUpload:
+    upload = video_store.get_upload(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload não encontrado. Reinicie o envio.")
+    return upload
 
+
+@router.post("/video/uploads", response_model=ResumableUploadStatus)
+async def begin_upload(req: ResumableUploadInit) -> ResumableUploadStatus:
     try:
-        events = analyze_motion_events(
-            video_path=stored.path,
-            start_s=req.start_s,
-            duration_s=req.duration_s,
-            max_events=req.max_events,
-            frame_analysis=req.frame_analysis,
-            model=req.model,
-            smooth_win=req.smooth_win,
-            blur_ksize=req.blur_ksize,
-            roi_x=req.roi_x,
-            roi_y=req.roi_y,
-            roi_w=req.roi_w,
-            roi_h=req.roi_h,
+        upload = await run_in_threadpool(
+            video_store.begin_upload,
+            req.filename,
+            req.size_bytes,
+            req.chunk_size or settings.upload_chunk_size,
         )
-    except Exception as e:  # noqa: BLE001
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _upload_status(upload)
+
+
+@router.get("/video/uploads/{upload_id}", response_model=ResumableUploadStatus)
+async def upload_status(upload_id: str) -> ResumableUploadStatus:
+    return _upload_status(_get_upload(upload_id))
+
+
+@router.put("/video/uploads/{upload_id}/chunks/{index}", response_model=ResumableUploadStatus)
+async def upload_chunk(upload_id: str, index: int, request: Request) -> ResumableUploadStatus:
+    _get_upload(upload_id)
+    try:
+        writer = await run_in_threadpool(video_store.chunk_writer, upload_id, index)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Upload não encontrado. Reinicie o envio.") from e
+    except UploadFinalizing as e:
+        raise HTTPException(status_code=409, detail="Upload já está sendo finalizado.") from e
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    try:
+        async for data in request.stream():
+            if data:
+                await run_in_threadpool(writer.write, data)
+        upload = await run_in_threadpool(writer.commit)
+    except ValueError as e:
+        writer.abort()
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except BaseException:
+        writer.abort()
+        raise
+    return _upload_status(upload)
+
+
+@router.post("/video/uploads/{upload_id}/finalize", response_model=VideoUploadResponse)
+async def finalize_upload(upload_id: str, req: ResumableUploadFinalize) -> VideoUploadResponse:
+    _get_upload(upload_id)
+    try:
+        stored, deduplicated = await run_in_threadpool(video_store.finalize_upload, upload_id, req.sha256)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Upload não encontrado. Reinicie o envio.") from e
+    except UploadFinalizing as e:
+        raise HTTPException(status_code=409, detail="Upload já está sendo finalizado.") from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return _upload_response(stored, deduplicated)
+
+
+@router.delete("/video/uploads/{upload_id}")
+async def abort_upload(upload_id: str) -> dict:
+    try:
+        aborted = video_store.abort_upload(upload_id)
+    except UploadFinalizing as e:
+        raise HTTPException(status_code=409, detail="Upload já está sendo finalizado.") from e
+    if not aborted:
+        raise HTTPException(status_code=404, detail="Upload não encontrado.")
+    return {"ok": True}
+
 
+@router.get("/store/stats")
+async def store_stats() -> dict:
+    return {**video_store.stats(), "proxy": video_proxies.stats()}
+
+
+def _motion_params(req: MotionAnalyzeRequest) -> dict:
+    return {
+        "start_s": req.start_s,
+        "duration_s": req.duration_s,
+        "max_events": req.max_events,
+        "frame_analysis": req.frame_analysis,
+        "model": req.model,
+        "scorer": req.scorer,
+        "source": req.source,
+        "audio_weight": req.audio_weight,
+        "smooth_win": req.smooth_win,
+        "blur_ksize": req.blur_ksize,
+        "roi_x": req.roi_x,
+        "roi_y": req.roi_y,
+        "roi_w": req.roi_w,
+        "roi_h": req.roi_h,
+        "rois": [roi.model_dump() for roi in req.rois] if req.rois else None,
+    }
+
+
+def _submit_motion(req: MotionAnalyzeRequest, *, stream: bool = False) -> MotionJob:
+    try:
+        return motion_jobs.submit(req.video_id, _motion_params(req), stream=stream)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except MotionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def _get_motion_job(job_id: str) -> MotionJob:
+    job = motion_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Análise não encontrada.")
+    return job
+
+
+def _motion_job_status(job: MotionJob) -> MotionJobStatus:
+    return MotionJobStatus(
+        job_id=job.job_id,
+        video_id=job.video_id,
+        status=job.status,
+        frames_done=job.frames_done,
+        frames_total=job.frames_total,
+        progress=(job.frames_done / job.frames_total) if job.frames_total else (1.0 if job.status == "done" else 0.0),
+        scorer=job.params.get("scorer"),
+        elapsed_s=job.elapsed_s,
+        cached=job.cache_hit,
+        proxy=job.proxy,
+        error=job.error,
+    )
+
+
+def _event_dicts(events: list | None) -> list[dict]:
+    return [{"t_s": ev.t_s, "score": ev.score} for ev in events or []]
+
+
+def _events_by_roi(events: dict | None) -> dict[str, list[dict]] | None:
+    if events is None:
+        return None
+    return {name: _event_dicts(evs) for name, evs in events.items()}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _motion_result(job: MotionJob) -> MotionAnalyzeResponse:
+    if job.status == "failed":
+        raise HTTPException(status_code=400, detail=job.error or "Falha na análise de movimento.")
+    if job.status == "cancelled":
+        raise HTTPException(status_code=409, detail="Análise cancelada.")
+    if not job.done:
+        raise HTTPException(status_code=409, detail="Análise ainda em andamento.")
     return MotionAnalyzeResponse(
-        events=[{"t_s": ev.t_s, "score": ev.score} for ev in events],
+        events=_event_dicts(job.events),
+        events_by_roi=_events_by_roi(job.events_by_roi),
+        scorer=job.params.get("scorer"),
+        frames=job.frames_total,
+        elapsed_s=job.elapsed_s,
+    )
+
+
+@router.post("/motion/jobs", response_model=MotionJobStatus, status_code=202)
+async def submit_motion_job(req: MotionAnalyzeRequest) -> MotionJobStatus:
+    return _motion_job_status(_submit_motion(req))
+
+
+@router.get("/motion/jobs/{job_id}", response_model=MotionJobStatus)
+async def motion_job_status(job_id: str) -> MotionJobStatus:
+    return _motion_job_status(_get_motion_job(job_id))
+
+
+@router.delete("/motion/jobs/{job_id}", response_model=MotionJobStatus)
+async def cancel_motion_job(job_id: str) -> MotionJobStatus:
+    _get_motion_job(job_id)
+    return _motion_job_status(motion_jobs.cancel(job_id))
+
+
+@router.get("/motion/jobs/{job_id}/result", response_model=MotionAnalyzeResponse)
+async def motion_job_result(job_id: str) -> MotionAnalyzeResponse:
+    return _motion_result(_get_motion_job(job_id))
+
+
+@router.get("/motion/stats")
+async def motion_stats() -> dict:
+    return motion_jobs.stats()
+
+
+@router.post("/motion", response_model=MotionAnalyzeResponse)
+async def motion(req: MotionAnalyzeRequest) -> MotionAnalyzeResponse:
+    job = _submit_motion(req)
+    try:
+        await motion_jobs.wait(job)
+    except asyncio.CancelledError:
+        motion_jobs.cancel(job.job_id)
+        raise
+    return _motion_result(job)
+
+
+@router.post("/motion/stream")
+async def motion_stream(req: MotionAnalyzeRequest) -> StreamingResponse:
+    job = _submit_motion(req, stream=True)
+
+    async def events() -> AsyncIterator[str]:
+        sent_segments = 0
+        try:
+            yield _sse("progress", _motion_job_status(job).model_dump())
+            while not job.done:
+                await motion_jobs.wait_update(job, _STREAM_TICK_S)
+                if job.provisional is not None and job.segments_done > sent_segments:
+                    sent_segments = job.segments_done
+                    yield _sse("events", {
+                        "provisional": True,
+                        "until_s": job.provisional_until_s,
+                        "events": _event_dicts(job.provisional),
+                        "events_by_roi": _events_by_roi(job.provisional_by_roi),
+                    })
+                yield _sse("progress", _motion_job_status(job).model_dump())
+            try:
+                yield _sse("result", _motion_result(job).model_dump())
+            except HTTPException as e:
+                yield _sse("error", {"status": e.status_code, "detail": e.detail})
+        finally:
+            if not job.done:
+                motion_jobs.cancel(job.job_id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
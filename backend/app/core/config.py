@@ -16,6 +16,48 @@ class Settings:
     port: int = int(os.getenv("PORT", "8000"))
     freesound_token: str | None = os.getenv("FREESOUND_TOKEN")
     temp_dir: str = os.getenv("TEMP_DIR", ".temp")
+    temp_max_age_s: float = float(os.getenv("TEMP_MAX_AGE_S", str(6 * 60 * 60)))
+    temp_max_mb: int = int(os.getenv("TEMP_MAX_MB", "20480"))
+    temp_evict_interval_s: float = float(os.getenv("TEMP_EVICT_INTERVAL_S", "60"))
+    upload_chunk_size: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+    upload_max_mb: int = int(os.getenv("UPLOAD_MAX_MB", "4096"))
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+    http_max_keepalive: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "16"))
+    http_keepalive_expiry_s: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30"))
+    freesound_rate_per_min: float = float(os.getenv("FREESOUND_RATE_PER_MIN", "60"))
+    freesound_burst: int = int(os.getenv("FREESOUND_BURST", "10"))
+    freesound_max_retries: int = int(os.getenv("FREESOUND_MAX_RETRIES", "3"))
+    search_cache_ttl_s: float = float(os.getenv("SEARCH_CACHE_TTL_S", "300"))
+    search_cache_max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512"))
+    sound_index_max_entries: int = int(os.getenv("SOUND_INDEX_MAX_ENTRIES", "5000"))
+    preview_cache_dir: str = os.getenv("PREVIEW_CACHE_DIR", os.path.join(".cache", "previews"))
+    preview_cache_max_mb: int = int(os.getenv("PREVIEW_CACHE_MAX_MB", "1024"))
+    prefetch_max_concurrency: int = int(os.getenv("PREFETCH_MAX_CONCURRENCY", "4"))
+    prefetch_max_jobs: int = int(os.getenv("PREFETCH_MAX_JOBS", "256"))
+    preview_http_max_age_s: int = int(os.getenv("PREVIEW_HTTP_MAX_AGE_S", str(7 * 24 * 60 * 60)))
+    peaks_max_concurrency: int = int(os.getenv("PEAKS_MAX_CONCURRENCY", "2"))
+    motion_workers: int = int(os.getenv("MOTION_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+    motion_max_pending: int = int(os.getenv("MOTION_MAX_PENDING", "8"))
+    motion_max_jobs: int = int(os.getenv("MOTION_MAX_JOBS", "128"))
+    motion_shards: int = int(os.getenv("MOTION_SHARDS", "0"))
+    motion_shard_min_s: float = float(os.getenv("MOTION_SHARD_MIN_S", "5"))
+    motion_stream_segment_s: float = float(os.getenv("MOTION_STREAM_SEGMENT_S", "10"))
+    motion_cache_dir: str = os.getenv("MOTION_CACHE_DIR", os.path.join(".cache", "motion"))
+    motion_cache_max_mb: int = int(os.getenv("MOTION_CACHE_MAX_MB", "512"))
+    proxy_enabled: bool = os.getenv("PROXY_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+    proxy_height: int = int(os.getenv("PROXY_HEIGHT", "360"))
+    proxy_gop: int = int(os.getenv("PROXY_GOP", "12"))
+    proxy_max_concurrency: int = int(os.getenv("PROXY_MAX_CONCURRENCY", "1"))
+    frame_jpeg_quality: int = int(os.getenv("FRAME_JPEG_QUALITY", "80"))
+    frame_http_max_age_s: int = int(os.getenv("FRAME_HTTP_MAX_AGE_S", str(24 * 60 * 60)))
+    mix_block_frames: int = int(os.getenv("MIX_BLOCK_FRAMES", "65536"))
+    export_max_encoders: int = int(os.getenv("EXPORT_MAX_ENCODERS", "2"))
+    export_max_pending: int = int(os.getenv("EXPORT_MAX_PENDING", "16"))
+    export_max_jobs: int = int(os.getenv("EXPORT_MAX_JOBS", "64"))
+    export_result_ttl_s: float = float(os.getenv("EXPORT_RESULT_TTL_S", str(60 * 60)))
+    export_dir: str = os.getenv("EXPORT_DIR", os.path.join(".cache", "exports"))
+    stem_cache_dir: str = os.getenv("STEM_CACHE_DIR", os.path.join(".cache", "stems"))
+    stem_cache_max_mb: int = int(os.getenv("STEM_CACHE_MAX_MB", "2048"))
 
 
 settings = Settings()
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.responses import FileResponse, Response
@@ -9,11 +13,46 @@ from fastapi.staticfiles import StaticFiles
 from .api.router import api_router
 from .core.config import settings
 from .core.logging import configure_logging
+from .services.export_jobs import export_jobs
+from .services.motion_jobs import motion_jobs
+from .services.preview_prefetch import preview_prefetcher
+from .services.stem_cache import stem_cache
+from .services.video_proxy import video_proxies
+from .services.waveform_peaks import peak_builder
+from .storage.temp_files import video_store
+from .utils.http import close_shared_client, get_shared_client
 
 
 configure_logging()
 
-app = FastAPI(title=settings.app_name)
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    get_shared_client()
+    motion_jobs.start()
+    eviction = asyncio.create_task(
+        video_store.run_eviction(
+            interval_s=settings.temp_evict_interval_s,
+            max_age_s=settings.temp_max_age_s,
+            max_bytes=settings.temp_max_mb * 1024 * 1024,
+        )
+    )
+    try:
+        yield
+    finally:
+        eviction.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await eviction
+        await motion_jobs.shutdown()
+        await export_jobs.aclose()
+        await stem_cache.aclose()
+        await video_proxies.aclose()
+        await preview_prefetcher.aclose()
+        await peak_builder.aclose()
+        await close_shared_client()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 app.include_router(api_router, prefix="/api")
 
 _STATIC_DIR = os.path.abspath(
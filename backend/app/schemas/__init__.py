@@ -1 +1 @@
-__all__ = ["freesound", "sync"]
+__all__ = ["export", "freesound", "sync"]
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class AutomationPoint(BaseModel):
+    t: float = 0.0
+    v: float = 0.0
+
+
+class TimeWarpSegment(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    start_s: float = Field(default=0.0, alias="startS")
+    duration_s: float = Field(default=0.0, alias="durationS")
+    source_offset_s: float = Field(default=0.0, alias="sourceOffsetS")
+
+
+class ClipSource(BaseModel):
+    type: str | None = None
+    id: int | None = None
+
+
+class TimelineClip(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str
+    track_id: str = Field(alias="trackId")
+    name: str | None = None
+    start_s: float = Field(default=0.0, alias="startS")
+    duration_s: float = Field(default=0.0, alias="durationS")
+    source_offset_s: float = Field(default=0.0, alias="sourceOffsetS")
+    preview_url: str | None = Field(default=None, alias="previewUrl")
+    source: ClipSource | None = None
+    time_warp_segments: list[TimeWarpSegment] | None = Field(default=None, alias="timeWarpSegments")
+    fade_in_s: float = Field(default=0.0, alias="fadeInS")
+    fade_out_s: float = Field(default=0.0, alias="fadeOutS")
+    gain_automation: list[AutomationPoint] = Field(default_factory=list, alias="gainAutomation")
+    pan_automation: list[AutomationPoint] = Field(default_factory=list, alias="panAutomation")
+
+
+class TimelineTrack(BaseModel):
+    id: str
+    name: str | None = None
+    gain: float = 1.0
+    pan: float = 0.0
+
+
+class TimelineMix(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    transition_s: float = Field(default=0.0, alias="transitionS")
+
+
+class TimelineProject(BaseModel):
+    tracks: list[TimelineTrack] = Field(default_factory=list)
+    clips: list[TimelineClip] = Field(default_factory=list, max_length=5000)
+    mix: TimelineMix = Field(default_factory=TimelineMix)
+
+
+class MixRenderRequest(BaseModel):
+    project: TimelineProject
+    track_id: str | None = None
+    fmt: Literal["wav", "mp3"] = "mp3"
+    bitrate_kbps: int = Field(ge=32, le=320, default=192)
+    sample_rate: Literal[44100, 48000] = 44100
+    channels: int = Field(ge=1, le=2, default=2)
+    normalize: bool = True
+
+
+class ExportOutputSpec(BaseModel):
+    fmt: Literal["mp3", "opus", "aac", "flac"]
+    bitrate_kbps: int | None = Field(ge=32, le=320, default=None)
+
+
+class ExportJobRequest(BaseModel):
+    project: TimelineProject
+    track_id: str | None = None
+    sample_rate: Literal[44100, 48000] = 44100
+    channels: int = Field(ge=1, le=2, default=2)
+    normalize: bool = True
+    outputs: list[ExportOutputSpec] = Field(min_length=1, max_length=8)
+
+
+class ExportStemsRequest(BaseModel):
+    project: TimelineProject
+    track_ids: list[str] | None = None
+    sample_rate: Literal[44100, 48000] = 44100
+    channels: int = Field(ge=1, le=2, default=2)
+    normalize: bool = True
+    outputs: list[ExportOutputSpec] = Field(min_length=1, max_length=8)
+
+
+class VideoMuxRequest(BaseModel):
+    video_id: str
+    project: TimelineProject
+    track_id: str | None = None
+    sample_rate: Literal[44100, 48000] = 48000
+    channels: int = Field(ge=1, le=2, default=2)
+    normalize: bool = True
+    container: Literal["mp4", "mov"] = "mp4"
+    audio_bitrate_kbps: int = Field(ge=32, le=320, default=192)
+    original_audio: Literal["none", "track", "mix"] = "none"
+    original_gain_db: float = Field(ge=-60.0, le=12.0, default=-12.0)
+
+
+class ExportJobFile(BaseModel):
+    name: str
+    fmt: str
+    bitrate_kbps: int | None = None
+    media_type: str
+    size_bytes: int = 0
+    url: str | None = None
+
+
+class ExportJobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    position: int = 0
+    progress: float = 0.0
+    files: list[ExportJobFile] = []
+    error: str | None = None
+    elapsed_s: float = 0.0
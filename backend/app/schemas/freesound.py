@@ -28,3 +28,22 @@ class FreesoundSearchResponse(BaseModel):
     next: str | None = None
     previous: str | None = None
     results: list[FreesoundSound] = []
+
+
+class PreviewPrefetchRequest(BaseModel):
+    sound_ids: list[int] = Field(default_factory=list, max_length=100)
+    q: str | None = None
+    lang: str = "pt"
+    page: int = Field(ge=1, le=100, default=1)
+    page_size: int = Field(ge=1, le=50, default=15)
+    quality: str = "lq"
+    fmt: str = "mp3"
+
+
+class PreviewPrefetchStatus(BaseModel):
+    job_id: str
+    total: int
+    ready: list[int] = []
+    pending: list[int] = []
+    failed: dict[int, str] = {}
+    done: bool
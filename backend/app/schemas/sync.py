@@ -7,6 +7,51 @@ class VideoUploadResponse(BaseModel):
     video_id: str
     filename: str
     size_bytes: int
+    sha256: str | None = None
+    deduplicated: bool = False
+    proxy: str | None = None
+
+
+class VideoProxyStatus(BaseModel):
+    video_id: str
+    status: str
+    width: int = 0
+    height: int = 0
+    elapsed_s: float = 0.0
+    error: str | None = None
+
+
+class ResumableUploadInit(BaseModel):
+    filename: str = Field(min_length=1)
+    size_bytes: int = Field(ge=1)
+    chunk_size: int | None = Field(ge=64 * 1024, le=64 * 1024 * 1024, default=None)
+
+
+class ResumableUploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    size_bytes: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: list[int]
+    received_bytes: int
+    complete: bool
+
+
+class ResumableUploadFinalize(BaseModel):
+    sha256: str | None = None
+
+
+class MotionRoi(BaseModel):
+    name: str | None = Field(max_length=64, default=None)
+    x: float = Field(ge=0.0, le=1.0, default=0.0)
+    y: float = Field(ge=0.0, le=1.0, default=0.0)
+    w: float = Field(gt=0.0, le=1.0, default=1.0)
+    h: float = Field(gt=0.0, le=1.0, default=1.0)
+    max_events: int | None = Field(ge=1, le=50, default=None)
+    diff_weight: float = Field(ge=0.0, le=1.0, default=0.5)
+    flow_weight: float = Field(ge=0.0, le=1.0, default=0.3)
+    cell_weight: float = Field(ge=0.0, le=1.0, default=0.2)
 
 
 class MotionAnalyzeRequest(BaseModel):
@@ -16,12 +61,16 @@ class MotionAnalyzeRequest(BaseModel):
     max_events: int = Field(ge=1, le=50, default=12)
     frame_analysis: bool = True
     model: str = "default"
+    scorer: str | None = None
+    source: str = "video"
+    audio_weight: float = Field(ge=0.0, le=1.0, default=0.5)
     smooth_win: int = Field(ge=1, le=99, default=5)
     blur_ksize: int = Field(ge=1, le=99, default=7)
     roi_x: float = Field(ge=0.0, le=1.0, default=0.10)
     roi_y: float = Field(ge=0.0, le=1.0, default=0.55)
     roi_w: float = Field(ge=0.0, le=1.0, default=0.80)
     roi_h: float = Field(ge=0.0, le=1.0, default=0.43)
+    rois: list[MotionRoi] | None = Field(max_length=8, default=None)
 
 
 class MotionEvent(BaseModel):
@@ -31,3 +80,21 @@ class MotionEvent(BaseModel):
 
 class MotionAnalyzeResponse(BaseModel):
     events: list[MotionEvent]
+    events_by_roi: dict[str, list[MotionEvent]] | None = None
+    scorer: str | None = None
+    frames: int = 0
+    elapsed_s: float = 0.0
+
+
+class MotionJobStatus(BaseModel):
+    job_id: str
+    video_id: str
+    status: str
+    frames_done: int
+    frames_total: int
+    progress: float
+    scorer: str | None = None
+    elapsed_s: float = 0.0
+    cached: bool = False
+    proxy: bool = False
+    error: str | None = None
@@ -1 +1,21 @@
-__all__ = ["freesound_client", "query_mapper", "video_motion"]
+__all__ = [
+    "audio_onsets",
+    "export_jobs",
+    "freesound_client",
+    "freesound_scheduler",
+    "mix_engine",
+    "motion_features",
+    "motion_jobs",
+    "motion_scorers",
+    "preview_cache",
+    "preview_prefetch",
+    "query_mapper",
+    "search_cache",
+    "sound_index",
+    "stem_cache",
+    "video_frames",
+    "video_motion",
+    "video_proxy",
+    "video_seek",
+    "waveform_peaks",
+]
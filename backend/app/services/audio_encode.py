@@ -1,40 +1,307 @@
 from __future__ import annotations
 
-import os
+import asyncio
+import concurrent.futures
+import contextlib
 import subprocess
-import tempfile
+import threading
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from dataclasses import dataclass
 
 import imageio_ffmpeg
 
 
-def encode_wav_to_mp3(wav_bytes: bytes, bitrate_kbps: int) -> bytes:
+_STREAM_BYTES = 64 * 1024
+_QUEUE_CHUNKS = 16
+_PUT_POLL_S = 0.5
+_EOF = object()
+
+
+def pcm_input_args(sample_rate: int, channels: int) -> list[str]:
+    return ["-f", "s16le", "-ar", str(int(sample_rate)), "-ac", str(int(channels))]
+
+
+def mp3_command(bitrate_kbps: int, input_args: list[str] | None = None) -> list[str]:
+    bitrate_kbps = int(bitrate_kbps)
+    if bitrate_kbps < 32 or bitrate_kbps > 320:
+        raise ValueError("bitrate_kbps inválido (32..320).")
+    return [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        *(input_args or []),
+        "-i",
+        "pipe:0",
+        "-vn",
+        "-codec:a",
+        "libmp3lame",
+        "-b:a",
+        f"{bitrate_kbps}k",
+        "-f",
+        "mp3",
+        "pipe:1",
+    ]
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    ext: str
+    media_type: str
+    muxer: str
+    codec_args: tuple[str, ...]
+    default_bitrate_kbps: int | None = None
+
+
+AUDIO_FORMATS = {
+    "mp3": AudioFormat("mp3", "audio/mpeg", "mp3", ("-c:a", "libmp3lame"), 192),
+    "opus": AudioFormat("opus", "audio/ogg", "ogg", ("-c:a", "libopus", "-ar", "48000"), 128),
+    "aac": AudioFormat("m4a", "audio/mp4", "ipod", ("-c:a", "aac", "-movflags", "+faststart"), 192),
+    "flac": AudioFormat("flac", "audio/flac", "flac", ("-c:a", "flac")),
+}
+
+
+def audio_format(fmt: str) -> AudioFormat:
+    spec = AUDIO_FORMATS.get((fmt or "").strip().lower())
+    if spec is None:
+        raise ValueError(f"Formato inválido: {fmt}. Use um de: {', '.join(AUDIO_FORMATS)}.")
+    return spec
+
+
+def output_args(fmt: str, bitrate_kbps: int | None, path: str, *, stream: str = "0:a:0", gain: float = 1.0) -> list[str]:
+    spec = audio_format(fmt)
+    args = ["-map", stream, *spec.codec_args]
+    if gain != 1.0:
+        args += ["-af", f"volume={float(gain):.6f}"]
+    if spec.default_bitrate_kbps is not None:
+        bitrate_kbps = int(bitrate_kbps or spec.default_bitrate_kbps)
+        if bitrate_kbps < 32 or bitrate_kbps > 320:
+            raise ValueError("bitrate_kbps inválido (32..320).")
+        args += ["-b:a", f"{bitrate_kbps}k"]
+    return [*args, "-f", spec.muxer, path]
+
+
+def raw_file_input_args(sample_rate: int, channels: int, path: str) -> list[str]:
+    return ["-f", "f32le", "-ar", str(int(sample_rate)), "-ac", str(int(channels)), "-i", path]
+
+
+def multi_output_command(
+    outputs: list[list[str]],
+    input_args: list[str] | None = None,
+    *,
+    pipe: bool = True,
+) -> list[str]:
+    return [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-y",
+        *(input_args or []),
+        *(["-i", "pipe:0"] if pipe else []),
+        *(arg for args in outputs for arg in args),
+    ]
+
+
+VIDEO_CONTAINERS = {"mp4": "video/mp4", "mov": "video/quicktime"}
+ORIGINAL_AUDIO_MODES = ("none", "track", "mix")
+
+
+def mux_command(
+    video_path: str,
+    out_path: str,
+    *,
+    container: str,
+    bitrate_kbps: int,
+    duration_s: float | None = None,
+    original_audio: str = "none",
+    original_gain_db: float = 0.0,
+    input_args: list[str] | None = None,
+) -> list[str]:
+    if container not in VIDEO_CONTAINERS:
+        raise ValueError(f"Contêiner inválido: {container}. Use um de: {', '.join(VIDEO_CONTAINERS)}.")
+    if original_audio not in ORIGINAL_AUDIO_MODES:
+        raise ValueError(f"Modo do áudio original inválido: {original_audio}. Use um de: {', '.join(ORIGINAL_AUDIO_MODES)}.")
     bitrate_kbps = int(bitrate_kbps)
     if bitrate_kbps < 32 or bitrate_kbps > 320:
         raise ValueError("bitrate_kbps inválido (32..320).")
+    if original_audio == "mix":
+        graph = (
+            f"[0:a:0]volume={float(original_gain_db):.2f}dB[orig];[1:a:0]apad[sfx];"
+            "[orig][sfx]amix=inputs=2:duration=first:dropout_transition=0:normalize=0,"
+            "aformat=channel_layouts=stereo[mix]"
+        )
+    else:
+        graph = "[1:a:0]apad[mix]"
+    maps = ["-map", "0:v:0", "-map", "[mix]"]
+    if original_audio == "track":
+        maps += ["-map", "0:a:0", "-disposition:a:1", "0"]
+    return [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-y",
+        "-i",
+        video_path,
+        *(input_args or []),
+        "-i",
+        "pipe:0",
+        "-filter_complex",
+        graph,
+        *maps,
+        "-c:v",
+        "copy",
+        "-c:a",
+        "aac",
+        "-b:a",
+        f"{bitrate_kbps}k",
+        "-disposition:a:0",
+        "default",
+        *(["-t", f"{duration_s:.3f}"] if duration_s else ["-shortest"]),
+        "-movflags",
+        "+faststart",
+        "-f",
+        container,
+        out_path,
+    ]
+
+
+class PipeEncoder:
+    def __init__(self, cmd: list[str]) -> None:
+        self.cmd = cmd
+        self._proc: subprocess.Popen | None = None
+        self._feeder: asyncio.Task | None = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_CHUNKS)
+        self._error: BaseException | None = None
+        self._stderr = b""
+        self._abandoned = False
+        self.exited: asyncio.Future | None = None
+
+    async def start(self, chunks: AsyncIterable[bytes]) -> None:
+        loop = asyncio.get_running_loop()
+        self.exited = loop.create_future()
+        self._proc = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        threading.Thread(target=self._drain, args=(loop,), name="encode-drain", daemon=True).start()
+        self._feeder = asyncio.ensure_future(self._feed(chunks))
+
+    async def _feed(self, chunks: AsyncIterable[bytes]) -> None:
+        proc = self._proc
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await asyncio.to_thread(proc.stdin.write, chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:  # noqa: BLE001
+            self._error = e
+            self.kill()
+        finally:
+            try:
+                await asyncio.to_thread(proc.stdin.close)
+            except OSError:
+                pass
+
+    def _put(self, loop: asyncio.AbstractEventLoop, item: object) -> None:
+        if self._abandoned:
+            return
+        try:
+            fut = asyncio.run_coroutine_threadsafe(self._queue.put(item), loop)
+        except RuntimeError:
+            self._abandoned = True
+            return
+        while True:
+            try:
+                fut.result(timeout=_PUT_POLL_S)
+                return
+            except concurrent.futures.TimeoutError:
+                if self._abandoned or loop.is_closed():
+                    fut.cancel()
+                    self._abandoned = True
+                    return
+            except concurrent.futures.CancelledError:
+                self._abandoned = True
+                return
+
+    def _drain(self, loop: asyncio.AbstractEventLoop) -> None:
+        proc = self._proc
+        try:
+            while chunk := proc.stdout.read1(_STREAM_BYTES):
+                self._put(loop, chunk)
+            self._stderr = proc.stderr.read()
+        finally:
+            proc.stdout.close()
+            proc.stderr.close()
+            proc.wait()
+            self._put(loop, _EOF)
+            try:
+                loop.call_soon_threadsafe(self._finish)
+            except RuntimeError:
+                pass
+
+    def _finish(self) -> None:
+        if not self.exited.done():
+            self.exited.set_result(self._proc.returncode)
+
+    def kill(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        finished = False
+        try:
+            while (chunk := await self._queue.get()) is not _EOF:
+                yield chunk
+            finished = True
+        finally:
+            if not finished:
+                self._abandoned = True
+                self.kill()
+                if self._feeder is not None:
+                    self._feeder.cancel()
+        if not self._feeder.done():
+            self._feeder.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._feeder
+        if self._error is not None:
+            raise self._error
+        if self._proc.returncode != 0:
+            msg = self._stderr.decode("utf-8", "replace").strip()
+            if "matches no streams" in msg:
+                raise RuntimeError("O vídeo não tem trilha de áudio.")
+            raise RuntimeError(f"Falha ao codificar o áudio: {msg[-300:] or self._proc.returncode}")
+
+
+async def open_encoder(
+    cmd: list[str],
+    chunks: AsyncIterable[bytes],
+    on_exit: Callable[[], None] | None = None,
+) -> AsyncIterator[bytes]:
+    encoder = PipeEncoder(cmd)
+    try:
+        await encoder.start(chunks)
+    except BaseException:
+        if on_exit is not None:
+            on_exit()
+        raise
+    if on_exit is not None:
+        encoder.exited.add_done_callback(lambda _f: on_exit())
+    stream = encoder.chunks()
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except BaseException:
+        await stream.aclose()
+        raise
 
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
-    with tempfile.TemporaryDirectory() as td:
-        in_path = os.path.join(td, "in.wav")
-        out_path = os.path.join(td, "out.mp3")
-        with open(in_path, "wb") as f:
-            f.write(wav_bytes)
-
-        cmd = [
-            ffmpeg,
-            "-y",
-            "-hide_banner",
-            "-loglevel",
-            "error",
-            "-i",
-            in_path,
-            "-vn",
-            "-codec:a",
-            "libmp3lame",
-            "-b:a",
-            f"{bitrate_kbps}k",
-            out_path,
-        ]
-        subprocess.run(cmd, check=True)
-        with open(out_path, "rb") as f:
-            return f.read()
+    async def output() -> AsyncIterator[bytes]:
+        try:
+            if first:
+                yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
 
+    return output()
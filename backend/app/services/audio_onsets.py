@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import subprocess
+from collections.abc import Iterator
+
+import imageio_ffmpeg
+import numpy as np
+
+from .video_motion import MotionFeatures
+
+
+_SAMPLE_RATE = 22050
+_N_FFT = 512
+_HOP = 128
+_READ_BYTES = 1024 * 1024
+
+
+def iter_pcm(
+    video_path: str,
+    start_s: float = 0.0,
+    duration_s: float | None = None,
+    sample_rate: int = _SAMPLE_RATE,
+) -> Iterator[np.ndarray]:
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-nostdin"]
+    if start_s > 0:
+        cmd += ["-ss", f"{start_s:.6f}"]
+    cmd += ["-i", video_path]
+    if duration_s is not None:
+        cmd += ["-t", f"{duration_s:.6f}"]
+    cmd += ["-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(int(sample_rate)), "-f", "f32le", "pipe:1"]
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    rest = b""
+    err = None
+    try:
+        while chunk := proc.stdout.read(_READ_BYTES):
+            chunk = rest + chunk
+            usable = len(chunk) - len(chunk) % 4
+            rest = chunk[usable:]
+            if usable:
+                yield np.frombuffer(chunk[:usable], dtype="<f4")
+        err = proc.stderr.read()
+    finally:
+        if err is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+        proc.wait()
+    if proc.returncode != 0:
+        msg = err.decode("utf-8", "replace").strip()
+        if "matches no streams" in msg or "does not contain any stream" in msg:
+            raise RuntimeError("O vídeo não tem trilha de áudio.")
+        raise RuntimeError(f"Falha ao extrair o áudio do vídeo: {msg[-300:] or proc.returncode}")
+
+
+def read_pcm(
+    video_path: str,
+    start_s: float = 0.0,
+    duration_s: float | None = None,
+    sample_rate: int = _SAMPLE_RATE,
+) -> np.ndarray:
+    blocks = list(iter_pcm(video_path, start_s, duration_s, sample_rate))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+
+class SpectralFlux:
+    def __init__(self, sample_rate: int = _SAMPLE_RATE) -> None:
+        self.sample_rate = int(sample_rate)
+        self._window = np.hanning(_N_FFT).astype(np.float32)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._prev: np.ndarray | None = None
+        self._frames = 0
+        self._flux: list[np.ndarray] = []
+
+    def push(self, pcm: np.ndarray) -> None:
+        buf = np.concatenate([self._tail, pcm]) if self._tail.size else pcm
+        if buf.shape[0] < _N_FFT:
+            self._tail = buf
+            return
+        n = (buf.shape[0] - _N_FFT) // _HOP + 1
+        frames = np.lib.stride_tricks.sliding_window_view(buf, _N_FFT)[::_HOP][:n]
+        spec = np.log1p(100.0 * np.abs(np.fft.rfft(frames * self._window, axis=1)))
+        if self._prev is not None:
+            spec = np.concatenate([self._prev, spec])
+        self._flux.append(np.maximum(np.diff(spec, axis=0), 0.0).sum(axis=1))
+        self._prev = spec[-1:]
+        self._frames += n
+        self._tail = buf[n * _HOP :].copy()
+
+    def result(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._frames < 1:
+            return np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.float64)
+        flux = np.concatenate(self._flux) if self._flux else np.zeros(0)
+        times = (np.arange(1, self._frames) * _HOP + _N_FFT / 2) / float(self.sample_rate)
+        return times.astype(np.float64), flux.astype(np.float64)
+
+
+def spectral_flux(pcm: np.ndarray, sample_rate: int = _SAMPLE_RATE) -> tuple[np.ndarray, np.ndarray]:
+    flux = SpectralFlux(sample_rate)
+    flux.push(pcm)
+    return flux.result()
+
+
+def extract_audio_features(
+    video_path: str,
+    start_s: float = 0.0,
+    duration_s: float | None = None,
+) -> MotionFeatures:
+    flux = SpectralFlux()
+    for block in iter_pcm(video_path, start_s, duration_s):
+        flux.push(block)
+    times, values = flux.result()
+    return MotionFeatures(times=times, diff=values, flow=values, cell=values)
+
+
+def align_to_frames(audio: MotionFeatures, frame_times: np.ndarray) -> np.ndarray:
+    if not audio.frames or not frame_times.size:
+        return np.zeros(frame_times.shape[0], dtype=np.float64)
+    edges = np.concatenate([[-np.inf], frame_times])
+    idx = np.searchsorted(audio.times, edges, side="right")
+    full = idx[1:] > idx[:-1]
+    out = np.interp(frame_times, audio.times, audio.diff)
+    if np.any(full):
+        out[full] = np.maximum.reduceat(audio.diff[: idx[-1]], idx[:-1][full])
+    return out
@@ -0,0 +1,563 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import cv2
+
+from ..core.config import settings
+from ..schemas.export import TimelineProject
+from ..storage.temp_files import video_store
+from .audio_encode import (
+    VIDEO_CONTAINERS,
+    PipeEncoder,
+    audio_format,
+    multi_output_command,
+    mux_command,
+    output_args,
+    pcm_input_args,
+    raw_file_input_args,
+)
+from .mix_engine import MixPlan, StemMix, timeline_duration_s, to_pcm16
+from .stem_cache import audible_track_ids, plan_stem_mix, stem_cache
+
+
+logger = logging.getLogger(__name__)
+
+MAX_OUTPUTS = 8
+_FILE_CHUNK = 256 * 1024
+_SOURCE_NAME = "source.bin"
+_SAFE_NAME = re.compile(r"[^\w\-]+")
+
+Source = Callable[[], Awaitable[tuple[list[str], AsyncIterable[bytes]]]]
+
+
+class ExportQueueFull(RuntimeError):
+    pass
+
+
+class EncoderPool:
+    def __init__(self, max_encoders: int, max_pending: int) -> None:
+        self.max_encoders = max(1, int(max_encoders))
+        self.max_pending = max(0, int(max_pending))
+        self._running: set[str] = set()
+        self._waiting: OrderedDict[str, asyncio.Future] = OrderedDict()
+        self._reserved: set[str] = set()
+        self._served = 0
+        self._wait_s = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    def position(self, ticket: str) -> int:
+        for i, key in enumerate(self._waiting, 1):
+            if key == ticket:
+                return i
+        return 0
+
+    def check(self) -> None:
+        if len(self._running) + len(self._waiting) + len(self._reserved) >= self.max_encoders + self.max_pending:
+            raise ExportQueueFull("Fila de exportação cheia. Tente novamente em instantes.")
+
+    def reserve(self, ticket: str) -> None:
+        self.check()
+        self._reserved.add(ticket)
+
+    def unreserve(self, ticket: str) -> None:
+        self._reserved.discard(ticket)
+
+    async def acquire(self, ticket: str) -> None:
+        t0 = time.perf_counter()
+        reserved = ticket in self._reserved
+        self._reserved.discard(ticket)
+        if len(self._running) < self.max_encoders and not self._waiting:
+            self._running.add(ticket)
+        else:
+            if not reserved:
+                self.check()
+            fut = asyncio.get_running_loop().create_future()
+            self._waiting[ticket] = fut
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if self._waiting.pop(ticket, None) is None:
+                    self.release(ticket)
+                raise
+        self._served += 1
+        self._wait_s += time.perf_counter() - t0
+
+    def release(self, ticket: str) -> None:
+        self._running.discard(ticket)
+        while self._waiting and len(self._running) < self.max_encoders:
+            key, fut = self._waiting.popitem(last=False)
+            if fut.done():
+                continue
+            self._running.add(key)
+            fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, ticket: str) -> AsyncIterator[None]:
+        await self.acquire(ticket)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        return {
+            "max_encoders": self.max_encoders,
+            "max_pending": self.max_pending,
+            "running": len(self._running),
+            "waiting": len(self._waiting),
+            "reserved": len(self._reserved),
+            "served": self._served,
+            "avg_wait_s": (self._wait_s / self._served) if self._served else 0.0,
+        }
+
+
+@dataclass
+class ExportOutput:
+    name: str
+    fmt: str
+    bitrate_kbps: int | None
+    path: str
+    media_type: str
+    size_bytes: int = 0
+    stream: str = "0:a:0"
+
+
+@dataclass
+class ExportJob:
+    job_id: str
+    kind: str
+    outputs: list[ExportOutput]
+    created_at: float
+    status: str = "queued"
+    progress: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    elapsed_s: float = 0.0
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def output(self, name: str) -> ExportOutput | None:
+        return next((o for o in self.outputs if o.name == name), None)
+
+
+def parse_output_specs(text: str) -> list[dict[str, Any]]:
+    specs = []
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        fmt, _sep, bitrate = part.partition(":")
+        try:
+            specs.append({"fmt": fmt.strip().lower(), "bitrate_kbps": int(bitrate) if bitrate.strip() else None})
+        except ValueError as e:
+            raise ValueError(f"Saída inválida: {part}. Use formato[:kbps], ex.: mp3:320,opus:96,flac.") from e
+    return specs
+
+
+def _safe_name(text: str | None, default: str) -> str:
+    return _SAFE_NAME.sub("_", text or "").strip("_") or default
+
+
+def _video_duration_s(video_path: str) -> float:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError("Não foi possível abrir o vídeo.")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+    finally:
+        cap.release()
+    if fps <= 0 or frames <= 0:
+        raise RuntimeError("Não foi possível ler a duração do vídeo.")
+    return frames / fps
+
+
+async def _iterate_in_thread(it: Iterator[bytes]) -> AsyncIterator[bytes]:
+    end = object()
+    while (chunk := await asyncio.to_thread(next, it, end)) is not end:
+        yield chunk
+
+
+class ExportJobManager:
+    def __init__(self, root_dir: str, pool: EncoderPool, max_jobs: int, result_ttl_s: float) -> None:
+        self.root_dir = root_dir
+        self.pool = pool
+        self.max_jobs = max(1, int(max_jobs))
+        self.result_ttl_s = max(0.0, float(result_ttl_s))
+        self._jobs: OrderedDict[str, ExportJob] = OrderedDict()
+        self._readers: dict[str, int] = {}
+        os.makedirs(self.root_dir, exist_ok=True)
+        for name in os.listdir(self.root_dir):
+            shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root_dir, job_id)
+
+    def _new_job(self, kind: str, build: Callable[[str], list[ExportOutput]]) -> ExportJob:
+        self._trim()
+        job_id = uuid.uuid4().hex
+        self.pool.reserve(job_id)
+        job_dir = self._job_dir(job_id)
+        try:
+            outputs = build(job_dir)
+            os.makedirs(job_dir, exist_ok=True)
+        except BaseException:
+            self.pool.unreserve(job_id)
+            raise
+        job = ExportJob(job_id=job_id, kind=kind, outputs=outputs, created_at=time.time())
+        self._jobs[job_id] = job
+        return job
+
+    def _audio_outputs(
+        self,
+        specs: list[dict[str, Any]],
+        targets: list[tuple[str, str]] | None = None,
+    ) -> Callable[[str], list[ExportOutput]]:
+        if not specs:
+            raise ValueError("Informe pelo menos um formato de saída.")
+        if len(specs) > MAX_OUTPUTS:
+            raise ValueError(f"No máximo {MAX_OUTPUTS} saídas por exportação.")
+
+        def build(job_dir: str) -> list[ExportOutput]:
+            outputs: list[ExportOutput] = []
+            for prefix, stream in targets or [("", "0:a:0")]:
+                for spec in specs:
+                    fmt = str(spec.get("fmt") or "").strip().lower()
+                    fmt_spec = audio_format(fmt)
+                    bitrate = spec.get("bitrate_kbps") or fmt_spec.default_bitrate_kbps
+                    bitrate = int(bitrate) if fmt_spec.default_bitrate_kbps is not None else None
+                    name = f"{prefix}{fmt}_{bitrate}k.{fmt_spec.ext}" if bitrate else f"{prefix}{fmt}.{fmt_spec.ext}"
+                    if any(o.name == name for o in outputs):
+                        raise ValueError(f"Saída repetida: {name}.")
+                    output_args(fmt, bitrate, name)
+                    outputs.append(
+                        ExportOutput(name, fmt, bitrate, os.path.join(job_dir, name), fmt_spec.media_type, stream=stream)
+                    )
+            return outputs
+
+        return build
+
+    def _multi_output(self, job: ExportJob) -> Callable[[list[str]], list[str]]:
+        def command(input_args: list[str]) -> list[str]:
+            return multi_output_command(
+                [output_args(o.fmt, o.bitrate_kbps, f"{o.path}.part", stream=o.stream) for o in job.outputs],
+                input_args,
+            )
+
+        return command
+
+    def _render_source(self, job: ExportJob, project: TimelineProject, render: dict[str, Any]) -> Source:
+        async def source() -> tuple[list[str], AsyncIterable[bytes]]:
+            plan = await plan_stem_mix(
+                project,
+                sample_rate=render["sample_rate"],
+                channels=render["channels"],
+                track_id=render.get("track_id"),
+                token=render.get("token"),
+            )
+            scale = 1.0
+            if render.get("normalize", True):
+                peak = await asyncio.to_thread(plan.peak)
+                scale = min(1.0, 0.99 / peak) if peak > 0 else 1.0
+            pcm = _iterate_in_thread(self._render_pcm(job, plan, scale))
+            return pcm_input_args(plan.sample_rate, plan.channels), pcm
+
+        return source
+
+    async def _upload_source(self, job: ExportJob, chunks: AsyncIterable[bytes]) -> Source:
+        path = os.path.join(self._job_dir(job.job_id), _SOURCE_NAME)
+        with open(path, "wb") as f:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+        if not os.path.getsize(path):
+            raise ValueError("Arquivo vazio.")
+
+        async def source() -> tuple[list[str], AsyncIterable[bytes]]:
+            return [], _iterate_in_thread(self._read_source(job, path))
+
+        return source
+
+    def submit_render(self, project: TimelineProject, specs: list[dict[str, Any]], **render: Any) -> ExportJob:
+        job = self._new_job("render", self._audio_outputs(specs))
+        self._start(job, self._render_source(job, project, render), self._multi_output(job))
+        return job
+
+    async def submit_upload(self, chunks: AsyncIterable[bytes], specs: list[dict[str, Any]]) -> ExportJob:
+        job = self._new_job("upload", self._audio_outputs(specs))
+        try:
+            source = await self._upload_source(job, chunks)
+        except BaseException:
+            self._remove(job)
+            raise
+        self._start(job, source, self._multi_output(job))
+        return job
+
+    def submit_stems(
+        self,
+        project: TimelineProject,
+        specs: list[dict[str, Any]],
+        *,
+        track_ids: list[str] | None = None,
+        **render: Any,
+    ) -> ExportJob:
+        if not stem_cache.enabled:
+            raise ValueError("Cache de stems desativado (STEM_CACHE_MAX_MB=0).")
+        ids = [tid for tid in audible_track_ids(project) if track_ids is None or tid in track_ids]
+        if not ids:
+            raise ValueError("Nada para exportar (sem clips com preview).")
+        names = {t.id: t.name for t in project.tracks}
+        targets = [(f"{i + 1:02d}_{_safe_name(names.get(tid), 'faixa')}_", f"{i}:a:0") for i, tid in enumerate(ids)]
+        job = self._new_job("stems", self._audio_outputs(specs, targets))
+        sample_rate, channels = int(render["sample_rate"]), 1 if int(render["channels"]) == 1 else 2
+        gain = {"scale": 1.0}
+        pinned: list[str] = []
+
+        async def source() -> tuple[list[str], AsyncIterable[bytes]]:
+            stems = await stem_cache.stems(
+                project,
+                sample_rate=sample_rate,
+                channels=channels,
+                track_ids=ids,
+                token=render.get("token"),
+                pin=True,
+            )
+            pinned.extend(s.key for s in stems)
+            by_track = {s.track_id: s for s in stems}
+            missing = [names.get(tid) or tid for tid in ids if tid not in by_track]
+            if missing:
+                raise RuntimeError(f"Faixa sem áudio: {', '.join(missing)}.")
+            ordered = [by_track[tid] for tid in ids]
+            if render.get("normalize", True):
+                mix = StemMix(
+                    [s.pcm for s in ordered],
+                    sample_rate=sample_rate,
+                    channels=channels,
+                    duration_s=timeline_duration_s(project),
+                )
+                peak = await asyncio.to_thread(mix.peak)
+                gain["scale"] = min(1.0, 0.99 / peak) if peak > 0 else 1.0
+            job.progress = 0.5
+            input_args = [arg for s in ordered for arg in raw_file_input_args(sample_rate, channels, s.path)]
+            return input_args, _iterate_in_thread(iter(()))
+
+        def command(input_args: list[str]) -> list[str]:
+            return multi_output_command(
+                [
+                    output_args(o.fmt, o.bitrate_kbps, f"{o.path}.part", stream=o.stream, gain=gain["scale"])
+                    for o in job.outputs
+                ],
+                input_args,
+                pipe=False,
+            )
+
+        self._start(job, source, command, lambda: stem_cache.unpin(pinned))
+        return job
+
+    async def submit_mux(
+        self,
+        video_id: str,
+        mux: dict[str, Any],
+        *,
+        project: TimelineProject | None = None,
+        render: dict[str, Any] | None = None,
+        chunks: AsyncIterable[bytes] | None = None,
+    ) -> ExportJob:
+        container = mux["container"]
+        mux_command("", "", **mux)
+        stored = video_store.acquire(video_id)
+        if stored is None:
+            raise FileNotFoundError("Vídeo não encontrado. Reimporte.")
+        job = None
+        try:
+            stem = _safe_name(os.path.splitext(os.path.basename(stored.filename or ""))[0], "video")
+            job = self._new_job(
+                "mux",
+                lambda job_dir: [
+                    ExportOutput(
+                        f"{stem}.{container}",
+                        container,
+                        int(mux["bitrate_kbps"]),
+                        os.path.join(job_dir, f"{stem}.{container}"),
+                        VIDEO_CONTAINERS[container],
+                    )
+                ],
+            )
+            if project is not None:
+                source = self._render_source(job, project, render or {})
+            else:
+                source = await self._upload_source(job, chunks)
+            duration_s = await asyncio.to_thread(_video_duration_s, stored.path)
+        except BaseException:
+            if job is not None:
+                self._remove(job)
+            video_store.release(video_id)
+            raise
+
+        def command(input_args: list[str]) -> list[str]:
+            return mux_command(
+                stored.path,
+                f"{job.outputs[0].path}.part",
+                duration_s=duration_s,
+                input_args=input_args,
+                **mux,
+            )
+
+        self._start(job, source, command, lambda: video_store.release(video_id))
+        return job
+
+    def _render_pcm(self, job: ExportJob, plan: MixPlan | StemMix, scale: float) -> Iterator[bytes]:
+        done = 0
+        for block in plan.blocks():
+            yield to_pcm16(block, scale)
+            done += block.shape[0]
+            job.progress = done / max(1, plan.frames)
+
+    def _read_source(self, job: ExportJob, path: str) -> Iterator[bytes]:
+        total = max(1, os.path.getsize(path))
+        done = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(_FILE_CHUNK):
+                yield chunk
+                done += len(chunk)
+                job.progress = done / total
+
+    def _start(
+        self,
+        job: ExportJob,
+        source: Source,
+        command: Callable[[list[str]], list[str]],
+        cleanup: Callable[[], None] | None = None,
+    ) -> None:
+        job.task = asyncio.ensure_future(self._run(job, source, command, cleanup))
+        job.task.add_done_callback(lambda _t: self.pool.unreserve(job.job_id))
+
+    async def _run(
+        self,
+        job: ExportJob,
+        source: Source,
+        command: Callable[[list[str]], list[str]],
+        cleanup: Callable[[], None] | None = None,
+    ) -> None:
+        t0 = time.perf_counter()
+        try:
+            async with self.pool.slot(job.job_id):
+                job.status = "running"
+                job.started_at = time.time()
+                input_args, chunks = await source()
+                encoder = PipeEncoder(command(input_args))
+                await encoder.start(chunks)
+                stream = encoder.chunks()
+                try:
+                    async for _chunk in stream:
+                        pass
+                finally:
+                    await stream.aclose()
+            for output in job.outputs:
+                os.replace(f"{output.path}.part", output.path)
+                output.size_bytes = os.path.getsize(output.path)
+            job.progress = 1.0
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:  # noqa: BLE001
+            logger.info("Exportação %s falhou: %s", job.job_id, e)
+            job.status = "failed"
+            job.error = str(e) or e.__class__.__name__
+        finally:
+            job.finished_at = time.time()
+            job.elapsed_s = time.perf_counter() - t0
+            source_path = os.path.join(self._job_dir(job.job_id), _SOURCE_NAME)
+            for path in (source_path, *(f"{o.path}.part" for o in job.outputs)):
+                if os.path.exists(path):
+                    os.remove(path)
+            if job.status != "done":
+                shutil.rmtree(self._job_dir(job.job_id), ignore_errors=True)
+            if cleanup is not None:
+                cleanup()
+
+    def position(self, job: ExportJob) -> int:
+        if job.status != "queued":
+            return 0
+        return self.pool.position(job.job_id) or self.pool.waiting + 1
+
+    def get(self, job_id: str) -> ExportJob | None:
+        return self._jobs.get(job_id)
+
+    def acquire_reader(self, job_id: str) -> ExportJob | None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            self._readers[job_id] = self._readers.get(job_id, 0) + 1
+        return job
+
+    def release_reader(self, job_id: str) -> None:
+        n = self._readers.get(job_id, 0) - 1
+        if n > 0:
+            self._readers[job_id] = n
+        else:
+            self._readers.pop(job_id, None)
+
+    def cancel(self, job_id: str) -> ExportJob | None:
+        job = self._jobs.get(job_id)
+        if job is not None and not job.done and job.task is not None:
+            job.task.cancel()
+        return job
+
+    def _remove(self, job: ExportJob) -> None:
+        self.pool.unreserve(job.job_id)
+        self._jobs.pop(job.job_id, None)
+        shutil.rmtree(self._job_dir(job.job_id), ignore_errors=True)
+
+    def _trim(self) -> None:
+        now = time.time()
+        done = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished_at or now)
+        for job in done:
+            if self._readers.get(job.job_id):
+                continue
+            if now - (job.finished_at or now) > self.result_ttl_s or len(self._jobs) > self.max_jobs:
+                self._remove(job)
+
+    def stats(self) -> dict:
+        self._trim()
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "pool": self.pool.stats(),
+            "jobs": counts,
+            "downloads": sum(self._readers.values()),
+            "stems": stem_cache.stats(),
+        }
+
+    async def aclose(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if job.task is not None and not job.done]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+encoder_pool = EncoderPool(settings.export_max_encoders, settings.export_max_pending)
+export_jobs = ExportJobManager(
+    settings.export_dir,
+    encoder_pool,
+    max_jobs=settings.export_max_jobs,
+    result_ttl_s=settings.export_result_ttl_s,
+)
@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+from collections.abc import AsyncIterator
 
 import httpx
 
 from ..core.config import settings
 from ..schemas.freesound import FreesoundSearchResponse, FreesoundSound
-from ..utils.http import create_async_client
+from ..utils.http import get_shared_client
+from .freesound_scheduler import FreesoundScheduler, RequestPriority
+from .freesound_scheduler import scheduler as default_scheduler
+from .preview_cache import CachedPreview, PreviewCache, PreviewCacheWriter
+from .preview_cache import preview_cache as default_preview_cache
+from .search_cache import SearchCache
+from .search_cache import search_cache as default_search_cache
+from .sound_index import SoundIndex
+from .sound_index import sound_index as default_sound_index
+from .waveform_peaks import peak_builder
 
 
 logger = logging.getLogger(__name__)
 
+_STREAM_CHUNK_BYTES = 64 * 1024
+
 def _normalize_previews(d: dict | None) -> dict | None:
     if not isinstance(d, dict):
         return d
@@ -26,9 +39,77 @@ def _model_validate(cls, data):
         return fn(data)
     return cls.parse_obj(data)
 
+def _is_whole_file_range(range_header: str | None) -> bool:
+    value = (range_header or "").strip().lower().replace(" ", "")
+    return not value or value == "bytes=0-"
+
+
+class PreviewStream:
+    def __init__(
+        self,
+        response: httpx.Response,
+        media_type: str,
+        writer: PreviewCacheWriter | None,
+    ) -> None:
+        self.response = response
+        self.media_type = media_type
+        self.cached: CachedPreview | None = None
+        self._writer = writer
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def headers(self) -> dict[str, str]:
+        out = {"Accept-Ranges": "bytes"}
+        upstream = self.response.headers
+        if "content-encoding" not in upstream:
+            for name in ("content-length", "content-range"):
+                if name in upstream:
+                    out[name.title()] = upstream[name]
+        return out
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        completed = False
+        try:
+            async for chunk in self.response.aiter_bytes(_STREAM_CHUNK_BYTES):
+                if self._writer is not None:
+                    self._writer.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            await self.response.aclose()
+            if self._writer is not None:
+                if completed and self._received_all(self._writer.size_bytes):
+                    self.cached = self._writer.commit()
+                    peak_builder.schedule(self.cached)
+                else:
+                    self._writer.abort()
+                self._writer = None
+
+    def _received_all(self, size_bytes: int) -> bool:
+        upstream = self.response.headers
+        if "content-length" not in upstream or "content-encoding" in upstream:
+            return True
+        return int(upstream["content-length"]) == size_bytes
+
+
 class FreesoundClient:
-    def __init__(self, http_client: httpx.AsyncClient | None = None) -> None:
-        self._http = http_client or create_async_client()
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient | None = None,
+        *,
+        preview_cache: PreviewCache | None = None,
+        search_cache: SearchCache | None = None,
+        scheduler: FreesoundScheduler | None = None,
+        sound_index: SoundIndex | None = None,
+    ) -> None:
+        self._http = http_client or get_shared_client()
+        self._scheduler = scheduler or default_scheduler
+        self._preview_cache = preview_cache or default_preview_cache
+        self._search_cache = search_cache or default_search_cache
+        self._sound_index = sound_index or default_sound_index
 
     async def search_text(
         self,
@@ -56,7 +137,29 @@ class FreesoundClient:
         if tags:
             params["filter"] = " ".join([f"tag:{t}" for t in tags[:8]])
 
-        resp = await self._http.get(base_url, params=params)
+        key = (query, params.get("filter"), int(page), int(page_size))
+        result = await self._search_cache.get_or_fetch(
+            key,
+            lambda: self._search_upstream(base_url, params, token=resolved_token),
+            scope=hashlib.sha256(resolved_token.encode("utf-8")).hexdigest(),
+        )
+        self._sound_index.put_many(result.results)
+        return result
+
+    async def _search_upstream(
+        self,
+        base_url: str,
+        params: dict[str, str | int],
+        *,
+        token: str,
+    ) -> FreesoundSearchResponse:
+        resp = await self._scheduler.get(
+            self._http,
+            base_url,
+            params=params,
+            token=token,
+            priority=RequestPriority.INTERACTIVE,
+        )
         resp.raise_for_status()
         data = resp.json()
         try:
@@ -69,14 +172,26 @@ class FreesoundClient:
             pass
         return _model_validate(FreesoundSearchResponse, data)
 
-    async def get_sound(self, sound_id: int, token: str | None = None) -> FreesoundSound:
+    async def get_sound(
+        self,
+        sound_id: int,
+        token: str | None = None,
+        *,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+    ) -> FreesoundSound:
         resolved_token = (token or "").strip() or settings.freesound_token
         if not resolved_token:
             raise RuntimeError("FREESOUND_TOKEN não configurado.")
 
         url = f"https://freesound.org/apiv2/sounds/{int(sound_id)}/"
         fields = "id,name,username,duration,tags,license,url,previews"
-        resp = await self._http.get(url, params={"fields": fields, "token": resolved_token})
+        resp = await self._scheduler.get(
+            self._http,
+            url,
+            params={"fields": fields, "token": resolved_token},
+            token=resolved_token,
+            priority=priority,
+        )
         resp.raise_for_status()
         data = resp.json()
         try:
@@ -85,17 +200,22 @@ class FreesoundClient:
                 data["previews"] = _normalize_previews(p)
         except Exception:
             pass
-        return _model_validate(FreesoundSound, data)
+        sound = _model_validate(FreesoundSound, data)
+        self._sound_index.put(sound)
+        return sound
 
-    async def fetch_preview_bytes(
+    async def _resolve_preview_url(
         self,
         sound_id: int,
         *,
         quality: str,
         fmt: str,
-        token: str | None = None,
-    ) -> tuple[bytes, str]:
-        sound = await self.get_sound(sound_id, token=token)
+        token: str | None,
+        priority: RequestPriority,
+    ) -> tuple[str, str]:
+        sound = self._sound_index.get(sound_id)
+        if sound is None or sound.previews is None:
+            sound = await self.get_sound(sound_id, token=token, priority=priority)
         previews = sound.previews
         if not previews:
             raise RuntimeError("Preview não disponível para este som.")
@@ -120,16 +240,92 @@ class FreesoundClient:
 
         if not preview_url:
             raise RuntimeError("Preview não disponível no formato solicitado.")
+        media_type = "audio/mpeg" if f == "mp3" else "audio/ogg"
+        return preview_url, media_type
 
+    async def _get_preview(
+        self,
+        preview_url: str,
+        *,
+        token: str | None,
+        priority: RequestPriority,
+        stream: bool,
+        headers: dict[str, str] | None = None,
+    ) -> httpx.Response:
         try:
-            resp = await self._http.get(preview_url)
+            request = self._http.build_request("GET", preview_url, headers=headers)
+            resp = await self._scheduler.send(self._http, request, token=token, priority=priority, stream=stream)
             resp.raise_for_status()
         except httpx.HTTPStatusError as e:
             status = e.response.status_code if e.response is not None else 0
+            if stream and e.response is not None:
+                await e.response.aclose()
             if status in (401, 403):
                 raise RuntimeError("Token do Freesound inválido ou ausente.") from e
             raise RuntimeError(f"Falha ao baixar preview ({status}).") from e
         except httpx.RequestError as e:
             raise RuntimeError("Erro de rede ao baixar preview.") from e
-        media_type = "audio/mpeg" if f == "mp3" else "audio/ogg"
-        return resp.content, media_type
+        return resp
+
+    def cached_preview(self, sound_id: int, *, quality: str, fmt: str) -> CachedPreview | None:
+        return self._preview_cache.get(sound_id, quality, fmt)
+
+    def peek_preview(self, sound_id: int, *, quality: str, fmt: str) -> CachedPreview | None:
+        return self._preview_cache.peek(sound_id, quality, fmt)
+
+    async def open_preview_stream(
+        self,
+        sound_id: int,
+        *,
+        quality: str,
+        fmt: str,
+        token: str | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        range_header: str | None = None,
+    ) -> PreviewStream:
+        token = (token or "").strip() or settings.freesound_token
+        preview_url, media_type = await self._resolve_preview_url(
+            sound_id,
+            quality=quality,
+            fmt=fmt,
+            token=token,
+            priority=priority,
+        )
+        whole = _is_whole_file_range(range_header)
+        headers = None if whole else {"Range": str(range_header)}
+        resp = await self._get_preview(preview_url, token=token, priority=priority, stream=True, headers=headers)
+        writer = None
+        if resp.status_code == 200:
+            try:
+                writer = self._preview_cache.writer(sound_id, quality, fmt, media_type)
+            except OSError as e:
+                logger.warning("Preview %s não será guardado no cache: %s", sound_id, e)
+            except BaseException:
+                await resp.aclose()
+                raise
+        return PreviewStream(resp, media_type, writer)
+
+    async def fetch_preview_file(
+        self,
+        sound_id: int,
+        *,
+        quality: str,
+        fmt: str,
+        token: str | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+    ) -> tuple[CachedPreview, bool]:
+        cached = self._preview_cache.get(sound_id, quality, fmt)
+        if cached is not None:
+            return cached, True
+        stream = await self.open_preview_stream(
+            sound_id,
+            quality=quality,
+            fmt=fmt,
+            token=token,
+            priority=priority,
+        )
+        async for _chunk in stream.iter_bytes():
+            pass
+        if stream.cached is None:
+            raise RuntimeError("Falha ao gravar preview no cache.")
+        return stream.cached, False
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from enum import IntEnum
+
+import httpx
+
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RequestPriority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class _TokenBucket:
+    def __init__(self, rate_per_s: float, burst: int) -> None:
+        self.rate_per_s = max(1e-6, float(rate_per_s))
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        now = time.monotonic()
+        if now > self.updated:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate_per_s)
+            self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return max(self.updated - now, 0.0) + (1.0 - self.tokens) / self.rate_per_s
+
+    def pause(self, delay_s: float) -> None:
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, time.monotonic() + max(0.0, delay_s))
+
+
+def _retry_after_s(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class FreesoundScheduler:
+    def __init__(
+        self,
+        rate_per_min: float,
+        burst: int,
+        max_retries: int = 3,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+    ) -> None:
+        self.rate_per_s = max(1e-6, float(rate_per_min) / 60.0)
+        self.burst = max(1, int(burst))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_s = float(backoff_base_s)
+        self.backoff_max_s = float(backoff_max_s)
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._waiters: dict[str, list[tuple[int, int, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._seq = itertools.count()
+        self._sent = 0
+        self._retries = 0
+        self._throttled = 0
+
+    def _bucket(self, token: str) -> _TokenBucket:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            bucket = _TokenBucket(self.rate_per_s, self.burst)
+            self._buckets[token] = bucket
+        return bucket
+
+    def _dispatch(self, token: str) -> None:
+        timer = self._timers.pop(token, None)
+        if timer is not None:
+            timer.cancel()
+        heap = self._waiters.get(token)
+        bucket = self._bucket(token)
+        while heap:
+            fut = heap[0][2]
+            if fut.done():
+                heapq.heappop(heap)
+                continue
+            wait_s = bucket.take()
+            if wait_s > 0:
+                loop = asyncio.get_running_loop()
+                self._timers[token] = loop.call_later(wait_s, self._dispatch, token)
+                return
+            heapq.heappop(heap)
+            fut.set_result(None)
+        self._waiters.pop(token, None)
+
+    async def _acquire(self, token: str, priority: RequestPriority) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters.setdefault(token, []), (int(priority), next(self._seq), fut))
+        self._dispatch(token)
+        await fut
+
+    def _backoff_s(self, attempt: int, retry_after: float | None) -> float:
+        if retry_after is not None:
+            return min(self.backoff_max_s, retry_after)
+        delay = min(self.backoff_max_s, self.backoff_base_s * (2**attempt))
+        return delay * (0.5 + random.random() * 0.5)
+
+    async def send(
+        self,
+        http: httpx.AsyncClient,
+        request: httpx.Request,
+        *,
+        token: str | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        stream: bool = False,
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            if token:
+                await self._acquire(token, priority)
+            try:
+                resp = await http.send(request, stream=stream)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                delay_s = self._backoff_s(attempt, None)
+            else:
+                self._sent += 1
+                if resp.status_code not in _RETRY_STATUSES or attempt >= self.max_retries:
+                    return resp
+                retry_after = _retry_after_s(resp.headers.get("retry-after"))
+                delay_s = self._backoff_s(attempt, retry_after)
+                if resp.status_code == 429:
+                    self._throttled += 1
+                    if token:
+                        self._bucket(token).pause(delay_s)
+                await resp.aclose()
+            attempt += 1
+            self._retries += 1
+            logger.info("Freesound: nova tentativa %d em %.2fs (%s)", attempt, delay_s, request.url.host)
+            await asyncio.sleep(delay_s)
+
+    async def get(
+        self,
+        http: httpx.AsyncClient,
+        url: str,
+        *,
+        params: dict | None = None,
+        token: str | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        stream: bool = False,
+    ) -> httpx.Response:
+        request = http.build_request("GET", url, params=params)
+        return await self.send(http, request, token=token, priority=priority, stream=stream)
+
+    def stats(self) -> dict:
+        queued = {p.name.lower(): 0 for p in RequestPriority}
+        for heap in self._waiters.values():
+            for prio, _seq, fut in heap:
+                if not fut.done():
+                    queued[RequestPriority(prio).name.lower()] += 1
+        return {
+            "rate_per_min": self.rate_per_s * 60.0,
+            "burst": self.burst,
+            "tokens_tracked": len(self._buckets),
+            "queued": queued,
+            "sent": self._sent,
+            "retries": self._retries,
+            "throttled": self._throttled,
+        }
+
+
+scheduler = FreesoundScheduler(
+    rate_per_min=settings.freesound_rate_per_min,
+    burst=settings.freesound_burst,
+    max_retries=settings.freesound_max_retries,
+)
@@ -0,0 +1,469 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import re
+import struct
+import subprocess
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass
+from urllib.parse import parse_qs, urlsplit
+
+import imageio_ffmpeg
+import numpy as np
+
+from ..core.config import settings
+from ..schemas.export import AutomationPoint, TimelineClip, TimelineProject
+from .freesound_client import FreesoundClient
+from .preview_cache import PCM_SUFFIX, preview_cache
+
+
+_PREVIEW_PATH = re.compile(r"/sounds/(\d+)/preview")
+_QUALITIES = ("lq", "hq")
+_FORMATS = ("mp3", "ogg")
+_WAV_HEAD_BYTES = 64 * 1024
+_FADE_FLOOR = 0.0001
+_WARP_FADE_S = 0.005
+_EPS = 1e-3
+
+
+@dataclass(frozen=True)
+class SourceRef:
+    sound_id: int
+    quality: str
+    fmt: str
+
+
+@dataclass(frozen=True)
+class _Envelope:
+    times: np.ndarray
+    values: np.ndarray
+    default: float
+
+    def at(self, t: np.ndarray) -> np.ndarray:
+        return np.interp(t, self.times, self.values, left=self.default)
+
+
+@dataclass(frozen=True)
+class _Voice:
+    track_id: str
+    source: np.ndarray
+    start: int
+    src_start: int
+    frames: int
+    gain: _Envelope | None
+    pan: _Envelope | None
+
+    @property
+    def end(self) -> int:
+        return self.start + self.frames
+
+
+def clip_source(clip: TimelineClip) -> SourceRef | None:
+    if not clip.preview_url:
+        return None
+    url = urlsplit(clip.preview_url)
+    query = parse_qs(url.query)
+    sound_id = None
+    if clip.source is not None and (clip.source.type or "freesound") == "freesound":
+        sound_id = clip.source.id
+    if sound_id is None:
+        m = _PREVIEW_PATH.search(url.path)
+        sound_id = int(m.group(1)) if m else None
+    if sound_id is None:
+        return None
+    quality = (query.get("quality") or [""])[0].strip().lower()
+    fmt = (query.get("fmt") or [""])[0].strip().lower()
+    if quality not in _QUALITIES:
+        quality = _QUALITIES[0]
+    if fmt not in _FORMATS:
+        fmt = _FORMATS[0]
+    return SourceRef(sound_id=int(sound_id), quality=quality, fmt=fmt)
+
+
+def timeline_duration_s(project: TimelineProject) -> float:
+    end = 0.0
+    for clip in project.clips:
+        end = max(end, clip.start_s + clip.duration_s)
+    return max(0.1, end)
+
+
+def transition_fades(project: TimelineProject) -> dict[str, tuple[float, float]]:
+    fades = {clip.id: (max(0.0, clip.fade_in_s), max(0.0, clip.fade_out_s)) for clip in project.clips}
+    transition_s = max(0.0, project.mix.transition_s)
+    if not transition_s > 0:
+        return fades
+    by_track: dict[str, list[TimelineClip]] = {}
+    for clip in project.clips:
+        by_track.setdefault(clip.track_id, []).append(clip)
+    for clips in by_track.values():
+        clips.sort(key=lambda c: (c.start_s, c.id))
+        for a, b in zip(clips, clips[1:]):
+            ov = min(a.start_s + a.duration_s, b.start_s + b.duration_s) - max(a.start_s, b.start_s)
+            if not ov > 1e-6:
+                continue
+            fade_s = max(0.0, min(transition_s, ov, a.duration_s, b.duration_s))
+            if not fade_s > 1e-6:
+                continue
+            fades[a.id] = (fades[a.id][0], max(fades[a.id][1], fade_s))
+            fades[b.id] = (max(fades[b.id][0], fade_s), fades[b.id][1])
+    return fades
+
+
+def _wav_layout(head: bytes) -> tuple[int, int]:
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        raise RuntimeError("Saída de áudio inválida.")
+    pos = 12
+    channels = 0
+    while pos + 8 <= len(head):
+        chunk, size = head[pos : pos + 4], struct.unpack_from("<I", head, pos + 4)[0]
+        pos += 8
+        if chunk == b"fmt ":
+            channels = struct.unpack_from("<H", head, pos + 2)[0]
+        elif chunk == b"data":
+            if not channels:
+                raise RuntimeError("Saída de áudio inválida.")
+            return pos, channels
+        pos += size + (size & 1)
+    raise RuntimeError("Saída de áudio inválida.")
+
+
+def map_wav(path: str) -> np.ndarray:
+    with open(path, "rb") as f:
+        offset, channels = _wav_layout(f.read(_WAV_HEAD_BYTES))
+    frames = (os.path.getsize(path) - offset) // (4 * channels)
+    if frames <= 0:
+        return np.zeros((0, channels), dtype=np.float32)
+    return np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(frames, channels))
+
+
+def decode_source(path: str, sample_rate: int, out_path: str) -> np.ndarray:
+    if not os.path.exists(out_path):
+        tmp_path = f"{out_path}.{uuid.uuid4().hex}.part"
+        cmd = [
+            imageio_ffmpeg.get_ffmpeg_exe(),
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-nostdin",
+            "-i",
+            path,
+            "-map",
+            "0:a:0",
+            "-vn",
+            "-map_metadata",
+            "-1",
+            "-af",
+            "aformat=channel_layouts=mono|stereo",
+            "-ar",
+            str(int(sample_rate)),
+            "-c:a",
+            "pcm_f32le",
+            "-f",
+            "wav",
+            tmp_path,
+        ]
+        try:
+            proc = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if proc.returncode != 0:
+                msg = proc.stderr.decode("utf-8", "replace").strip()
+                raise RuntimeError(f"Falha ao decodificar o preview: {msg[-300:] or proc.returncode}")
+            try:
+                os.replace(tmp_path, out_path)
+            except OSError:
+                if not os.path.exists(out_path):
+                    raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return map_wav(out_path)
+
+
+def _automation_events(
+    points: list[AutomationPoint], duration_s: float, lo: float, hi: float
+) -> list[tuple[float, bool, float]]:
+    if not points:
+        return []
+    ordered = sorted(points, key=lambda p: p.t)
+    return [
+        (p.t * duration_s, i > 0, float(np.clip(p.v, lo, hi)))
+        for i, p in enumerate(ordered)
+    ]
+
+
+def _fade_events(duration_s: float, fade_in_s: float, fade_out_s: float) -> list[tuple[float, bool, float]]:
+    events = []
+    if fade_in_s > 0.001:
+        events += [(0.0, False, _FADE_FLOOR), (fade_in_s, True, 1.0)]
+    if fade_out_s > 0.001:
+        events += [(duration_s - fade_out_s, False, 1.0), (duration_s, True, _FADE_FLOOR)]
+    return events
+
+
+def _param_envelope(events: list[tuple[float, bool, float]], default: float) -> _Envelope | None:
+    if not events:
+        return None
+    times: list[float] = []
+    values: list[float] = []
+    cur_t, cur_v = 0.0, default
+    for t, ramp, v in sorted(events, key=lambda e: e[0]):
+        if not ramp:
+            times.append(t)
+            values.append(cur_v)
+        elif not times:
+            times.append(cur_t)
+            values.append(cur_v)
+        times.append(t)
+        values.append(v)
+        cur_t, cur_v = t, v
+    return _Envelope(
+        times=np.array(times, dtype=np.float64),
+        values=np.array(values, dtype=np.float64),
+        default=default,
+    )
+
+
+def pan_block(x: np.ndarray, pan: float | np.ndarray) -> np.ndarray:
+    pan = np.clip(pan, -1.0, 1.0)
+    if x.shape[1] == 1:
+        a = (pan + 1.0) * (math.pi / 4.0)
+        return np.column_stack((x[:, 0] * np.cos(a), x[:, 0] * np.sin(a)))
+    left, right = x[:, 0], x[:, 1]
+    to_left = pan <= 0.0
+    a = np.where(to_left, pan + 1.0, pan) * (math.pi / 2.0)
+    gl, gr = np.cos(a), np.sin(a)
+    return np.column_stack(
+        (
+            np.where(to_left, left + right * gl, left * gl),
+            np.where(to_left, right * gr, right + left * gr),
+        )
+    )
+
+
+class MixPlan:
+    def __init__(
+        self,
+        project: TimelineProject,
+        sources: dict[SourceRef, np.ndarray],
+        *,
+        sample_rate: int,
+        channels: int,
+        track_id: str | None = None,
+    ) -> None:
+        self.sample_rate = int(sample_rate)
+        self.channels = 1 if int(channels) == 1 else 2
+        self.duration_s = timeline_duration_s(project)
+        self.frames = int(math.ceil(self.duration_s * self.sample_rate))
+        self.tracks = {
+            t.id: (float(np.clip(t.gain, 0.0, 1.0)), float(np.clip(t.pan, -1.0, 1.0)))
+            for t in project.tracks
+            if track_id is None or t.id == track_id
+        }
+        fades = transition_fades(project)
+        voices: list[_Voice] = []
+        for clip in project.clips:
+            if clip.track_id not in self.tracks:
+                continue
+            ref = clip_source(clip)
+            source = sources.get(ref) if ref is not None else None
+            if source is None:
+                continue
+            voices.extend(self._clip_voices(clip, source, fades[clip.id]))
+        voices.sort(key=lambda v: v.start)
+        self.voices = voices
+
+    def _clip_voices(self, clip: TimelineClip, source: np.ndarray, fades: tuple[float, float]) -> list[_Voice]:
+        clip_start = max(0.0, clip.start_s)
+        if clip_start >= self.duration_s:
+            return []
+        fade_in_s, fade_out_s = fades
+        if clip.time_warp_segments:
+            segments = []
+            for seg in clip.time_warp_segments:
+                seg_start = max(0.0, seg.start_s)
+                seg_dur = max(0.001, seg.duration_s)
+                first = seg_start <= _EPS
+                last = seg_start + seg_dur >= clip.duration_s - _EPS
+                segments.append(
+                    (
+                        seg_start,
+                        seg_dur,
+                        seg.source_offset_s,
+                        fade_in_s if first else _WARP_FADE_S,
+                        fade_out_s if last else _WARP_FADE_S,
+                    )
+                )
+        else:
+            segments = [(0.0, max(0.001, clip.duration_s), max(0.0, clip.source_offset_s), fade_in_s, fade_out_s)]
+
+        sr = self.sample_rate
+        source_s = source.shape[0] / sr
+        voices = []
+        for seg_start, seg_dur, src_offset, seg_fade_in, seg_fade_out in segments:
+            start_at = clip_start + seg_start
+            if start_at >= self.duration_s:
+                continue
+            src_offset = max(0.0, src_offset)
+            dur = max(0.001, min(seg_dur, source_s - src_offset))
+            start = int(round(start_at * sr))
+            frames = min(int(round(dur * sr)), self.frames - start)
+            if frames <= 0:
+                continue
+            fade_events = _fade_events(dur, min(max(0.0, seg_fade_in), dur), min(max(0.0, seg_fade_out), dur))
+            voices.append(
+                _Voice(
+                    track_id=clip.track_id,
+                    source=source,
+                    start=start,
+                    src_start=int(round(src_offset * sr)),
+                    frames=frames,
+                    gain=_param_envelope(_automation_events(clip.gain_automation, dur, 0.0, 1.5) + fade_events, 1.0),
+                    pan=_param_envelope(_automation_events(clip.pan_automation, dur, -1.0, 1.0), 0.0),
+                )
+            )
+        return voices
+
+    def _voice_block(self, voice: _Voice, lo: int, hi: int) -> np.ndarray | None:
+        first = voice.src_start + lo - voice.start
+        if first >= voice.source.shape[0]:
+            return None
+        x = voice.source[first : first + hi - lo]
+        t = (np.arange(lo, lo + x.shape[0], dtype=np.float64) - voice.start) / self.sample_rate
+        gain = voice.gain.at(t) if voice.gain is not None else np.ones_like(t)
+        if self.channels == 1:
+            return (x.mean(axis=1) * gain)[:, None]
+        pan = voice.pan.at(t) if voice.pan is not None else 0.0
+        return pan_block(x, pan) * gain[:, None]
+
+    def render(self, lo: int, hi: int, voices: list[_Voice] | None = None) -> np.ndarray:
+        voices = self.voices if voices is None else voices
+        buses: dict[str, np.ndarray] = {}
+        for voice in voices:
+            a, b = max(lo, voice.start), min(hi, voice.end)
+            if a >= b:
+                continue
+            y = self._voice_block(voice, a, b)
+            if y is None:
+                continue
+            bus = buses.get(voice.track_id)
+            if bus is None:
+                bus = buses[voice.track_id] = np.zeros((hi - lo, self.channels), dtype=np.float64)
+            bus[a - lo : a - lo + y.shape[0]] += y
+        out = np.zeros((hi - lo, self.channels), dtype=np.float64)
+        for track_id, bus in buses.items():
+            gain, pan = self.tracks[track_id]
+            out += (bus if self.channels == 1 else pan_block(bus, pan)) * gain
+        return out.astype(np.float32)
+
+    def blocks(self, block_frames: int = settings.mix_block_frames) -> Iterator[np.ndarray]:
+        block_frames = max(1024, int(block_frames))
+        pending = 0
+        active: list[_Voice] = []
+        for lo in range(0, self.frames, block_frames):
+            hi = min(self.frames, lo + block_frames)
+            while pending < len(self.voices) and self.voices[pending].start < hi:
+                active.append(self.voices[pending])
+                pending += 1
+            active = [v for v in active if v.end > lo]
+            yield self.render(lo, hi, active)
+
+    def peak(self) -> float:
+        peak = 0.0
+        for block in self.blocks():
+            if block.size:
+                peak = max(peak, float(np.abs(block).max()))
+        return peak
+
+
+class StemMix:
+    def __init__(self, stems: list[np.ndarray], *, sample_rate: int, channels: int, duration_s: float) -> None:
+        self.stems = stems
+        self.sample_rate = int(sample_rate)
+        self.channels = 1 if int(channels) == 1 else 2
+        self.duration_s = duration_s
+        self.frames = int(math.ceil(duration_s * self.sample_rate))
+
+    def blocks(self, block_frames: int = settings.mix_block_frames) -> Iterator[np.ndarray]:
+        block_frames = max(1024, int(block_frames))
+        for lo in range(0, self.frames, block_frames):
+            hi = min(self.frames, lo + block_frames)
+            out = np.zeros((hi - lo, self.channels), dtype=np.float32)
+            for stem in self.stems:
+                part = stem[lo:hi]
+                out[: part.shape[0]] += part
+            yield out
+
+    def peak(self) -> float:
+        peak = 0.0
+        for block in self.blocks():
+            if block.size:
+                peak = max(peak, float(np.abs(block).max()))
+        return peak
+
+
+def to_pcm16(block: np.ndarray, scale: float = 1.0) -> bytes:
+    s = np.clip(block * scale, -1.0, 1.0)
+    return np.where(s < 0, s * 32768.0, s * 32767.0).astype("<i2").tobytes()
+
+
+def wav_header(sample_rate: int, channels: int, frames: int) -> bytes:
+    block_align = channels * 2
+    data_size = frames * block_align
+    return (
+        b"RIFF"
+        + struct.pack("<I", 36 + data_size)
+        + b"WAVEfmt "
+        + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, 16)
+        + b"data"
+        + struct.pack("<I", data_size)
+    )
+
+
+def pcm_stream(plan: MixPlan | StemMix, scale: float = 1.0) -> Iterator[bytes]:
+    for block in plan.blocks():
+        yield to_pcm16(block, scale)
+
+
+def wav_stream(plan: MixPlan | StemMix, scale: float = 1.0) -> Iterator[bytes]:
+    yield wav_header(plan.sample_rate, plan.channels, plan.frames)
+    yield from pcm_stream(plan, scale)
+
+
+async def load_sources(
+    project: TimelineProject,
+    *,
+    sample_rate: int,
+    token: str | None = None,
+    track_id: str | None = None,
+) -> dict[SourceRef, np.ndarray]:
+    refs = {
+        ref
+        for clip in project.clips
+        if track_id is None or clip.track_id == track_id
+        if (ref := clip_source(clip)) is not None
+    }
+    client = FreesoundClient()
+
+    async def load(ref: SourceRef) -> tuple[SourceRef, np.ndarray]:
+        cached, _hit = await client.fetch_preview_file(ref.sound_id, quality=ref.quality, fmt=ref.fmt, token=token)
+        pcm_path = preview_cache.sidecar_path(cached, f"{PCM_SUFFIX}{int(sample_rate)}")
+        return ref, await asyncio.to_thread(decode_source, cached.path, sample_rate, pcm_path)
+
+    return dict(await asyncio.gather(*(load(ref) for ref in refs)))
+
+
+async def plan_mix(
+    project: TimelineProject,
+    *,
+    sample_rate: int,
+    channels: int,
+    track_id: str | None = None,
+    token: str | None = None,
+) -> MixPlan:
+    sources = await load_sources(project, sample_rate=sample_rate, token=token, track_id=track_id)
+    plan = MixPlan(project, sources, sample_rate=sample_rate, channels=channels, track_id=track_id)
+    if not plan.voices:
+        raise ValueError("Nada para exportar (sem clips com preview).")
+    return plan
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any
+
+import numpy as np
+
+from ..core.config import settings
+from .motion_scorers import scorer_name
+from .video_motion import MotionFeatures
+
+
+_FEATURE_VERSION = 3
+_FEATURE_PARAMS = (
+    "start_s",
+    "duration_s",
+    "frame_analysis",
+    "blur_ksize",
+    "roi_x",
+    "roi_y",
+    "roi_w",
+    "roi_h",
+    "scorer",
+)
+_EVENT_PARAMS = ("max_events", "model", "smooth_win")
+
+
+def feature_params(params: dict[str, Any]) -> dict[str, Any]:
+    return {name: params[name] for name in _FEATURE_PARAMS if name in params}
+
+
+def event_params(params: dict[str, Any]) -> dict[str, Any]:
+    return {name: params[name] for name in _EVENT_PARAMS if name in params}
+
+
+class MotionFeatureCache:
+    def __init__(self, root_dir: str, max_bytes: int) -> None:
+        self.root_dir = root_dir
+        self.max_bytes = max(0, int(max_bytes))
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def key(self, content_sha256: str, params: dict[str, Any]) -> str | None:
+        if not content_sha256 or self.max_bytes <= 0:
+            return None
+        if params.get("source") == "audio":
+            fp = {"start_s": params.get("start_s"), "duration_s": params.get("duration_s")}
+            raw = json.dumps([_FEATURE_VERSION, "audio", content_sha256, fp], sort_keys=True)
+            return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        fp = feature_params(params)
+        fp["scorer"] = scorer_name(fp.get("scorer"), fp.get("frame_analysis", True))
+        if not fp.get("frame_analysis", True):
+            fp.pop("blur_ksize", None)
+        if params.get("proxy"):
+            fp["proxy"] = True
+        raw = json.dumps([_FEATURE_VERSION, content_sha256, fp], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}.npy")
+
+    def load(self, key: str | None) -> MotionFeatures | None:
+        if not key:
+            return None
+        path = self._path(key)
+        try:
+            arr = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if arr.ndim != 2 or arr.shape[0] != 4:
+            return None
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+        return MotionFeatures.from_array(arr)
+
+    def store(self, key: str | None, features: MotionFeatures) -> None:
+        if not key:
+            return
+        tmp_path = os.path.join(self.root_dir, f".{uuid.uuid4().hex}.part")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, features.to_array())
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        entries: list[tuple[float, int, str]] = []
+        total = 0
+        for name in os.listdir(self.root_dir):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.root_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_atime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _atime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def stats(self) -> dict:
+        files = [n for n in os.listdir(self.root_dir) if n.endswith(".npy")]
+        total = 0
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(self.root_dir, name))
+            except OSError:
+                pass
+        return {"entries": len(files), "bytes": total, "max_bytes": self.max_bytes}
+
+
+motion_feature_cache = MotionFeatureCache(
+    settings.motion_cache_dir,
+    max_bytes=settings.motion_cache_max_mb * 1024 * 1024,
+)
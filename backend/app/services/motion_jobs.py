@@ -0,0 +1,536 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from ..core.config import settings
+from ..storage.temp_files import video_store
+from .audio_onsets import align_to_frames, extract_audio_features
+from .motion_features import event_params, feature_params, motion_feature_cache
+from .motion_scorers import scorer_is_stateful, scorer_name
+from .video_proxy import video_proxies
+from .video_motion import (
+    COARSE_FINE_MODEL,
+    MotionAnalysisCancelled,
+    MotionEvent,
+    MotionFeatures,
+    SCORE_WEIGHTS,
+    analyze_motion_events,
+    events_from_features,
+    extract_roi_shard,
+    frame_range,
+    merge_features,
+    plan_shards,
+)
+
+
+logger = logging.getLogger(__name__)
+
+MOTION_SOURCES = ("video", "audio", "both")
+MAX_ROIS = 8
+
+
+class MotionQueueFull(RuntimeError):
+    pass
+
+
+def _reporter(progress_map: Any, key: tuple[str, int], cancel_event: Any):
+    def report(done: int, total: int) -> None:
+        if cancel_event.is_set():
+            raise MotionAnalysisCancelled("Análise cancelada.")
+        progress_map[key] = (done, total)
+
+    return report
+
+
+def _run_shard(
+    key: tuple[str, int],
+    video_path: str,
+    origin_frame: int,
+    first_frame: int,
+    end_frame: int,
+    rois: list[tuple[float, float, float, float]],
+    params: dict[str, Any],
+    progress_map: Any,
+    cancel_event: Any,
+) -> list[MotionFeatures]:
+    report = _reporter(progress_map, key, cancel_event)
+    return extract_roi_shard(video_path, origin_frame, first_frame, end_frame, rois, progress=report, **params)
+
+
+def _run_events(
+    key: tuple[str, int],
+    video_path: str,
+    params: dict[str, Any],
+    progress_map: Any,
+    cancel_event: Any,
+) -> list[MotionEvent]:
+    report = _reporter(progress_map, key, cancel_event)
+    return analyze_motion_events(video_path, progress=report, **feature_params(params), **event_params(params))
+
+
+def _normalize_rois(rois: list[dict[str, Any]] | None) -> list[dict[str, Any]] | None:
+    if not rois:
+        return None
+    if len(rois) > MAX_ROIS:
+        raise ValueError(f"No máximo {MAX_ROIS} ROIs por análise.")
+    out: list[dict[str, Any]] = []
+    for i, roi in enumerate(rois):
+        name = str(roi.get("name") or "").strip() or str(i)
+        if any(r["name"] == name for r in out):
+            raise ValueError(f"Nome de ROI repetido: {name}.")
+        weights = [float(roi.get(k, d)) for k, d in zip(("diff_weight", "flow_weight", "cell_weight"), SCORE_WEIGHTS)]
+        if sum(weights) <= 0:
+            raise ValueError(f"A ROI {name} precisa de pelo menos um peso maior que zero.")
+        out.append({
+            "name": name,
+            "x": float(roi.get("x", 0.0)),
+            "y": float(roi.get("y", 0.0)),
+            "w": float(roi.get("w", 1.0)),
+            "h": float(roi.get("h", 1.0)),
+            "max_events": roi.get("max_events"),
+            "weights": weights,
+        })
+    return out
+
+
+def _roi_params(roi: dict[str, Any]) -> dict[str, float]:
+    return {"roi_x": roi["x"], "roi_y": roi["y"], "roi_w": roi["w"], "roi_h": roi["h"]}
+
+
+def _roi_event_params(params: dict[str, Any], roi: dict[str, Any]) -> dict[str, Any]:
+    return {
+        **event_params(params),
+        "max_events": roi["max_events"] or params["max_events"],
+        "weights": tuple(roi["weights"]),
+    }
+
+
+@dataclass
+class MotionJob:
+    job_id: str
+    video_id: str
+    params: dict[str, Any]
+    created_at: float
+    status: str = "queued"
+    frames_done: int = 0
+    frames_total: int = 0
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    cache_key: str | None = None
+    audio_cache_key: str | None = None
+    roi_cache_keys: list[str | None] = field(default_factory=list)
+    cache_hit: bool = False
+    proxy: bool = False
+    shards: int = 0
+    elapsed_s: float = 0.0
+    stream: bool = False
+    segments_done: int = 0
+    provisional: list[MotionEvent] | None = None
+    provisional_until_s: float = 0.0
+    provisional_by_roi: dict[str, list[MotionEvent]] | None = None
+    events: list[MotionEvent] | None = None
+    events_by_roi: dict[str, list[MotionEvent]] | None = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    task: asyncio.Task | None = field(default=None, repr=False)
+    futures: list[Future] = field(default_factory=list, repr=False)
+    cancel_event: Any = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+
+class MotionJobQueue:
+    def __init__(
+        self,
+        max_workers: int,
+        max_pending: int,
+        max_jobs: int,
+        shards_per_job: int = 1,
+        shard_min_s: float = 5.0,
+        stream_segment_s: float = 10.0,
+    ) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(0, int(max_pending))
+        self.max_jobs = max(1, int(max_jobs))
+        self.shards_per_job = max(1, int(shards_per_job))
+        self.shard_min_s = max(0.0, float(shard_min_s))
+        self.stream_segment_s = max(1.0, float(stream_segment_s))
+        self._pool: ProcessPoolExecutor | None = None
+        self._manager: Any = None
+        self._progress: Any = None
+        self._jobs: OrderedDict[str, MotionJob] = OrderedDict()
+        self._timing: dict[str, list[float]] = {}
+
+    def start(self) -> None:
+        if self._pool is not None:
+            return
+        self._manager = multiprocessing.Manager()
+        self._progress = self._manager.dict()
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    async def shutdown(self) -> None:
+        active = [job for job in self._jobs.values() if not job.done]
+        for job in active:
+            self._cancel(job)
+        await asyncio.gather(*(job.task for job in active if job.task), return_exceptions=True)
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, True, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+            self._progress = None
+
+    def _active(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def submit(self, video_id: str, params: dict[str, Any], *, stream: bool = False) -> MotionJob:
+        params = dict(params)
+        params["scorer"] = scorer_name(params.get("scorer"), params.get("frame_analysis", True))
+        params["source"] = params.get("source") or "video"
+        if params["source"] not in MOTION_SOURCES:
+            raise ValueError(f"Fonte de análise inválida: {params['source']}. Use um de: {', '.join(MOTION_SOURCES)}.")
+        params["rois"] = _normalize_rois(params.get("rois"))
+        if params["rois"] and params.get("model") == COARSE_FINE_MODEL:
+            raise ValueError("O modelo coarse_fine analisa uma ROI por vez; use outro modelo com várias ROIs.")
+        if params["rois"] and params["source"] == "audio":
+            raise ValueError("ROIs só se aplicam à análise de vídeo; use source=video ou both.")
+        self.start()
+        if self._active() >= self.max_workers + self.max_pending:
+            raise MotionQueueFull("Fila de análise de movimento cheia. Tente novamente em instantes.")
+        stored = video_store.acquire(video_id)
+        if stored is None:
+            raise FileNotFoundError("Vídeo não encontrado. Reimporte.")
+
+        try:
+            video_path = video_proxies.path_for(stored)
+            proxy = video_path != stored.path
+            video_key = {**params, "source": "video", "proxy": proxy}
+            job = MotionJob(
+                job_id=uuid.uuid4().hex,
+                video_id=video_id,
+                params=params,
+                created_at=time.time(),
+                cache_key=motion_feature_cache.key(stored.sha256, video_key),
+                audio_cache_key=motion_feature_cache.key(stored.sha256, {**params, "source": "audio"}),
+                roi_cache_keys=[
+                    motion_feature_cache.key(stored.sha256, {**video_key, **_roi_params(roi)})
+                    for roi in params["rois"] or []
+                ],
+                proxy=proxy,
+                stream=stream,
+                cancel_event=self._manager.Event(),
+            )
+            job.task = asyncio.ensure_future(self._run(job, video_path, stored.path))
+        except BaseException:
+            video_store.release(video_id)
+            raise
+        self._jobs[job.job_id] = job
+        self._trim()
+        return job
+
+    async def _analyze(self, job: MotionJob, video_path: str, audio_path: str) -> list[MotionEvent]:
+        source = job.params["source"]
+        if source == "audio":
+            audio = await self._audio_features(job, audio_path)
+            return events_from_features(audio, **event_params(job.params))
+        if job.params["rois"]:
+            return await self._analyze_rois(job, video_path, audio_path)
+        if source == "both":
+            visual, audio = await asyncio.gather(
+                self._video_features(job, video_path),
+                self._audio_features(job, audio_path),
+            )
+            return events_from_features(
+                visual,
+                extra=align_to_frames(audio, visual.times),
+                extra_weight=float(job.params.get("audio_weight", 0.5)),
+                **event_params(job.params),
+            )
+        if job.params.get("model") == COARSE_FINE_MODEL:
+            features = await self._cached_features(job)
+            if features is not None:
+                return events_from_features(features, **event_params(job.params))
+            job.shards = 1
+            job.futures = [self._pool.submit(
+                _run_events, (job.job_id, 0), video_path, job.params, self._progress, job.cancel_event
+            )]
+            return await asyncio.wrap_future(job.futures[0])
+        features = await self._video_features(job, video_path)
+        return events_from_features(features, **event_params(job.params))
+
+    async def _analyze_rois(self, job: MotionJob, video_path: str, audio_path: str) -> list[MotionEvent]:
+        rois = job.params["rois"]
+        scan = self._scan_features(
+            job, video_path, [(r["x"], r["y"], r["w"], r["h"]) for r in rois], job.roi_cache_keys, rois
+        )
+        audio: MotionFeatures | None = None
+        if job.params["source"] == "both":
+            features, audio = await asyncio.gather(scan, self._audio_features(job, audio_path))
+        else:
+            features = await scan
+        job.events_by_roi = {}
+        for roi, part in zip(rois, features):
+            extra = {}
+            if audio is not None:
+                extra = {
+                    "extra": align_to_frames(audio, part.times),
+                    "extra_weight": float(job.params.get("audio_weight", 0.5)),
+                }
+            job.events_by_roi[roi["name"]] = events_from_features(part, **_roi_event_params(job.params, roi), **extra)
+        return job.events_by_roi[rois[0]["name"]]
+
+    async def _cached_features(self, job: MotionJob) -> MotionFeatures | None:
+        features = await asyncio.to_thread(motion_feature_cache.load, job.cache_key)
+        if features is not None:
+            job.cache_hit = True
+            job.frames_done = job.frames_total = features.frames
+        elif job.cancel_event.is_set():
+            raise MotionAnalysisCancelled("Análise cancelada.")
+        return features
+
+    async def _audio_features(self, job: MotionJob, video_path: str) -> MotionFeatures:
+        features = await asyncio.to_thread(motion_feature_cache.load, job.audio_cache_key)
+        if features is not None:
+            return features
+        future = self._pool.submit(
+            extract_audio_features, video_path, job.params["start_s"], job.params["duration_s"]
+        )
+        job.futures.append(future)
+        features = await asyncio.wrap_future(future)
+        await asyncio.to_thread(motion_feature_cache.store, job.audio_cache_key, features)
+        return features
+
+    async def _video_features(self, job: MotionJob, video_path: str) -> MotionFeatures:
+        roi = tuple(job.params[k] for k in ("roi_x", "roi_y", "roi_w", "roi_h"))
+        return (await self._scan_features(job, video_path, [roi], [job.cache_key]))[0]
+
+    async def _scan_features(
+        self,
+        job: MotionJob,
+        video_path: str,
+        rois: list[tuple[float, float, float, float]],
+        keys: list[str | None],
+        named: list[dict[str, Any]] | None = None,
+    ) -> list[MotionFeatures]:
+        features: list[MotionFeatures | None] = list(
+            await asyncio.gather(*(asyncio.to_thread(motion_feature_cache.load, key) for key in keys))
+        )
+        missing = [i for i, f in enumerate(features) if f is None]
+        if not missing:
+            job.cache_hit = True
+            job.frames_done = job.frames_total = features[0].frames
+            return features
+        if job.cancel_event.is_set():
+            raise MotionAnalysisCancelled("Análise cancelada.")
+
+        fps, start_frame, end_frame = await asyncio.to_thread(
+            frame_range, video_path, job.params["start_s"], job.params["duration_s"]
+        )
+        n = self.shards_per_job
+        if job.stream:
+            n = max(n, math.ceil((end_frame - start_frame) / (fps * self.stream_segment_s)))
+        if scorer_is_stateful(job.params["scorer"]):
+            n = 1
+        shards = plan_shards(start_frame, end_frame, n, int(fps * self.shard_min_s))
+        job.shards = len(shards)
+        fparams = {k: job.params[k] for k in ("frame_analysis", "blur_ksize", "scorer")}
+        scan_rois = [rois[i] for i in missing]
+        futures = [
+            self._pool.submit(
+                _run_shard,
+                (job.job_id, i),
+                video_path,
+                start_frame,
+                first,
+                end,
+                scan_rois,
+                fparams,
+                self._progress,
+                job.cancel_event,
+            )
+            for i, (first, end) in enumerate(shards)
+        ]
+        job.futures.extend(futures)
+        parts: list[list[MotionFeatures] | None] = [None] * len(shards)
+        pending = {asyncio.wrap_future(f): i for i, f in enumerate(futures)}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    parts[pending.pop(fut)] = fut.result()
+                if job.stream:
+                    self._publish_provisional(job, parts, [named[i] for i in missing] if named else None)
+        except BaseException:
+            self._cancel(job)
+            raise
+        for r, i in enumerate(missing):
+            features[i] = merge_features([part[r] for part in parts])
+            await asyncio.to_thread(motion_feature_cache.store, keys[i], features[i])
+        return features
+
+    def _publish_provisional(
+        self,
+        job: MotionJob,
+        parts: list[list[MotionFeatures] | None],
+        named: list[dict[str, Any]] | None,
+    ) -> None:
+        prefix: list[list[MotionFeatures]] = []
+        for part in parts:
+            if part is None:
+                break
+            prefix.append(part)
+        if len(prefix) <= job.segments_done or len(prefix) == len(parts):
+            return
+        job.segments_done = len(prefix)
+        merged = [merge_features([part[r] for part in prefix]) for r in range(len(prefix[0]))]
+        if named:
+            job.provisional_by_roi = {
+                roi["name"]: events_from_features(features, **_roi_event_params(job.params, roi))
+                for roi, features in zip(named, merged)
+            }
+            job.provisional = job.provisional_by_roi[named[0]["name"]]
+        else:
+            job.provisional = events_from_features(merged[0], **event_params(job.params))
+        job.provisional_until_s = float(merged[0].times[-1]) if merged[0].frames else 0.0
+        job.changed.set()
+
+    async def wait_update(self, job: MotionJob, timeout_s: float) -> MotionJob:
+        try:
+            await asyncio.wait_for(job.changed.wait(), timeout_s)
+        except asyncio.TimeoutError:
+            pass
+        job.changed.clear()
+        self._refresh(job)
+        return job
+
+    async def _run(self, job: MotionJob, video_path: str, audio_path: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            job.events = await self._analyze(job, video_path, audio_path)
+            job.status = "done"
+        except (asyncio.CancelledError, MotionAnalysisCancelled):
+            job.status = "cancelled"
+        except Exception as e:  # noqa: BLE001
+            logger.info("Análise de movimento %s falhou: %s", job.job_id, e)
+            job.status = "failed"
+            job.error = str(e) or e.__class__.__name__
+        finally:
+            job.finished_at = time.time()
+            job.elapsed_s = time.perf_counter() - t0
+            self._collect_progress(job)
+            video_store.release(job.video_id)
+            job.changed.set()
+        if job.status == "done" and not job.cache_hit:
+            name = {"video": job.params["scorer"], "audio": "audio"}.get(
+                job.params["source"], f"{job.params['scorer']}+audio"
+            )
+            timing = self._timing.setdefault(name, [0, 0, 0.0])
+            timing[0] += 1
+            timing[1] += job.frames_total
+            timing[2] += job.elapsed_s
+
+    def _collect_progress(self, job: MotionJob) -> None:
+        if self._progress is None:
+            return
+        try:
+            parts = [self._progress.pop((job.job_id, i), None) for i in range(job.shards)]
+        except (OSError, EOFError):
+            return
+        self._apply_progress(job, parts)
+
+    def _apply_progress(self, job: MotionJob, parts: list[tuple[int, int] | None]) -> bool:
+        seen = [p for p in parts if p is not None]
+        if not seen:
+            return False
+        job.frames_done = sum(done for done, _total in seen)
+        job.frames_total = sum(total for _done, total in seen)
+        return True
+
+    def _refresh(self, job: MotionJob) -> None:
+        if job.done or self._progress is None:
+            return
+        try:
+            parts = [self._progress.get((job.job_id, i)) for i in range(job.shards)]
+        except (OSError, EOFError):
+            return
+        if not self._apply_progress(job, parts):
+            return
+        if job.status == "queued":
+            job.status = "running"
+            job.started_at = time.time()
+
+    def _trim(self) -> None:
+        for job_id in [jid for jid, job in self._jobs.items() if job.done]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> MotionJob | None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            self._refresh(job)
+        return job
+
+    def _cancel(self, job: MotionJob) -> None:
+        if job.cancel_event is not None:
+            try:
+                job.cancel_event.set()
+            except (OSError, EOFError):
+                pass
+        for future in job.futures:
+            future.cancel()
+
+    def cancel(self, job_id: str) -> MotionJob | None:
+        job = self.get(job_id)
+        if job is not None and not job.done:
+            self._cancel(job)
+        return job
+
+    async def wait(self, job: MotionJob) -> MotionJob:
+        if job.task is not None:
+            await asyncio.shield(job.task)
+        return job
+
+    def stats(self) -> dict:
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            self._refresh(job)
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "shards_per_job": self.shards_per_job,
+            "jobs": counts,
+            "scorers": {
+                name: {
+                    "jobs": int(jobs),
+                    "frames": int(frames),
+                    "seconds": seconds,
+                    "frames_per_s": (frames / seconds) if seconds else 0.0,
+                }
+                for name, (jobs, frames, seconds) in self._timing.items()
+            },
+            "feature_cache": motion_feature_cache.stats(),
+        }
+
+
+motion_jobs = MotionJobQueue(
+    max_workers=settings.motion_workers,
+    max_pending=settings.motion_max_pending,
+    max_jobs=settings.motion_max_jobs,
+    shards_per_job=settings.motion_shards or settings.motion_workers,
+    shard_min_s=settings.motion_shard_min_s,
+    stream_segment_s=settings.motion_stream_segment_s,
+)
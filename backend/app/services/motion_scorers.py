@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import abc
+
+import cv2
+import numpy as np
+
+
+_GRID = 3
+
+
+def block_means(x: np.ndarray, grid: int = _GRID) -> np.ndarray:
+    gh, gw = x.shape[:2]
+    ch = gh // grid
+    cw = gw // grid
+    if ch == 0 or cw == 0:
+        return np.full((grid, grid), float(np.mean(x)) if x.size else 0.0)
+    return x[:ch * grid, :cw * grid].reshape(grid, ch, grid, cw).mean(axis=(1, 3), dtype=np.float64)
+
+
+class MotionScorer(abc.ABC):
+    name = ""
+    stateful = False
+
+    def __init__(self) -> None:
+        self._prev: np.ndarray | None = None
+
+    def update(self, gray: np.ndarray) -> tuple[float, float, float] | None:
+        prev = self._prev
+        self._prev = gray
+        if prev is None:
+            self._first(gray)
+            return None
+        return self._score(prev, gray)
+
+    def _first(self, gray: np.ndarray) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _score(self, prev: np.ndarray, gray: np.ndarray) -> tuple[float, float, float]: ...
+
+
+class FrameDiffScorer(MotionScorer):
+    name = "frame_diff"
+
+    def _score(self, prev: np.ndarray, gray: np.ndarray) -> tuple[float, float, float]:
+        d = float(np.mean(cv2.absdiff(gray, prev)))
+        return d, d, d
+
+
+class FarnebackScorer(MotionScorer):
+    name = "farneback"
+
+    def _score(self, prev: np.ndarray, gray: np.ndarray) -> tuple[float, float, float]:
+        d = float(np.mean(cv2.absdiff(gray, prev)))
+        flow = cv2.calcOpticalFlowFarneback(prev, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+        mag, _ang = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+        return d, float(np.mean(mag)), float(np.max(block_means(mag)))
+
+
+class SparseLKScorer(MotionScorer):
+    name = "lk"
+    stateful = True
+    scale = 0.5
+    max_corners = 200
+    min_corners = 40
+    redetect_every = 10
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._small: np.ndarray | None = None
+        self._pts: np.ndarray | None = None
+        self._age = 0
+
+    def _shrink(self, gray: np.ndarray) -> np.ndarray:
+        return cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def _detect(self, small: np.ndarray) -> None:
+        self._pts = cv2.goodFeaturesToTrack(small, self.max_corners, 0.01, 5)
+        self._age = 0
+
+    def _first(self, gray: np.ndarray) -> None:
+        self._small = self._shrink(gray)
+        self._detect(self._small)
+
+    def _score(self, prev: np.ndarray, gray: np.ndarray) -> tuple[float, float, float]:
+        d = float(np.mean(cv2.absdiff(gray, prev)))
+        small = self._shrink(gray)
+        prev_small = self._small if self._small is not None else small
+        self._small = small
+        pts = self._pts
+        if pts is None or len(pts) < self.min_corners or self._age >= self.redetect_every:
+            self._detect(prev_small)
+            pts = self._pts
+        self._age += 1
+        if pts is None or not len(pts):
+            return d, 0.0, 0.0
+
+        nxt, status, _err = cv2.calcOpticalFlowPyrLK(prev_small, small, pts, None, winSize=(15, 15), maxLevel=2)
+        ok = status.reshape(-1) == 1
+        if not np.any(ok):
+            self._pts = None
+            return d, 0.0, 0.0
+        p0 = pts.reshape(-1, 2)[ok]
+        p1 = nxt.reshape(-1, 2)[ok]
+        mag = np.linalg.norm(p1 - p0, axis=1) / self.scale
+        self._pts = p1.reshape(-1, 1, 2)
+
+        sh, sw = small.shape[:2]
+        gx = np.clip((p0[:, 0] * _GRID / max(1, sw)).astype(np.int64), 0, _GRID - 1)
+        gy = np.clip((p0[:, 1] * _GRID / max(1, sh)).astype(np.int64), 0, _GRID - 1)
+        cell = gy * _GRID + gx
+        sums = np.bincount(cell, weights=mag, minlength=_GRID * _GRID)
+        counts = np.bincount(cell, minlength=_GRID * _GRID)
+        cell_means = sums / np.maximum(counts, 1)
+        return d, float(np.mean(mag)), float(np.max(cell_means))
+
+
+class BackgroundSubtractorScorer(MotionScorer):
+    name = "mog2"
+    stateful = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._sub = cv2.createBackgroundSubtractorMOG2(history=120, varThreshold=16, detectShadows=False)
+
+    def _first(self, gray: np.ndarray) -> None:
+        self._sub.apply(gray)
+
+    def _score(self, prev: np.ndarray, gray: np.ndarray) -> tuple[float, float, float]:
+        d = float(np.mean(cv2.absdiff(gray, prev)))
+        fg = (self._sub.apply(gray) > 0).astype(np.float32)
+        return d, float(np.mean(fg)), float(np.max(block_means(fg)))
+
+
+SCORERS: dict[str, type[MotionScorer]] = {
+    cls.name: cls
+    for cls in (FrameDiffScorer, FarnebackScorer, SparseLKScorer, BackgroundSubtractorScorer)
+}
+
+
+def scorer_name(scorer: str | None, frame_analysis: bool = True) -> str:
+    if not scorer:
+        return FarnebackScorer.name if frame_analysis else FrameDiffScorer.name
+    name = scorer.strip().lower()
+    if name not in SCORERS:
+        raise ValueError(f"Scorer desconhecido: {scorer}. Use um de: {', '.join(SCORERS)}.")
+    return name
+
+
+def scorer_is_stateful(scorer: str | None, frame_analysis: bool = True) -> bool:
+    return SCORERS[scorer_name(scorer, frame_analysis)].stateful
+
+
+def create_scorer(scorer: str | None, frame_analysis: bool = True) -> MotionScorer:
+    return SCORERS[scorer_name(scorer, frame_analysis)]()
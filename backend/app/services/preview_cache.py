@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from ..core.config import settings
+
+
+_EXT_BY_MEDIA_TYPE = {"audio/mpeg": "mp3", "audio/ogg": "ogg"}
+_MEDIA_TYPE_BY_EXT = {v: k for k, v in _EXT_BY_MEDIA_TYPE.items()}
+_FILE_RE = re.compile(r"^(\d+)_(lq|hq)_(mp3|ogg)\.([0-9a-f]{32})\.(mp3|ogg)$")
+PCM_SUFFIX = ".pcm"
+_SIDECAR_SUFFIXES = (".peaks", f"{PCM_SUFFIX}44100", f"{PCM_SUFFIX}48000")
+
+
+def _remove_with_sidecars(path: str) -> None:
+    for p in (path, *(path + suffix for suffix in _SIDECAR_SUFFIXES)):
+        try:
+            if os.path.exists(p):
+                os.remove(p)
+        except OSError:
+            pass
+
+
+@dataclass(frozen=True)
+class CachedPreview:
+    sound_id: int
+    quality: str
+    fmt: str
+    path: str
+    media_type: str
+    etag: str
+    size_bytes: int
+    mtime: float
+
+
+def preview_key(sound_id: int, quality: str, fmt: str) -> tuple[int, str, str]:
+    return int(sound_id), (quality or "lq").strip().lower(), (fmt or "mp3").strip().lower()
+
+
+class PreviewCacheWriter:
+    def __init__(self, cache: PreviewCache, key: tuple[int, str, str], media_type: str) -> None:
+        self._cache = cache
+        self._key = key
+        self._media_type = media_type
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._tmp_path = os.path.join(cache.root_dir, f".{uuid.uuid4().hex}.part")
+        self._f = open(self._tmp_path, "wb")
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def write(self, chunk: bytes) -> None:
+        self._f.write(chunk)
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def commit(self) -> CachedPreview:
+        self._f.close()
+        digest = self._hash.hexdigest()[:32]
+        return self._cache._commit(self._key, self._media_type, self._tmp_path, digest, self._size)
+
+    def abort(self) -> None:
+        try:
+            self._f.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+
+class PreviewCache:
+    def __init__(self, root_dir: str, max_bytes: int) -> None:
+        self.root_dir = root_dir
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[int, str, str], CachedPreview] = OrderedDict()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        found: list[tuple[float, CachedPreview]] = []
+        sidecars: list[tuple[str, str]] = []
+        for name in os.listdir(self.root_dir):
+            path = os.path.join(self.root_dir, name)
+            if name.endswith(".part"):
+                os.remove(path)
+                continue
+            suffix = next((s for s in _SIDECAR_SUFFIXES if name.endswith(s)), None)
+            if suffix is not None:
+                sidecars.append((path, path[: -len(suffix)]))
+                continue
+            m = _FILE_RE.match(name)
+            if not m:
+                continue
+            st = os.stat(path)
+            found.append((
+                st.st_atime,
+                CachedPreview(
+                    sound_id=int(m.group(1)),
+                    quality=m.group(2),
+                    fmt=m.group(3),
+                    path=path,
+                    media_type=_MEDIA_TYPE_BY_EXT[m.group(5)],
+                    etag=m.group(4),
+                    size_bytes=st.st_size,
+                    mtime=st.st_mtime,
+                ),
+            ))
+        found.sort(key=lambda item: item[0])
+        for _atime, entry in found:
+            self._entries[(entry.sound_id, entry.quality, entry.fmt)] = entry
+            self._total_bytes += entry.size_bytes
+        known = {entry.path for _atime, entry in found}
+        for path, owner in sidecars:
+            if owner not in known:
+                os.remove(path)
+        self._evict()
+
+    def get(self, sound_id: int, quality: str, fmt: str) -> CachedPreview | None:
+        key = preview_key(sound_id, quality, fmt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not os.path.exists(entry.path):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        try:
+            os.utime(entry.path, (time.time(), entry.mtime))
+        except OSError:
+            pass
+        return entry
+
+    def peek(self, sound_id: int, quality: str, fmt: str) -> CachedPreview | None:
+        with self._lock:
+            entry = self._entries.get(preview_key(sound_id, quality, fmt))
+        if entry is not None and os.path.exists(entry.path):
+            return entry
+        return None
+
+    def sidecar_path(self, entry: CachedPreview, suffix: str) -> str:
+        return entry.path + suffix
+
+    def writer(self, sound_id: int, quality: str, fmt: str, media_type: str) -> PreviewCacheWriter:
+        return PreviewCacheWriter(self, preview_key(sound_id, quality, fmt), media_type)
+
+    def put(self, sound_id: int, quality: str, fmt: str, data: bytes, media_type: str) -> CachedPreview:
+        w = self.writer(sound_id, quality, fmt, media_type)
+        try:
+            w.write(data)
+        except Exception:
+            w.abort()
+            raise
+        return w.commit()
+
+    def _commit(
+        self,
+        key: tuple[int, str, str],
+        media_type: str,
+        tmp_path: str,
+        digest: str,
+        size: int,
+    ) -> CachedPreview:
+        ext = _EXT_BY_MEDIA_TYPE.get(media_type, "mp3")
+        path = os.path.join(self.root_dir, f"{key[0]}_{key[1]}_{key[2]}.{digest}.{ext}")
+        os.replace(tmp_path, path)
+        entry = CachedPreview(
+            sound_id=key[0],
+            quality=key[1],
+            fmt=key[2],
+            path=path,
+            media_type=_MEDIA_TYPE_BY_EXT[ext],
+            etag=digest,
+            size_bytes=size,
+            mtime=os.stat(path).st_mtime,
+        )
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.size_bytes
+                if old.path != path:
+                    _remove_with_sidecars(old.path)
+            self._entries[key] = entry
+            self._total_bytes += size
+            self._evict()
+        return entry
+
+    def _drop(self, key: tuple[int, str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size_bytes
+        _remove_with_sidecars(entry.path)
+
+    def _evict(self) -> None:
+        while self._entries and self._total_bytes > self.max_bytes:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+preview_cache = PreviewCache(
+    settings.preview_cache_dir,
+    max_bytes=settings.preview_cache_max_mb * 1024 * 1024,
+)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from ..core.config import settings
+from .freesound_client import FreesoundClient
+from .freesound_scheduler import RequestPriority
+from .preview_cache import preview_key
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PrefetchJob:
+    job_id: str
+    sound_ids: list[int]
+    quality: str
+    fmt: str
+    created_at: float
+    ready: set[int] = field(default_factory=set)
+    failed: dict[int, str] = field(default_factory=dict)
+
+    @property
+    def pending(self) -> list[int]:
+        return [sid for sid in self.sound_ids if sid not in self.ready and sid not in self.failed]
+
+    @property
+    def done(self) -> bool:
+        return not self.pending
+
+
+class PreviewPrefetcher:
+    def __init__(self, max_concurrency: int, max_jobs: int) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_jobs = max(1, int(max_jobs))
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._jobs: OrderedDict[str, PrefetchJob] = OrderedDict()
+        self._inflight: dict[tuple[int, str, str], asyncio.Task] = {}
+
+    def submit(
+        self,
+        client: FreesoundClient,
+        sound_ids: list[int],
+        *,
+        quality: str,
+        fmt: str,
+        token: str | None,
+    ) -> PrefetchJob:
+        job = PrefetchJob(
+            job_id=uuid.uuid4().hex,
+            sound_ids=list(dict.fromkeys(int(s) for s in sound_ids)),
+            quality=quality,
+            fmt=fmt,
+            created_at=time.time(),
+        )
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+        for sid in job.sound_ids:
+            if client.peek_preview(sid, quality=quality, fmt=fmt) is not None:
+                job.ready.add(sid)
+                continue
+            key = preview_key(sid, quality, fmt)
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._warm(client, sid, quality=quality, fmt=fmt, token=token))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+            task.add_done_callback(lambda t, s=sid: self._record(job, s, t))
+        return job
+
+    async def _warm(
+        self,
+        client: FreesoundClient,
+        sound_id: int,
+        *,
+        quality: str,
+        fmt: str,
+        token: str | None,
+    ) -> None:
+        async with self._sem:
+            await client.fetch_preview_file(
+                sound_id,
+                quality=quality,
+                fmt=fmt,
+                token=token,
+                priority=RequestPriority.BACKGROUND,
+            )
+
+    def _record(self, job: PrefetchJob, sound_id: int, task: asyncio.Task) -> None:
+        if task.cancelled():
+            job.failed[sound_id] = "cancelado"
+            return
+        err = task.exception()
+        if err is None:
+            job.ready.add(sound_id)
+        else:
+            logger.info("Prefetch do preview %s falhou: %s", sound_id, err)
+            job.failed[sound_id] = str(err) or err.__class__.__name__
+
+    def get(self, job_id: str) -> PrefetchJob | None:
+        return self._jobs.get(job_id)
+
+    async def aclose(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+preview_prefetcher = PreviewPrefetcher(
+    max_concurrency=settings.prefetch_max_concurrency,
+    max_jobs=settings.prefetch_max_jobs,
+)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from ..core.config import settings
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+class SearchCache:
+    def __init__(self, ttl_s: float, max_entries: int) -> None:
+        self.ttl_s = max(0.0, float(ttl_s))
+        self.max_entries = max(0, int(max_entries))
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def _lookup(self, key: Hashable) -> Any | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self.ttl_s <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        *,
+        scope: Hashable = None,
+    ) -> Any:
+        value = self._lookup(key)
+        if value is not None:
+            self._hits += 1
+            return value
+
+        flight = (key, scope)
+        task = self._inflight.get(flight)
+        if task is None:
+            self._misses += 1
+            task = asyncio.ensure_future(self._fetch_and_store(key, flight, fetch))
+            task.add_done_callback(_consume_exception)
+            self._inflight[flight] = task
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, key: Hashable, flight: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(flight, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses + self._coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "inflight": len(self._inflight),
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "hit_ratio": ((self._hits + self._coalesced) / lookups) if lookups else 0.0,
+        }
+
+
+search_cache = SearchCache(
+    ttl_s=settings.search_cache_ttl_s,
+    max_entries=settings.search_cache_max_entries,
+)
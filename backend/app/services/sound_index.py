@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from ..core.config import settings
+from ..schemas.freesound import FreesoundSound
+
+
+class SoundIndex:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._sounds: OrderedDict[int, FreesoundSound] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def put(self, sound: FreesoundSound) -> None:
+        if self.max_entries <= 0:
+            return
+        sid = int(sound.id)
+        self._sounds[sid] = sound
+        self._sounds.move_to_end(sid)
+        while len(self._sounds) > self.max_entries:
+            self._sounds.popitem(last=False)
+
+    def put_many(self, sounds: list[FreesoundSound]) -> None:
+        for sound in sounds:
+            self.put(sound)
+
+    def get(self, sound_id: int) -> FreesoundSound | None:
+        sound = self._sounds.get(int(sound_id))
+        if sound is None:
+            self._misses += 1
+            return None
+        self._sounds.move_to_end(int(sound_id))
+        self._hits += 1
+        return sound
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._sounds),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": (self._hits / lookups) if lookups else 0.0,
+        }
+
+
+sound_index = SoundIndex(max_entries=settings.sound_index_max_entries)
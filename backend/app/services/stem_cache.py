@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..core.config import settings
+from ..schemas.export import TimelineClip, TimelineProject
+from .mix_engine import MixPlan, StemMix, clip_source, load_sources, plan_mix, timeline_duration_s
+
+
+STEM_SUFFIX = ".f32"
+_STEM_VERSION = 3
+
+
+@dataclass(frozen=True)
+class Stem:
+    track_id: str
+    key: str
+    path: str
+    pcm: np.ndarray
+
+
+def track_project(project: TimelineProject, track_id: str) -> TimelineProject:
+    return project.model_copy(
+        update={
+            "tracks": [t for t in project.tracks if t.id == track_id],
+            "clips": [c for c in project.clips if c.track_id == track_id],
+        }
+    )
+
+
+def audible_track_ids(project: TimelineProject) -> list[str]:
+    ids = {c.track_id for c in project.clips if clip_source(c) is not None}
+    return list(dict.fromkeys(t.id for t in project.tracks if t.id in ids))
+
+
+def _clip_fingerprint(clip: TimelineClip) -> dict:
+    fp = clip.model_dump(exclude={"name", "preview_url"})
+    src = clip_source(clip)
+    fp["preview"] = None if src is None else [src.sound_id, src.quality, src.fmt]
+    return fp
+
+
+def stem_key(project: TimelineProject, track_id: str, sample_rate: int, channels: int) -> str:
+    track = next((t for t in project.tracks if t.id == track_id), None)
+    if track is None:
+        raise ValueError(f"Faixa não encontrada: {track_id}.")
+    clips = sorted(
+        (_clip_fingerprint(c) for c in project.clips if c.track_id == track_id),
+        key=lambda c: (c["start_s"], c["id"]),
+    )
+    fp = {
+        "sample_rate": int(sample_rate),
+        "channels": 1 if int(channels) == 1 else 2,
+        "gain": track.gain,
+        "pan": track.pan,
+        "transition_s": project.mix.transition_s,
+        "clips": clips,
+    }
+    raw = json.dumps([_STEM_VERSION, fp], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class StemCache:
+    def __init__(self, root_dir: str, max_bytes: int) -> None:
+        self.root_dir = root_dir
+        self.max_bytes = max(0, int(max_bytes))
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._pins: dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+        os.makedirs(self.root_dir, exist_ok=True)
+        for name in os.listdir(self.root_dir):
+            if name.endswith(".part"):
+                os.remove(os.path.join(self.root_dir, name))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}{STEM_SUFFIX}")
+
+    def pin(self, key: str) -> None:
+        path = self._path(key)
+        with self._lock:
+            self._pins[path] = self._pins.get(path, 0) + 1
+
+    def unpin(self, keys: list[str]) -> None:
+        with self._lock:
+            for key in keys:
+                path = self._path(key)
+                count = self._pins.get(path, 0) - 1
+                if count > 0:
+                    self._pins[path] = count
+                else:
+                    self._pins.pop(path, None)
+
+    def load(self, key: str, channels: int) -> np.ndarray | None:
+        path = self._path(key)
+        try:
+            pcm = np.memmap(path, dtype="<f4", mode="r")
+        except (OSError, ValueError):
+            return None
+        if pcm.shape[0] % channels:
+            return None
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+        return pcm.reshape(-1, channels)
+
+    def _store(self, key: str, plan: MixPlan) -> np.ndarray | None:
+        tmp_path = os.path.join(self.root_dir, f".{uuid.uuid4().hex}.part")
+        try:
+            with open(tmp_path, "wb") as f:
+                for block in plan.blocks():
+                    f.write(np.ascontiguousarray(block, dtype="<f4").tobytes())
+            os.replace(tmp_path, self._path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        pcm = self.load(key, plan.channels)
+        self._evict(keep=self._path(key))
+        return pcm
+
+    async def _build(
+        self,
+        key: str,
+        project: TimelineProject,
+        *,
+        sample_rate: int,
+        channels: int,
+        token: str | None,
+    ) -> np.ndarray | None:
+        sources = await load_sources(project, sample_rate=sample_rate, token=token)
+        plan = MixPlan(project, sources, sample_rate=sample_rate, channels=channels)
+        if not plan.voices:
+            return None
+        return await asyncio.to_thread(self._store, key, plan)
+
+    async def ensure(
+        self,
+        project: TimelineProject,
+        track_id: str,
+        *,
+        sample_rate: int,
+        channels: int,
+        token: str | None = None,
+        pin: bool = False,
+    ) -> Stem | None:
+        channels = 1 if int(channels) == 1 else 2
+        key = stem_key(project, track_id, sample_rate, channels)
+        if pin:
+            self.pin(key)
+        try:
+            pcm = await self._ensure_pcm(key, project, track_id, sample_rate=sample_rate, channels=channels, token=token)
+        except BaseException:
+            if pin:
+                self.unpin([key])
+            raise
+        if pcm is None:
+            if pin:
+                self.unpin([key])
+            return None
+        return Stem(track_id=track_id, key=key, path=self._path(key), pcm=pcm)
+
+    async def _ensure_pcm(
+        self,
+        key: str,
+        project: TimelineProject,
+        track_id: str,
+        *,
+        sample_rate: int,
+        channels: int,
+        token: str | None,
+    ) -> np.ndarray | None:
+        pcm = self.load(key, channels)
+        if pcm is None:
+            task = self._inflight.get(key)
+            if task is None:
+                self._misses += 1
+                task = asyncio.ensure_future(
+                    self._build(
+                        key,
+                        track_project(project, track_id),
+                        sample_rate=sample_rate,
+                        channels=channels,
+                        token=token,
+                    )
+                )
+                self._inflight[key] = task
+                task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+            return await asyncio.shield(task)
+        self._hits += 1
+        return pcm
+
+    async def stems(
+        self,
+        project: TimelineProject,
+        *,
+        sample_rate: int,
+        channels: int,
+        track_ids: list[str] | None = None,
+        token: str | None = None,
+        pin: bool = False,
+    ) -> list[Stem]:
+        ids = [tid for tid in audible_track_ids(project) if track_ids is None or tid in track_ids]
+        results = await asyncio.gather(
+            *(self.ensure(project, tid, sample_rate=sample_rate, channels=channels, token=token, pin=pin) for tid in ids),
+            return_exceptions=True,
+        )
+        stems = [r for r in results if isinstance(r, Stem)]
+        error = next((r for r in results if isinstance(r, BaseException)), None)
+        if error is not None:
+            if pin:
+                self.unpin([stem.key for stem in stems])
+            raise error
+        return stems
+
+    def _evict(self, keep: str | None = None) -> None:
+        with self._lock:
+            entries: list[tuple[float, int, str]] = []
+            total = 0
+            for name in os.listdir(self.root_dir):
+                if not name.endswith(STEM_SUFFIX):
+                    continue
+                path = os.path.join(self.root_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                total += st.st_size
+                if path != keep and path not in self._pins:
+                    entries.append((st.st_atime, st.st_size, path))
+            entries.sort()
+            for _atime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+    def stats(self) -> dict:
+        files = [n for n in os.listdir(self.root_dir) if n.endswith(STEM_SUFFIX)]
+        total = 0
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(self.root_dir, name))
+            except OSError:
+                pass
+        return {
+            "entries": len(files),
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "in_flight": len(self._inflight),
+            "pinned": len(self._pins),
+        }
+
+    async def aclose(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def plan_stem_mix(
+    project: TimelineProject,
+    *,
+    sample_rate: int,
+    channels: int,
+    track_id: str | None = None,
+    token: str | None = None,
+) -> MixPlan | StemMix:
+    if not stem_cache.enabled:
+        return await plan_mix(project, sample_rate=sample_rate, channels=channels, track_id=track_id, token=token)
+    stems = await stem_cache.stems(
+        project,
+        sample_rate=sample_rate,
+        channels=channels,
+        track_ids=None if track_id is None else [track_id],
+        token=token,
+    )
+    if not stems:
+        raise ValueError("Nada para exportar (sem clips com preview).")
+    return StemMix(
+        [stem.pcm for stem in stems],
+        sample_rate=sample_rate,
+        channels=channels,
+        duration_s=timeline_duration_s(project),
+    )
+
+
+stem_cache = StemCache(settings.stem_cache_dir, max_bytes=settings.stem_cache_max_mb * 1024 * 1024)
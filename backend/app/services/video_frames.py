@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+import uuid
+
+import cv2
+import numpy as np
+
+from ..core.config import settings
+from ..storage.temp_files import StoredFile, TempFileStore, video_store
+from .video_proxy import VideoProxyManager, video_proxies
+from .video_seek import SeekIndex, ensure_seek_index, seek_frame
+
+
+def _frame_index(index: SeekIndex, t_s: float) -> int:
+    last = max(0, index.frames - 1)
+    return max(0, min(last, int(max(0.0, t_s) * index.fps)))
+
+
+def _resize(img: np.ndarray, height: int) -> np.ndarray:
+    h, w = img.shape[:2]
+    width = max(2, int(round(w * height / max(1, h))) // 2 * 2)
+    interp = cv2.INTER_AREA if height < h else cv2.INTER_LINEAR
+    return cv2.resize(img, (width, height), interpolation=interp)
+
+
+def read_frames(video_path: str, index: SeekIndex, frames: list[int]) -> dict[int, np.ndarray]:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Não foi possível abrir o vídeo.")
+    out: dict[int, np.ndarray] = {}
+    position: int | None = None
+    last: np.ndarray | None = None
+    try:
+        for frame in sorted(set(frames)):
+            position = seek_frame(cap, frame, index, position)
+            ok, img = cap.read()
+            if ok:
+                position += 1
+                last = img
+            elif last is not None:
+                img = last
+            else:
+                raise RuntimeError("Não foi possível ler o quadro do vídeo.")
+            out[frame] = img
+    finally:
+        cap.release()
+    return out
+
+
+class VideoFrameRenderer:
+    def __init__(self, store: TempFileStore, proxies: VideoProxyManager, jpeg_quality: int) -> None:
+        self.store = store
+        self.proxies = proxies
+        self.jpeg_quality = max(10, min(100, int(jpeg_quality)))
+
+    def _source(self, stored: StoredFile, height: int) -> str:
+        proxy = self.proxies.get(stored.file_id)
+        if proxy is not None and proxy.ready and proxy.height >= height:
+            return proxy.path
+        return stored.path
+
+    def _write_jpeg(self, path: str, img: np.ndarray) -> None:
+        ok, buf = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        if not ok:
+            raise RuntimeError("Falha ao gerar a miniatura.")
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(buf.tobytes())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def frame(self, stored: StoredFile, t_s: float, height: int) -> str:
+        video_path = self._source(stored, height)
+        index = ensure_seek_index(video_path)
+        frame = _frame_index(index, t_s)
+        path = self.store.derived_path(stored.file_id, f"frame.{height}.{frame}.jpg")
+        if not os.path.exists(path):
+            img = read_frames(video_path, index, [frame])[frame]
+            self._write_jpeg(path, _resize(img, height))
+        return path
+
+    def filmstrip(
+        self,
+        stored: StoredFile,
+        start_s: float,
+        duration_s: float | None,
+        count: int,
+        height: int,
+    ) -> tuple[str, list[float]]:
+        video_path = self._source(stored, height)
+        index = ensure_seek_index(video_path)
+        first = _frame_index(index, start_s)
+        if duration_s is None:
+            end = max(first + 1, index.frames)
+        else:
+            end = max(first + 1, min(index.frames, int((start_s + duration_s) * index.fps)))
+        count = max(1, min(int(count), end - first))
+        frames = [first + ((end - first) * (2 * i + 1)) // (2 * count) for i in range(count)]
+        times = [f / index.fps for f in frames]
+        path = self.store.derived_path(stored.file_id, f"strip.{height}.{count}.{first}-{end}.jpg")
+        if not os.path.exists(path):
+            imgs = read_frames(video_path, index, frames)
+            self._write_jpeg(path, np.hstack([_resize(imgs[f], height) for f in frames]))
+        return path, times
+
+
+video_frames = VideoFrameRenderer(video_store, video_proxies, jpeg_quality=settings.frame_jpeg_quality)
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 from dataclasses import dataclass
 
 import cv2
 import numpy as np
 
+from .motion_scorers import create_scorer
+from .video_seek import SeekIndex, load_seek_index, seek_frame
+
+
+_PROGRESS_EVERY_FRAMES = 15
+
+COARSE_FINE_MODEL = "coarse_fine"
+_COARSE_SAMPLES_PER_S = 10.0
+_COARSE_SCALE = 0.5
+_COARSE_MAX_WIDTH = 160
+_COARSE_CANDIDATES_PER_EVENT = 3
+
+SCORE_WEIGHTS = (0.5, 0.3, 0.2)
+
 
 @dataclass(frozen=True)
 class MotionEvent:
@@ -12,121 +27,305 @@ class MotionEvent:
     score: float
 
 
-def _peak_pick(values: list[float], max_events: int) -> list[int]:
-    if not values:
-        return []
-    idxs = np.argsort(values)[::-1].tolist()
-    picked: list[int] = []
-    min_dist = max(3, int(len(values) * 0.02))
-    for i in idxs:
-        if values[i] <= 0:
-            break
-        if all(abs(i - p) >= min_dist for p in picked):
-            picked.append(i)
-            if len(picked) >= max_events:
-                break
-    return sorted(picked)
+class MotionAnalysisCancelled(RuntimeError):
+    pass
 
 
-def analyze_motion_events(
-    video_path: str,
-    start_s: float,
-    duration_s: float | None,
-    max_events: int,
-    *,
-    frame_analysis: bool = True,
-    model: str = "default",
-    smooth_win: int = 5,
-    blur_ksize: int = 7,
-    roi_x: float = 0.10,
-    roi_y: float = 0.55,
-    roi_w: float = 0.80,
-    roi_h: float = 0.43,
-) -> list[MotionEvent]:
+@dataclass(frozen=True)
+class MotionFeatures:
+    times: np.ndarray
+    diff: np.ndarray
+    flow: np.ndarray
+    cell: np.ndarray
+
+    @property
+    def frames(self) -> int:
+        return int(self.times.shape[0])
+
+    def to_array(self) -> np.ndarray:
+        return np.stack([self.times, self.diff, self.flow, self.cell]).astype(np.float64, copy=False)
+
+    @classmethod
+    def from_array(cls, arr: np.ndarray) -> MotionFeatures:
+        return cls(times=arr[0], diff=arr[1], flow=arr[2], cell=arr[3])
+
+
+def _open_video(video_path: str) -> tuple[cv2.VideoCapture, float, int]:
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise RuntimeError("Não foi possível abrir o vídeo.")
-
     fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    return cap, fps, total_frames
+
+
+def _frame_range(fps: float, total_frames: int, start_s: float, duration_s: float | None) -> tuple[int, int]:
     start_frame = int(start_s * fps)
     end_frame = total_frames
     if duration_s is not None:
         end_frame = min(total_frames, int((start_s + duration_s) * fps))
+    return start_frame, end_frame
 
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
 
-    prev_gray: np.ndarray | None = None
-    scores: list[float] = []
-    frame_times: list[float] = []
-    flow_scores: list[float] = []
-    cell_scores: list[float] = []
+def _roi_bounds(
+    width: int, height: int, roi_x: float, roi_y: float, roi_w: float, roi_h: float
+) -> tuple[slice, slice]:
+    rx = max(0.0, min(1.0, roi_x))
+    ry = max(0.0, min(1.0, roi_y))
+    rw = max(0.0, min(1.0, roi_w))
+    rh = max(0.0, min(1.0, roi_h))
+    x0 = int(width * rx)
+    y0 = int(height * ry)
+    x1 = int(width * min(1.0, rx + rw))
+    y1 = int(height * min(1.0, ry + rh))
+    return slice(y0, y1), slice(x0, x1)
 
-    frame_idx = start_frame
+
+class _RoiCropper:
+    def __init__(self, rois: list[tuple[float, float, float, float]]) -> None:
+        self._rois = rois
+        self._union: tuple[slice, slice] | None = None
+        self._bounds: list[tuple[slice, slice]] = []
+
+    def _plan(self, frame: np.ndarray) -> None:
+        h, w = frame.shape[:2]
+        bounds = [_roi_bounds(w, h, *roi) for roi in self._rois]
+        y0 = min(ys.start for ys, _xs in bounds)
+        y1 = max(ys.stop for ys, _xs in bounds)
+        x0 = min(xs.start for _ys, xs in bounds)
+        x1 = max(xs.stop for _ys, xs in bounds)
+        self._union = (slice(y0, y1), slice(x0, x1))
+        self._bounds = [
+            (slice(ys.start - y0, ys.stop - y0), slice(xs.start - x0, xs.stop - x0)) for ys, xs in bounds
+        ]
+
+    def grays(self, frame: np.ndarray) -> list[np.ndarray]:
+        if self._union is None:
+            self._plan(frame)
+        gray = cv2.cvtColor(frame[self._union], cv2.COLOR_BGR2GRAY)
+        return [gray[b] for b in self._bounds]
+
+
+def _odd_ksize(blur_ksize: int) -> int:
+    k = max(1, int(blur_ksize))
+    if k % 2 == 0:
+        k += 1
+    return k
+
+
+def _scan_features(
+    cap: cv2.VideoCapture,
+    fps: float,
+    origin_frame: int,
+    first_frame: int,
+    end_frame: int,
+    *,
+    frame_analysis: bool,
+    blur_ksize: int,
+    rois: list[tuple[float, float, float, float]],
+    scorer: str | None = None,
+    on_frame: Callable[[int], None] | None = None,
+    seek_index: SeekIndex | None = None,
+) -> list[MotionFeatures]:
+    seek_frame(cap, first_frame, seek_index)
+
+    capacity = max(0, end_frame - first_frame)
+    times = np.zeros(capacity, dtype=np.float64)
+    rows = np.zeros((len(rois), 3, capacity), dtype=np.float64)
+    n = 0
+    cropper = _RoiCropper(rois)
+    scorers = [create_scorer(scorer, frame_analysis) for _roi in rois]
+    ksize = (_odd_ksize(blur_ksize),) * 2
+
+    frame_idx = first_frame
     while frame_idx < end_frame:
+        if on_frame:
+            on_frame(frame_idx - first_frame)
         ok, frame = cap.read()
         if not ok:
             break
 
-        h, w = frame.shape[:2]
-        rx = max(0.0, min(1.0, roi_x))
-        ry = max(0.0, min(1.0, roi_y))
-        rw = max(0.0, min(1.0, roi_w))
-        rh = max(0.0, min(1.0, roi_h))
-        x0 = int(w * rx)
-        y0 = int(h * ry)
-        x1 = int(w * min(1.0, rx + rw))
-        y1 = int(h * min(1.0, ry + rh))
-        roi = frame[y0:y1, x0:x1]
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        k = max(1, int(blur_ksize))
-        if k % 2 == 0:
-            k += 1
-        if frame_analysis:
-            gray = cv2.GaussianBlur(gray, (k, k), 0)
-
-        if prev_gray is not None:
-            diff = cv2.absdiff(gray, prev_gray)
-            score = float(np.mean(diff))
-            scores.append(score)
-            frame_times.append((frame_idx - start_frame) / fps)
+        scored = False
+        for r, (gray, motion) in enumerate(zip(cropper.grays(frame), scorers)):
             if frame_analysis:
-                flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
-                mag, _ang = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-                flow_scores.append(float(np.mean(mag)))
-                gh, gw = gray.shape[:2]
-                grid_h, grid_w = 3, 3
-                ch = gh // grid_h
-                cw = gw // grid_w
-                cells = []
-                for gy in range(grid_h):
-                    for gx in range(grid_w):
-                        y0c = gy * ch
-                        x0c = gx * cw
-                        y1c = min(gh, (gy + 1) * ch)
-                        x1c = min(gw, (gx + 1) * cw)
-                        cells.append(float(np.mean(mag[y0c:y1c, x0c:x1c])))
-                cell_scores.append(float(np.max(cells)))
-
-        prev_gray = gray
+                gray = cv2.GaussianBlur(gray, ksize, 0)
+            scores = motion.update(gray)
+            if scores is not None:
+                rows[r, :, n] = scores
+                scored = True
+        if scored:
+            times[n] = (frame_idx - origin_frame) / fps
+            n += 1
         frame_idx += 1
 
+    return [
+        MotionFeatures(times=times[:n], diff=rows[r, 0, :n], flow=rows[r, 1, :n], cell=rows[r, 2, :n])
+        for r in range(len(rois))
+    ]
+
+
+def probe_video(video_path: str) -> tuple[float, int]:
+    cap, fps, total_frames = _open_video(video_path)
     cap.release()
+    return fps, total_frames
+
+
+def frame_range(video_path: str, start_s: float, duration_s: float | None) -> tuple[float, int, int]:
+    fps, total_frames = probe_video(video_path)
+    start_frame, end_frame = _frame_range(fps, total_frames, start_s, duration_s)
+    return fps, start_frame, end_frame
+
+
+def plan_shards(start_frame: int, end_frame: int, shards: int, min_frames: int) -> list[tuple[int, int]]:
+    frames = max(0, end_frame - start_frame)
+    n = max(1, min(int(shards), frames // max(1, int(min_frames))))
+    bounds = [start_frame + (frames * i) // n for i in range(n + 1)]
+    return [
+        (bounds[i] - 1 if i > 0 else bounds[i], bounds[i + 1])
+        for i in range(n)
+    ]
+
+
+def extract_roi_shard(
+    video_path: str,
+    origin_frame: int,
+    first_frame: int,
+    end_frame: int,
+    rois: list[tuple[float, float, float, float]],
+    *,
+    frame_analysis: bool = True,
+    blur_ksize: int = 7,
+    scorer: str | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> list[MotionFeatures]:
+    cap, fps, _total_frames = _open_video(video_path)
+    frames_total = max(0, end_frame - first_frame)
+
+    def on_frame(done: int) -> None:
+        if done % _PROGRESS_EVERY_FRAMES == 0:
+            progress(done, frames_total)
+
+    if progress:
+        progress(0, frames_total)
+    try:
+        features = _scan_features(
+            cap,
+            fps,
+            origin_frame,
+            first_frame,
+            end_frame,
+            frame_analysis=frame_analysis,
+            blur_ksize=blur_ksize,
+            rois=[tuple(roi) for roi in rois],
+            scorer=scorer,
+            on_frame=on_frame if progress else None,
+            seek_index=load_seek_index(video_path),
+        )
+    finally:
+        cap.release()
+    if progress:
+        progress(frames_total, frames_total)
+    return features
+
+
+def extract_feature_shard(
+    video_path: str,
+    origin_frame: int,
+    first_frame: int,
+    end_frame: int,
+    *,
+    frame_analysis: bool = True,
+    blur_ksize: int = 7,
+    roi_x: float = 0.10,
+    roi_y: float = 0.55,
+    roi_w: float = 0.80,
+    roi_h: float = 0.43,
+    scorer: str | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> MotionFeatures:
+    return extract_roi_shard(
+        video_path,
+        origin_frame,
+        first_frame,
+        end_frame,
+        [(roi_x, roi_y, roi_w, roi_h)],
+        frame_analysis=frame_analysis,
+        blur_ksize=blur_ksize,
+        scorer=scorer,
+        progress=progress,
+    )[0]
+
+
+def merge_features(parts: list[MotionFeatures]) -> MotionFeatures:
+    if len(parts) == 1:
+        return parts[0]
+    diff = np.concatenate([p.diff for p in parts])
+    return MotionFeatures(
+        times=np.concatenate([p.times for p in parts]),
+        diff=diff,
+        flow=np.concatenate([p.flow for p in parts]),
+        cell=np.concatenate([p.cell for p in parts]),
+    )
+
+
+def extract_roi_features(
+    video_path: str,
+    start_s: float,
+    duration_s: float | None,
+    rois: list[tuple[float, float, float, float]],
+    *,
+    frame_analysis: bool = True,
+    blur_ksize: int = 7,
+    scorer: str | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> list[MotionFeatures]:
+    _fps, start_frame, end_frame = frame_range(video_path, start_s, duration_s)
+    return extract_roi_shard(
+        video_path,
+        start_frame,
+        start_frame,
+        end_frame,
+        rois,
+        frame_analysis=frame_analysis,
+        blur_ksize=blur_ksize,
+        scorer=scorer,
+        progress=progress,
+    )
+
+
+def extract_motion_features(
+    video_path: str,
+    start_s: float,
+    duration_s: float | None,
+    *,
+    frame_analysis: bool = True,
+    blur_ksize: int = 7,
+    roi_x: float = 0.10,
+    roi_y: float = 0.55,
+    roi_w: float = 0.80,
+    roi_h: float = 0.43,
+    scorer: str | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> MotionFeatures:
+    return extract_roi_features(
+        video_path,
+        start_s,
+        duration_s,
+        [(roi_x, roi_y, roi_w, roi_h)],
+        frame_analysis=frame_analysis,
+        blur_ksize=blur_ksize,
+        scorer=scorer,
+        progress=progress,
+    )[0]
 
-    if not scores:
-        return []
 
-    arr_a = np.array(scores, dtype=np.float32)
-    arr_b = np.array(flow_scores if flow_scores else scores, dtype=np.float32)
-    arr_c = np.array(cell_scores if cell_scores else scores, dtype=np.float32)
-    def _norm(x: np.ndarray) -> np.ndarray:
-        mn = float(np.min(x))
-        rg = float(np.ptp(x))
-        return (x - mn) / (rg + 1e-6)
-    a = _norm(arr_a)
-    b = _norm(arr_b)
-    c = _norm(arr_c)
-    comb = (0.5 * a + 0.3 * b + 0.2 * c)
+def _norm(x: np.ndarray) -> np.ndarray:
+    mn = float(np.min(x))
+    rg = float(np.ptp(x))
+    return (x - mn) / (rg + 1e-6)
+
+
+def _smooth_window(model: str, smooth_win: int) -> int:
     win = max(1, int(smooth_win))
     if model == "high":
         win = max(win, 7)
@@ -134,35 +333,285 @@ def analyze_motion_events(
         win = max(1, min(win, 3))
     if win % 2 == 0:
         win += 1
+    return win
+
+
+def _min_distance(model: str, n: int) -> int:
+    md = max(3, int(n * 0.02))
+    if model == "high":
+        md = max(2, int(n * 0.015))
+    elif model == "fast":
+        md = max(4, int(n * 0.03))
+    return md
+
+
+def _nms(values: np.ndarray, positions: np.ndarray, k: int, md: int) -> list[int]:
+    if not values.size or k <= 0:
+        return []
+    order = np.argsort(values)[::-1]
+    order = order[values[order] > 0]
+    free = np.ones(values.shape[0], dtype=bool)
+    picked: list[int] = []
+    for i in order.tolist():
+        if not free[i]:
+            continue
+        picked.append(i)
+        if len(picked) >= k:
+            break
+        free &= np.abs(positions - positions[i]) >= md
+    return sorted(picked)
+
+
+def _combined_score(
+    a: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+    win: int,
+    extra: np.ndarray | None = None,
+    extra_weight: float = 0.0,
+    weights: tuple[float, float, float] = SCORE_WEIGHTS,
+) -> tuple[np.ndarray, np.ndarray]:
+    wa, wb, wc = weights
+    comb = (wa * a + wb * b + wc * c)
+    if extra is not None and extra_weight > 0:
+        w = min(1.0, float(extra_weight))
+        comb = (1.0 - w) * comb + w * extra
     kernel = np.ones(win, dtype=np.float32) / float(win)
-    smooth = np.convolve(comb, kernel, mode="same").tolist()
+    smooth = np.convolve(comb, kernel, mode="same").astype(np.float64)
     onset = np.convolve(a, [1, -1], mode="same")
+    return smooth, onset
+
+
+def events_from_features(
+    features: MotionFeatures,
+    max_events: int,
+    *,
+    model: str = "default",
+    smooth_win: int = 5,
+    extra: np.ndarray | None = None,
+    extra_weight: float = 0.0,
+    weights: tuple[float, float, float] | None = None,
+) -> list[MotionEvent]:
+    if not features.frames:
+        return []
+    frame_times = features.times
+
+    a = _norm(np.asarray(features.diff, dtype=np.float32))
+    b = _norm(np.asarray(features.flow, dtype=np.float32))
+    c = _norm(np.asarray(features.cell, dtype=np.float32))
+    e = _norm(np.asarray(extra, dtype=np.float32)) if extra is not None and extra_weight > 0 else None
+    smooth, onset = _combined_score(
+        a, b, c, _smooth_window(model, smooth_win), e, extra_weight, tuple(weights or SCORE_WEIGHTS)
+    )
     if onset.size:
         i0 = int(np.argmax(onset))
         if 0 <= i0 < len(smooth):
             smooth[i0] = max(smooth[i0], float(a[i0]) + 0.5)
 
-    md = max(3, int(len(smooth) * 0.02))
-    if model == "high":
-        md = max(2, int(len(smooth) * 0.015))
-    elif model == "fast":
-        md = max(4, int(len(smooth) * 0.03))
-    def _pick(values: list[float], k: int) -> list[int]:
-        if not values:
-            return []
-        idxs = np.argsort(values)[::-1].tolist()
-        picked: list[int] = []
-        for i in idxs:
-            if values[i] <= 0:
+    md = _min_distance(model, len(smooth))
+    picked = _nms(smooth, np.arange(len(smooth)), max_events, md)
+    return [MotionEvent(t_s=float(frame_times[i]), score=float(smooth[i])) for i in picked]
+
+
+def _coarse_scan(
+    cap: cv2.VideoCapture,
+    start_frame: int,
+    end_frame: int,
+    stride: int,
+    *,
+    roi: tuple[float, float, float, float],
+    on_frame: Callable[[int], None] | None = None,
+    seek_index: SeekIndex | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    seek_frame(cap, start_frame, seek_index)
+    cropper = _RoiCropper([roi])
+    prev_gray: np.ndarray | None = None
+    positions: list[int] = []
+    scores: list[float] = []
+
+    frame_idx = start_frame
+    while frame_idx < end_frame:
+        if on_frame:
+            on_frame(frame_idx - start_frame)
+        if (frame_idx - start_frame) % stride:
+            if not cap.grab():
                 break
-            if all(abs(i - p) >= md for p in picked):
-                picked.append(i)
-                if len(picked) >= k:
-                    break
-        return sorted(picked)
-    picked = _pick(smooth, max_events)
-    events: list[MotionEvent] = []
-    for i in picked:
-        events.append(MotionEvent(t_s=float(frame_times[i]), score=float(smooth[i])))
-
-    return events
+            frame_idx += 1
+            continue
+        ok, frame = cap.read()
+        if not ok:
+            break
+        gray = cropper.grays(frame)[0]
+        scale = min(_COARSE_SCALE, _COARSE_MAX_WIDTH / max(1, gray.shape[1]))
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
+        if prev_gray is not None:
+            positions.append(frame_idx)
+            scores.append(float(np.mean(cv2.absdiff(gray, prev_gray))))
+        prev_gray = gray
+        frame_idx += 1
+    return np.array(positions, dtype=np.int64), np.array(scores, dtype=np.float32)
+
+
+def _merge_windows(windows: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for a, b in sorted(windows):
+        if merged and a <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+        else:
+            merged.append((a, b))
+    return merged
+
+
+def analyze_motion_coarse_fine(
+    video_path: str,
+    start_s: float,
+    duration_s: float | None,
+    max_events: int,
+    *,
+    frame_analysis: bool = True,
+    smooth_win: int = 5,
+    blur_ksize: int = 7,
+    roi_x: float = 0.10,
+    roi_y: float = 0.55,
+    roi_w: float = 0.80,
+    roi_h: float = 0.43,
+    scorer: str | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> list[MotionEvent]:
+    cap, fps, total_frames = _open_video(video_path)
+    start_frame, end_frame = _frame_range(fps, total_frames, start_s, duration_s)
+    roi = (roi_x, roi_y, roi_w, roi_h)
+    seek_index = load_seek_index(video_path)
+    frames_range = max(0, end_frame - start_frame)
+    stride = max(2, int(round(fps / _COARSE_SAMPLES_PER_S)))
+    win = _smooth_window("default", smooth_win)
+    md = _min_distance("default", max(0, frames_range - 1))
+    done = 0
+    frames_total = frames_range
+
+    def on_frame(n: int) -> None:
+        if n % _PROGRESS_EVERY_FRAMES == 0:
+            progress(done + n, frames_total)
+
+    try:
+        if progress:
+            progress(0, frames_total)
+        positions, scores = _coarse_scan(
+            cap,
+            start_frame,
+            end_frame,
+            stride,
+            roi=roi,
+            on_frame=on_frame if progress else None,
+            seek_index=seek_index,
+        )
+        if not scores.size:
+            return []
+        coarse = np.convolve(_norm(scores), np.ones(3, dtype=np.float32) / 3.0, mode="same")
+        candidates = _nms(coarse, positions, max_events * _COARSE_CANDIDATES_PER_EVENT, md)
+        half = max(stride, win)
+        windows = _merge_windows([
+            (max(start_frame, int(positions[i]) - stride - half - 1), min(end_frame, int(positions[i]) + half + 1))
+            for i in candidates
+        ])
+
+        done = frames_range
+        frames_total = frames_range + sum(b - a for a, b in windows)
+        parts: list[MotionFeatures] = []
+        for a, b in windows:
+            parts.append(_scan_features(
+                cap,
+                fps,
+                start_frame,
+                a,
+                b,
+                frame_analysis=frame_analysis,
+                blur_ksize=blur_ksize,
+                rois=[roi],
+                scorer=scorer,
+                on_frame=on_frame if progress else None,
+                seek_index=seek_index,
+            )[0])
+            done += b - a
+    finally:
+        cap.release()
+    if progress:
+        progress(frames_total, frames_total)
+
+    parts = [part for part in parts if part.frames]
+    if not parts:
+        return []
+    a_all = _norm(np.concatenate([p.diff for p in parts]).astype(np.float32))
+    b_all = _norm(np.concatenate([p.flow for p in parts]).astype(np.float32))
+    c_all = _norm(np.concatenate([p.cell for p in parts]).astype(np.float32))
+
+    smooth_parts: list[np.ndarray] = []
+    onset_best = (-np.inf, -1)
+    offset = 0
+    for part in parts:
+        n = part.frames
+        a = a_all[offset:offset + n]
+        s, onset = _combined_score(a, b_all[offset:offset + n], c_all[offset:offset + n], win)
+        if onset.size and float(np.max(onset)) > onset_best[0]:
+            onset_best = (float(np.max(onset)), offset + int(np.argmax(onset)))
+        smooth_parts.append(s)
+        offset += n
+    smooth = np.concatenate(smooth_parts)
+    i0 = onset_best[1]
+    if 0 <= i0 < len(smooth):
+        smooth[i0] = max(smooth[i0], float(a_all[i0]) + 0.5)
+
+    times = np.concatenate([p.times for p in parts])
+    frame_pos = np.rint(times * fps).astype(np.int64)
+    picked = _nms(smooth, frame_pos, max_events, md)
+    return [MotionEvent(t_s=float(times[i]), score=float(smooth[i])) for i in picked]
+
+
+def analyze_motion_events(
+    video_path: str,
+    start_s: float,
+    duration_s: float | None,
+    max_events: int,
+    *,
+    frame_analysis: bool = True,
+    model: str = "default",
+    smooth_win: int = 5,
+    blur_ksize: int = 7,
+    roi_x: float = 0.10,
+    roi_y: float = 0.55,
+    roi_w: float = 0.80,
+    roi_h: float = 0.43,
+    scorer: str | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> list[MotionEvent]:
+    if model == COARSE_FINE_MODEL:
+        return analyze_motion_coarse_fine(
+            video_path,
+            start_s,
+            duration_s,
+            max_events,
+            frame_analysis=frame_analysis,
+            smooth_win=smooth_win,
+            blur_ksize=blur_ksize,
+            roi_x=roi_x,
+            roi_y=roi_y,
+            roi_w=roi_w,
+            roi_h=roi_h,
+            scorer=scorer,
+            progress=progress,
+        )
+    features = extract_motion_features(
+        video_path,
+        start_s,
+        duration_s,
+        frame_analysis=frame_analysis,
+        blur_ksize=blur_ksize,
+        roi_x=roi_x,
+        roi_y=roi_y,
+        roi_w=roi_w,
+        roi_h=roi_h,
+        scorer=scorer,
+        progress=progress,
+    )
+    return events_from_features(features, max_events, model=model, smooth_win=smooth_win)
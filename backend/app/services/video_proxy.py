@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+
+import cv2
+import imageio_ffmpeg
+
+from ..core.config import settings
+from ..storage.temp_files import StoredFile, TempFileStore, video_store
+from .video_seek import ensure_seek_index
+
+
+logger = logging.getLogger(__name__)
+
+PROXY_NAME = "proxy.mp4"
+
+
+@dataclass
+class VideoProxy:
+    video_id: str
+    status: str = "pending"
+    path: str | None = None
+    width: int = 0
+    height: int = 0
+    error: str | None = None
+    elapsed_s: float = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready" and bool(self.path) and os.path.exists(self.path)
+
+
+def _video_size(video_path: str) -> tuple[int, int]:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError("Não consegui abrir o vídeo.")
+        return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    finally:
+        cap.release()
+
+
+def proxy_command(src: str, dst: str, height: int, gop: int) -> list[str]:
+    return [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-nostdin",
+        "-y",
+        "-i",
+        src,
+        "-map",
+        "0:v:0",
+        "-an",
+        "-sn",
+        "-vf",
+        f"scale=-2:{int(height)}",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "ultrafast",
+        "-crf",
+        "28",
+        "-pix_fmt",
+        "yuv420p",
+        "-g",
+        str(max(1, int(gop))),
+        "-bf",
+        "0",
+        "-movflags",
+        "+faststart",
+        "-f",
+        "mp4",
+        dst,
+    ]
+
+
+class VideoProxyManager:
+    def __init__(self, store: TempFileStore, *, enabled: bool, height: int, gop: int, max_concurrency: int) -> None:
+        self.store = store
+        self.enabled = bool(enabled)
+        self.height = max(16, int(height)) // 2 * 2
+        self.gop = max(1, int(gop))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._sem: asyncio.Semaphore | None = None
+        self._proxies: dict[str, VideoProxy] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._procs: dict[str, subprocess.Popen] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, stored: StoredFile) -> VideoProxy:
+        proxy = self.get(stored.file_id)
+        if proxy is not None and (proxy.status in ("pending", "running", "skipped") or proxy.ready):
+            return proxy
+        proxy = VideoProxy(video_id=stored.file_id)
+        self._proxies[stored.file_id] = proxy
+        if not self.enabled:
+            proxy.status = "disabled"
+            return proxy
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        task = asyncio.ensure_future(self._build(proxy))
+        self._tasks[stored.file_id] = task
+        task.add_done_callback(lambda _t, k=stored.file_id: self._tasks.pop(k, None))
+        return proxy
+
+    def get(self, video_id: str) -> VideoProxy | None:
+        proxy = self._proxies.get(video_id)
+        if proxy is not None and proxy.status == "ready" and not proxy.ready:
+            self._proxies.pop(video_id, None)
+            return None
+        return proxy
+
+    def path_for(self, stored: StoredFile) -> str:
+        proxy = self.get(stored.file_id)
+        return proxy.path if proxy is not None and proxy.ready else stored.path
+
+    async def _build(self, proxy: VideoProxy) -> None:
+        async with self._sem:
+            stored = self.store.acquire(proxy.video_id)
+            if stored is None:
+                proxy.status = "failed"
+                proxy.error = "Vídeo não encontrado."
+                return
+            proxy.status = "running"
+            t0 = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._encode, proxy, stored)
+            except asyncio.CancelledError:
+                self._kill(proxy.video_id)
+                proxy.status = "failed"
+                proxy.error = "cancelado"
+                raise
+            except Exception as e:  # noqa: BLE001
+                logger.info("Proxy do vídeo %s falhou: %s", proxy.video_id, e)
+                proxy.status = "failed"
+                proxy.error = str(e) or e.__class__.__name__
+            finally:
+                proxy.elapsed_s = time.perf_counter() - t0
+                self.store.release(proxy.video_id)
+
+    def _encode(self, proxy: VideoProxy, stored: StoredFile) -> None:
+        width, height = _video_size(stored.path)
+        if height and height <= self.height:
+            proxy.width, proxy.height = width, height
+            proxy.status = "skipped"
+            self._index(stored.path)
+            return
+        dst = self.store.derived_path(stored.file_id, PROXY_NAME)
+        tmp_path = f"{dst}.part"
+        proc = subprocess.Popen(
+            proxy_command(stored.path, tmp_path, self.height, self.gop),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        with self._lock:
+            self._procs[stored.file_id] = proc
+        try:
+            _out, err = proc.communicate()
+        finally:
+            with self._lock:
+                self._procs.pop(stored.file_id, None)
+        if proc.returncode != 0:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            msg = err.decode("utf-8", "replace").strip()
+            raise RuntimeError(f"Falha ao gerar o proxy: {msg[-300:] or proc.returncode}")
+        os.replace(tmp_path, dst)
+        proxy.path = dst
+        proxy.width, proxy.height = _video_size(dst)
+        proxy.status = "ready"
+        self._index(dst)
+
+    def _index(self, video_path: str) -> None:
+        try:
+            ensure_seek_index(video_path)
+        except Exception as e:  # noqa: BLE001
+            logger.info("Índice de busca de %s falhou: %s", video_path, e)
+
+    def _kill(self, video_id: str) -> None:
+        with self._lock:
+            proc = self._procs.get(video_id)
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    def stats(self) -> dict:
+        counts: dict[str, int] = {}
+        for proxy in self._proxies.values():
+            counts[proxy.status] = counts.get(proxy.status, 0) + 1
+        return {"enabled": self.enabled, "height": self.height, "gop": self.gop, "proxies": counts}
+
+    async def aclose(self) -> None:
+        tasks = list(self._tasks.values())
+        for video_id in list(self._procs):
+            self._kill(video_id)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+video_proxies = VideoProxyManager(
+    video_store,
+    enabled=settings.proxy_enabled,
+    height=settings.proxy_height,
+    gop=settings.proxy_gop,
+    max_concurrency=settings.proxy_max_concurrency,
+)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import re
+import subprocess
+import uuid
+from dataclasses import dataclass
+
+import cv2
+import imageio_ffmpeg
+
+
+_INDEX_VERSION = 1
+_PTS_TIME = re.compile(r"\bpts_time:\s*(-?[0-9.]+)")
+
+
+@dataclass(frozen=True)
+class SeekIndex:
+    fps: float
+    frames: int
+    keyframes: tuple[int, ...]
+
+    def keyframe_before(self, frame: int) -> int:
+        i = bisect.bisect_right(self.keyframes, frame) - 1
+        return self.keyframes[i] if i >= 0 else 0
+
+    def to_dict(self) -> dict:
+        return {"version": _INDEX_VERSION, "fps": self.fps, "frames": self.frames, "keyframes": list(self.keyframes)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> SeekIndex:
+        if data.get("version") != _INDEX_VERSION:
+            raise ValueError("Versão do índice de busca incompatível.")
+        return cls(fps=float(data["fps"]), frames=int(data["frames"]), keyframes=tuple(int(k) for k in data["keyframes"]))
+
+
+def seek_index_path(video_path: str) -> str:
+    return f"{video_path}.seek.json"
+
+
+def _keyframe_times(video_path: str) -> list[float]:
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-hide_banner",
+        "-nostdin",
+        "-skip_frame",
+        "nokey",
+        "-i",
+        video_path,
+        "-map",
+        "0:v:0",
+        "-an",
+        "-vf",
+        "showinfo",
+        "-f",
+        "null",
+        "-",
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+    err = proc.stderr.decode("utf-8", "replace")
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao indexar o vídeo: {err.strip()[-300:] or proc.returncode}")
+    return [float(m.group(1)) for m in _PTS_TIME.finditer(err)]
+
+
+def build_seek_index(video_path: str) -> SeekIndex:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError("Não foi possível abrir o vídeo.")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        cap.release()
+    times = _keyframe_times(video_path)
+    origin = times[0] if times else 0.0
+    keyframes = sorted({max(0, int(round((t - origin) * fps))) for t in times} | {0})
+    return SeekIndex(fps=fps, frames=frames, keyframes=tuple(keyframes))
+
+
+def write_seek_index(video_path: str, index: SeekIndex) -> str:
+    path = seek_index_path(video_path)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def load_seek_index(video_path: str) -> SeekIndex | None:
+    try:
+        with open(seek_index_path(video_path), encoding="utf-8") as f:
+            return SeekIndex.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def ensure_seek_index(video_path: str) -> SeekIndex:
+    index = load_seek_index(video_path)
+    if index is None:
+        index = build_seek_index(video_path)
+        write_seek_index(video_path, index)
+    return index
+
+
+def seek_frame(cap: cv2.VideoCapture, frame: int, index: SeekIndex | None = None, position: int | None = None) -> int:
+    frame = max(0, int(frame))
+    if index is None:
+        if position != frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        return frame
+    key = index.keyframe_before(frame)
+    if position is None or not key <= position <= frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, key)
+        position = key
+    while position < frame:
+        if not cap.grab():
+            break
+        position += 1
+    return position
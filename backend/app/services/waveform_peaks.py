@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..core.config import settings
+from .audio_onsets import read_pcm
+from .preview_cache import CachedPreview, PreviewCache, preview_cache
+
+
+logger = logging.getLogger(__name__)
+
+PEAKS_SUFFIX = ".peaks"
+_MAGIC = b"PKS1"
+_HEADER = struct.Struct("<4sIIHHf")
+_SAMPLE_RATE = 22050
+_BASE_SAMPLES_PER_BIN = 32
+_MIN_TOP_BINS = 128
+_MAX_LEVELS = 16
+
+
+@dataclass(frozen=True)
+class PeakPyramidInfo:
+    sample_rate: int
+    samples_per_bin: int
+    duration_s: float
+    bins: tuple[int, ...]
+
+    @property
+    def levels(self) -> int:
+        return len(self.bins)
+
+    def level_samples_per_bin(self, level: int) -> int:
+        return self.samples_per_bin << level
+
+    def level_offset(self, level: int) -> int:
+        return _HEADER.size + 4 * self.levels + 2 * sum(self.bins[:level])
+
+
+def _quantize(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    out = np.empty((lo.shape[0], 2), dtype=np.int8)
+    out[:, 0] = np.clip(np.floor(lo * 127.0), -127, 127)
+    out[:, 1] = np.clip(np.ceil(hi * 127.0), -127, 127)
+    return out
+
+
+def peak_pyramid(pcm: np.ndarray, samples_per_bin: int = _BASE_SAMPLES_PER_BIN) -> list[np.ndarray]:
+    n = pcm.shape[0]
+    bins = max(1, -(-n // samples_per_bin))
+    padded = np.zeros(bins * samples_per_bin, dtype=np.float32)
+    padded[:n] = pcm
+    if n < padded.shape[0]:
+        padded[n:] = pcm[-1] if n else 0.0
+    frames = padded.reshape(bins, samples_per_bin)
+    lo = frames.min(axis=1)
+    hi = frames.max(axis=1)
+
+    levels = [_quantize(lo, hi)]
+    while lo.shape[0] > _MIN_TOP_BINS and len(levels) < _MAX_LEVELS:
+        if lo.shape[0] % 2:
+            lo = np.append(lo, lo[-1])
+            hi = np.append(hi, hi[-1])
+        lo = np.minimum(lo[0::2], lo[1::2])
+        hi = np.maximum(hi[0::2], hi[1::2])
+        levels.append(_quantize(lo, hi))
+    return levels
+
+
+def encode_peaks(levels: list[np.ndarray], sample_rate: int, samples_per_bin: int, duration_s: float) -> bytes:
+    header = _HEADER.pack(_MAGIC, int(sample_rate), int(samples_per_bin), len(levels), 0, float(duration_s))
+    counts = struct.pack(f"<{len(levels)}I", *(lvl.shape[0] for lvl in levels))
+    return header + counts + b"".join(np.ascontiguousarray(lvl).tobytes() for lvl in levels)
+
+
+def read_peaks_info(path: str) -> PeakPyramidInfo:
+    with open(path, "rb") as f:
+        head = f.read(_HEADER.size)
+        if len(head) != _HEADER.size:
+            raise ValueError("Arquivo de picos inválido.")
+        magic, sample_rate, samples_per_bin, levels, _reserved, duration_s = _HEADER.unpack(head)
+        if magic != _MAGIC or not levels:
+            raise ValueError("Arquivo de picos inválido.")
+        bins = struct.unpack(f"<{levels}I", f.read(4 * levels))
+    return PeakPyramidInfo(
+        sample_rate=sample_rate,
+        samples_per_bin=samples_per_bin,
+        duration_s=duration_s,
+        bins=tuple(bins),
+    )
+
+
+def read_peaks_level(path: str, level: int | None = None) -> tuple[PeakPyramidInfo, int, bytes]:
+    info = read_peaks_info(path)
+    if level is None:
+        level = info.levels - 1
+    if level < 0 or level >= info.levels:
+        raise ValueError(f"Nível inválido (0..{info.levels - 1}).")
+    with open(path, "rb") as f:
+        f.seek(info.level_offset(level))
+        data = f.read(2 * info.bins[level])
+    return info, level, data
+
+
+def build_peaks_file(audio_path: str, path: str) -> str:
+    pcm = read_pcm(audio_path, sample_rate=_SAMPLE_RATE)
+    levels = peak_pyramid(pcm)
+    data = encode_peaks(levels, _SAMPLE_RATE, _BASE_SAMPLES_PER_BIN, pcm.shape[0] / _SAMPLE_RATE)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class PeakBuilder:
+    def __init__(self, cache: PreviewCache, max_concurrency: int) -> None:
+        self.cache = cache
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._sem: asyncio.Semaphore | None = None
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._built = 0
+        self._failed = 0
+
+    def path(self, cached: CachedPreview) -> str:
+        return self.cache.sidecar_path(cached, PEAKS_SUFFIX)
+
+    async def _build(self, cached: CachedPreview, path: str) -> str:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        async with self._sem:
+            try:
+                await asyncio.to_thread(build_peaks_file, cached.path, path)
+            except Exception:
+                self._failed += 1
+                raise
+            self._built += 1
+            return path
+
+    def ensure(self, cached: CachedPreview) -> asyncio.Future:
+        path = self.path(cached)
+        task = self._inflight.get(path)
+        if task is not None:
+            return task
+        if os.path.exists(path):
+            fut = asyncio.get_running_loop().create_future()
+            fut.set_result(path)
+            return fut
+        task = asyncio.ensure_future(self._build(cached, path))
+        self._inflight[path] = task
+        task.add_done_callback(lambda _t, k=path: self._inflight.pop(k, None))
+        return task
+
+    def schedule(self, cached: CachedPreview) -> None:
+        task = self.ensure(cached)
+        task.add_done_callback(self._log_failure)
+
+    def _log_failure(self, task: asyncio.Future) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.info("Picos do preview falharam: %s", task.exception())
+
+    def stats(self) -> dict:
+        return {"built": self._built, "failed": self._failed, "in_flight": len(self._inflight)}
+
+    async def aclose(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+peak_builder = PeakBuilder(preview_cache, max_concurrency=settings.peaks_max_concurrency)
@@ -1,9 +1,31 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
 import os
+import re
+import threading
 import time
 import uuid
-from dataclasses import dataclass
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from ..core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+_HASH_BLOCK_BYTES = 4 * 1024 * 1024
+_MIN_CHUNK_BYTES = 64 * 1024
+_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+_OWNER_SEP = re.compile(r"[._]")
+
+
+def _owner(name: str) -> str:
+    return _OWNER_SEP.split(name, 1)[0]
 
 
 @dataclass
@@ -13,50 +35,387 @@ class StoredFile:
     filename: str
     size_bytes: int
     created_at: float
+    sha256: str = ""
+    last_used_at: float = 0.0
+
+
+@dataclass
+class ResumableUpload:
+    upload_id: str
+    filename: str
+    path: str
+    size_bytes: int
+    chunk_size: int
+    created_at: float
+    updated_at: float = 0.0
+    received: set[int] = field(default_factory=set)
+    finalizing: bool = False
+
+    @property
+    def total_chunks(self) -> int:
+        return max(1, -(-self.size_bytes // self.chunk_size))
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(self.chunk_bounds(i)[1] for i in self.received)
+
+    def chunk_bounds(self, index: int) -> tuple[int, int]:
+        offset = index * self.chunk_size
+        return offset, max(0, min(self.chunk_size, self.size_bytes - offset))
+
+
+class UploadFinalizing(RuntimeError):
+    pass
+
+
+class ChunkWriter:
+    def __init__(self, upload: ResumableUpload, index: int) -> None:
+        self._upload = upload
+        self._index = index
+        self._offset, self._expected = upload.chunk_bounds(index)
+        self._written = 0
+        self._f = open(upload.path, "r+b")
+        self._f.seek(self._offset)
+
+    def write(self, data: bytes) -> None:
+        if self._written + len(data) > self._expected:
+            raise ValueError("Chunk maior que o esperado.")
+        self._f.write(data)
+        self._written += len(data)
+
+    def commit(self) -> ResumableUpload:
+        self._f.close()
+        if self._written != self._expected:
+            raise ValueError(f"Chunk incompleto ({self._written}/{self._expected} bytes).")
+        self._upload.received.add(self._index)
+        self._upload.updated_at = time.time()
+        return self._upload
+
+    def abort(self) -> None:
+        self._f.close()
+
+
+class TempFileWriter:
+    def __init__(self, store: TempFileStore, filename: str) -> None:
+        self._store = store
+        self._filename = os.path.basename(filename) or "video.bin"
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._tmp_path = os.path.join(store.root_dir, f".{uuid.uuid4().hex}.part")
+        self._f = open(self._tmp_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._f.write(chunk)
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def commit(self) -> tuple[StoredFile, bool]:
+        self._f.close()
+        return self._store._commit(self._tmp_path, self._filename, self._size, self._hash.hexdigest())
+
+    def abort(self) -> None:
+        try:
+            self._f.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
 
 
 class TempFileStore:
     def __init__(self, root_dir: str) -> None:
         self._root_dir = root_dir
         self._files: dict[str, StoredFile] = {}
+        self._by_hash: dict[str, str] = {}
+        self._uploads: dict[str, ResumableUpload] = {}
+        self._leases: dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._evicted_files = 0
+        self._evicted_bytes = 0
+        self._last_eviction_at: float | None = None
         os.makedirs(self._root_dir, exist_ok=True)
 
+    @property
+    def root_dir(self) -> str:
+        return self._root_dir
+
+    def derived_path(self, file_id: str, name: str) -> str:
+        return os.path.join(self._root_dir, f"{file_id}.{name}")
+
+    def _derived_files(self, stored: StoredFile) -> list[str]:
+        paths = [os.path.join(self._root_dir, n) for n in os.listdir(self._root_dir) if _owner(n) == stored.file_id]
+        return [p for p in paths if p != stored.path]
+
+    def _derived_bytes(self) -> dict[str, int]:
+        sizes: dict[str, int] = {}
+        for name in os.listdir(self._root_dir):
+            file_id = _owner(name)
+            stored = self._files.get(file_id)
+            if stored is None:
+                continue
+            path = os.path.join(self._root_dir, name)
+            if path == stored.path:
+                continue
+            try:
+                sizes[file_id] = sizes.get(file_id, 0) + os.path.getsize(path)
+            except OSError:
+                continue
+        return sizes
+
+    def writer(self, filename: str) -> TempFileWriter:
+        return TempFileWriter(self, filename)
+
     def put(self, filename: str, content: bytes) -> StoredFile:
-        file_id = uuid.uuid4().hex
-        safe_name = os.path.basename(filename) or "video.bin"
-        path = os.path.join(self._root_dir, f"{file_id}_{safe_name}")
-        with open(path, "wb") as f:
-            f.write(content)
+        w = self.writer(filename)
+        try:
+            w.write(content)
+        except Exception:
+            w.abort()
+            raise
+        stored, _deduplicated = w.commit()
+        return stored
+
+    def _commit(self, tmp_path: str, filename: str, size_bytes: int, sha256: str) -> tuple[StoredFile, bool]:
+        with self._lock:
+            existing_id = self._by_hash.get(sha256)
+            existing = self.get(existing_id) if existing_id else None
+            if existing is not None:
+                os.remove(tmp_path)
+                return existing, True
 
-        stored = StoredFile(
-            file_id=file_id,
+            file_id = uuid.uuid4().hex
+            path = os.path.join(self._root_dir, f"{file_id}_{filename}")
+            os.replace(tmp_path, path)
+            now = time.time()
+            stored = StoredFile(
+                file_id=file_id,
+                path=path,
+                filename=filename,
+                size_bytes=size_bytes,
+                created_at=now,
+                sha256=sha256,
+                last_used_at=now,
+            )
+            self._files[file_id] = stored
+            self._by_hash[sha256] = file_id
+            return stored, False
+
+    def begin_upload(self, filename: str, size_bytes: int, chunk_size: int) -> ResumableUpload:
+        max_bytes = settings.upload_max_mb * 1024 * 1024
+        if not 1 <= int(size_bytes) <= max_bytes:
+            raise ValueError(f"Tamanho do vídeo inválido (máximo {settings.upload_max_mb} MB).")
+        if not _MIN_CHUNK_BYTES <= int(chunk_size) <= _MAX_CHUNK_BYTES:
+            raise ValueError(f"Tamanho de chunk inválido ({_MIN_CHUNK_BYTES}..{_MAX_CHUNK_BYTES} bytes).")
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self._root_dir, f".{upload_id}.upload")
+        with open(path, "wb") as f:
+            f.truncate(int(size_bytes))
+        upload = ResumableUpload(
+            upload_id=upload_id,
+            filename=os.path.basename(filename) or "video.bin",
             path=path,
-            filename=safe_name,
-            size_bytes=len(content),
+            size_bytes=int(size_bytes),
+            chunk_size=int(chunk_size),
             created_at=time.time(),
+            updated_at=time.time(),
         )
-        self._files[file_id] = stored
-        return stored
+        with self._lock:
+            self._uploads[upload_id] = upload
+        return upload
+
+    def get_upload(self, upload_id: str) -> ResumableUpload | None:
+        return self._uploads.get(upload_id)
+
+    def chunk_writer(self, upload_id: str, index: int) -> ChunkWriter:
+        upload = self._uploads.get(upload_id)
+        if upload is None:
+            raise KeyError(upload_id)
+        if upload.finalizing:
+            raise UploadFinalizing(upload_id)
+        if index < 0 or index >= upload.total_chunks:
+            raise ValueError(f"Chunk inválido (0..{upload.total_chunks - 1}).")
+        try:
+            return ChunkWriter(upload, index)
+        except FileNotFoundError as e:
+            raise KeyError(upload_id) from e
+
+    def finalize_upload(self, upload_id: str, sha256: str | None = None) -> tuple[StoredFile, bool]:
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is None:
+                raise KeyError(upload_id)
+            if upload.finalizing:
+                raise UploadFinalizing(upload_id)
+            upload.finalizing = True
+        try:
+            missing = upload.total_chunks - len(upload.received)
+            if missing:
+                raise ValueError(f"Upload incompleto: faltam {missing} chunks.")
+            h = hashlib.sha256()
+            with open(upload.path, "rb") as f:
+                while block := f.read(_HASH_BLOCK_BYTES):
+                    h.update(block)
+            digest = h.hexdigest()
+            if sha256 and sha256.strip().lower() != digest:
+                raise ValueError("SHA-256 não confere com o arquivo recebido.")
+        except BaseException:
+            upload.finalizing = False
+            raise
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+        return self._commit(upload.path, upload.filename, upload.size_bytes, digest)
+
+    def abort_upload(self, upload_id: str) -> bool:
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is None:
+                return False
+            if upload.finalizing:
+                raise UploadFinalizing(upload_id)
+            self._uploads.pop(upload_id, None)
+        if os.path.exists(upload.path):
+            os.remove(upload.path)
+        return True
 
     def get(self, file_id: str) -> StoredFile | None:
-        stored = self._files.get(file_id)
-        if not stored:
-            return None
-        if not os.path.exists(stored.path):
-            self._files.pop(file_id, None)
-            return None
-        return stored
+        with self._lock:
+            stored = self._files.get(file_id)
+            if not stored:
+                return None
+            if not os.path.exists(stored.path):
+                self._forget(file_id)
+                return None
+            stored.last_used_at = time.time()
+            return stored
 
-    def cleanup(self, max_age_s: float = 60 * 60) -> int:
+    def acquire(self, file_id: str) -> StoredFile | None:
+        with self._lock:
+            stored = self.get(file_id)
+            if stored is not None:
+                self._leases[file_id] = self._leases.get(file_id, 0) + 1
+            return stored
+
+    def release(self, file_id: str) -> None:
+        with self._lock:
+            n = self._leases.get(file_id, 0) - 1
+            if n > 0:
+                self._leases[file_id] = n
+            else:
+                self._leases.pop(file_id, None)
+            stored = self._files.get(file_id)
+            if stored is not None:
+                stored.last_used_at = time.time()
+
+    @contextmanager
+    def lease(self, file_id: str) -> Iterator[StoredFile | None]:
+        stored = self.acquire(file_id)
+        try:
+            yield stored
+        finally:
+            if stored is not None:
+                self.release(file_id)
+
+    def _forget(self, file_id: str) -> None:
+        stored = self._files.pop(file_id, None)
+        if stored and self._by_hash.get(stored.sha256) == file_id:
+            self._by_hash.pop(stored.sha256, None)
+
+    def _remove(self, stored: StoredFile) -> int:
+        freed = stored.size_bytes
+        try:
+            if os.path.exists(stored.path):
+                os.remove(stored.path)
+            for path in self._derived_files(stored):
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    continue
+                freed += size
+        finally:
+            self._forget(stored.file_id)
+            self._evicted_files += 1
+            self._evicted_bytes += freed
+        return freed
+
+    def evict(self, max_age_s: float | None = None, max_bytes: int | None = None) -> int:
+        removed = 0
         now = time.time()
+        with self._lock:
+            if max_age_s is not None:
+                for upload_id, upload in list(self._uploads.items()):
+                    if not upload.finalizing and now - upload.updated_at > max_age_s:
+                        self.abort_upload(upload_id)
+                        removed += 1
+
+            candidates = sorted(
+                (f for f in self._files.values() if not self._leases.get(f.file_id)),
+                key=lambda f: f.last_used_at,
+            )
+            if max_age_s is not None:
+                for stored in [f for f in candidates if now - f.last_used_at > max_age_s]:
+                    self._remove(stored)
+                    candidates.remove(stored)
+                    removed += 1
+
+            if max_age_s is not None:
+                removed += self._sweep_orphans(now, max_age_s)
+
+            if max_bytes is not None:
+                total = self._total_bytes()
+                for stored in candidates:
+                    if total <= max_bytes:
+                        break
+                    total -= self._remove(stored)
+                    removed += 1
+            self._last_eviction_at = now
+        if removed:
+            logger.info("TempFileStore: %d arquivos removidos.", removed)
+        return removed
+
+    def _sweep_orphans(self, now: float, max_age_s: float) -> int:
+        known = {f.path for f in self._files.values()} | {u.path for u in self._uploads.values()}
         removed = 0
-        for file_id, stored in list(self._files.items()):
-            if now - stored.created_at > max_age_s:
-                try:
-                    if os.path.exists(stored.path):
-                        os.remove(stored.path)
-                finally:
-                    self._files.pop(file_id, None)
+        for name in os.listdir(self._root_dir):
+            path = os.path.join(self._root_dir, name)
+            if path in known or _owner(name) in self._files or not os.path.isfile(path):
+                continue
+            try:
+                if now - os.path.getmtime(path) > max_age_s:
+                    os.remove(path)
                     removed += 1
+            except OSError:
+                continue
         return removed
 
+    def _total_bytes(self) -> int:
+        return (
+            sum(f.size_bytes for f in self._files.values())
+            + sum(self._derived_bytes().values())
+            + sum(u.size_bytes for u in self._uploads.values())
+        )
+
+    def cleanup(self, max_age_s: float = 60 * 60) -> int:
+        return self.evict(max_age_s=max_age_s)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "uploads_in_progress": len(self._uploads),
+                "bytes": self._total_bytes(),
+                "leased_files": len(self._leases),
+                "evicted_files": self._evicted_files,
+                "evicted_bytes": self._evicted_bytes,
+                "last_eviction_at": self._last_eviction_at,
+            }
+
+    async def run_eviction(self, *, interval_s: float, max_age_s: float | None, max_bytes: int | None) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.evict, max_age_s, max_bytes)
+            except Exception:
+                logger.exception("TempFileStore: falha na remoção de arquivos antigos.")
+            await asyncio.sleep(max(1.0, interval_s))
+
+
+video_store = TempFileStore(settings.temp_dir)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+import cv2
+import numpy as np
+import pytest
+
+
+_ROOT = tempfile.mkdtemp(prefix="audio-editor-tests-")
+
+for _name, _sub in (
+    ("TEMP_DIR", "temp"),
+    ("PREVIEW_CACHE_DIR", "previews"),
+    ("MOTION_CACHE_DIR", "motion"),
+    ("EXPORT_DIR", "exports"),
+    ("STEM_CACHE_DIR", "stems"),
+):
+    os.environ[_name] = os.path.join(_ROOT, _sub)
+os.environ["PROXY_ENABLED"] = "0"
+
+
+SQUARE_FPS = 30
+SQUARE_FRAMES = 90
+SQUARE_MOVES = range(30, 60)
+
+
+@pytest.fixture(scope="session")
+def moving_square_clip(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp("video") / "square.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), SQUARE_FPS, (160, 120))
+    x = 20
+    for i in range(SQUARE_FRAMES):
+        if i in SQUARE_MOVES:
+            x += 2
+        frame = np.zeros((120, 160, 3), np.uint8)
+        frame[50:70, x : x + 20] = 255
+        writer.write(frame)
+    writer.release()
+    return path
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.app.services.audio_onsets import _HOP, _N_FFT, _SAMPLE_RATE, SpectralFlux, align_to_frames, spectral_flux
+from backend.app.services.video_motion import MotionFeatures
+
+
+CLICK_S = np.arange(0.25, 2.0, 0.25)
+
+
+def _click_train() -> np.ndarray:
+    pcm = np.zeros(int(2.0 * _SAMPLE_RATE), dtype=np.float32)
+    pcm[(CLICK_S * _SAMPLE_RATE).astype(int)] = 1.0
+    return pcm
+
+
+def _onset_frames(flux: np.ndarray) -> np.ndarray:
+    peak = (flux[1:-1] > flux[:-2]) & (flux[1:-1] >= flux[2:]) & (flux[1:-1] > 0.5 * flux.max())
+    return np.flatnonzero(peak) + 1
+
+
+@pytest.mark.parametrize("chunk", [7, _HOP, _N_FFT - 1, 4097])
+def test_spectral_flux_independent_of_chunk_size(chunk: int) -> None:
+    pcm = _click_train()
+    ref_times, ref_flux = spectral_flux(pcm, _SAMPLE_RATE)
+
+    flux = SpectralFlux(_SAMPLE_RATE)
+    for start in range(0, pcm.shape[0], chunk):
+        flux.push(pcm[start : start + chunk])
+    times, values = flux.result()
+
+    np.testing.assert_array_equal(times, ref_times)
+    np.testing.assert_allclose(values, ref_flux, rtol=1e-5, atol=1e-6)
+    np.testing.assert_array_equal(_onset_frames(values), _onset_frames(ref_flux))
+
+
+def test_spectral_flux_onsets_at_clicks() -> None:
+    times, flux = spectral_flux(_click_train(), _SAMPLE_RATE)
+    onsets = times[_onset_frames(flux)]
+    assert onsets.shape == CLICK_S.shape
+    np.testing.assert_allclose(onsets, CLICK_S, atol=_N_FFT / _SAMPLE_RATE)
+
+
+def _naive_align(audio: MotionFeatures, frame_times: np.ndarray) -> np.ndarray:
+    out = np.empty(frame_times.shape[0], dtype=np.float64)
+    prev = -np.inf
+    for i, t in enumerate(frame_times):
+        inside = (audio.times > prev) & (audio.times <= t)
+        out[i] = audio.diff[inside].max() if inside.any() else np.interp(t, audio.times, audio.diff)
+        prev = t
+    return out
+
+
+@pytest.mark.parametrize("fps", [5.0, 30.0, 240.0])
+def test_align_to_frames_matches_naive_max(fps: float) -> None:
+    rng = np.random.default_rng(7)
+    times = np.sort(rng.uniform(0.0, 3.0, 400))
+    diff = rng.random(400)
+    audio = MotionFeatures(times=times, diff=diff, flow=diff, cell=diff)
+    frame_times = np.arange(0.0, 3.5, 1.0 / fps)
+
+    np.testing.assert_allclose(align_to_frames(audio, frame_times), _naive_align(audio, frame_times))
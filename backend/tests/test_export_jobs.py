@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.api.routes import export
+from backend.app.services.export_jobs import EncoderPool, ExportJob, ExportJobManager, ExportOutput
+
+
+def _manager(tmp_path, *, max_jobs: int = 2, result_ttl_s: float = 3600) -> ExportJobManager:
+    return ExportJobManager(str(tmp_path / "exports"), EncoderPool(1, 1), max_jobs=max_jobs, result_ttl_s=result_ttl_s)
+
+
+def _done_job(manager: ExportJobManager, job_id: str, finished_at: float) -> ExportJob:
+    job_dir = os.path.join(manager.root_dir, job_id)
+    os.makedirs(job_dir)
+    path = os.path.join(job_dir, "mix.mp3")
+    with open(path, "wb") as f:
+        f.write(b"\xff\xfb" * 512)
+    job = ExportJob(
+        job_id=job_id,
+        kind="render",
+        outputs=[ExportOutput("mix.mp3", "mp3", 192, path, "audio/mpeg", 1024)],
+        created_at=finished_at,
+        status="done",
+        finished_at=finished_at,
+    )
+    manager._jobs[job_id] = job
+    return job
+
+
+def test_trim_drops_oldest_finished_first(tmp_path) -> None:
+    manager = _manager(tmp_path)
+    now = time.time()
+    _done_job(manager, "novo", now - 1)
+    _done_job(manager, "velho", now - 30)
+    _done_job(manager, "meio", now - 10)
+    manager._trim()
+    assert list(manager._jobs) == ["novo", "meio"]
+    assert not os.path.exists(os.path.join(manager.root_dir, "velho"))
+
+
+def test_trim_skips_jobs_being_downloaded(tmp_path) -> None:
+    manager = _manager(tmp_path, result_ttl_s=5)
+    job = _done_job(manager, "antigo", time.time() - 60)
+    manager.acquire_reader(job.job_id)
+    manager._trim()
+    assert manager.get(job.job_id) is job
+    assert os.path.exists(job.outputs[0].path)
+    manager.release_reader(job.job_id)
+    manager._trim()
+    assert manager.get(job.job_id) is None
+
+
+def test_file_route_holds_reader_until_sent(tmp_path, monkeypatch) -> None:
+    manager = _manager(tmp_path, result_ttl_s=5)
+    job = _done_job(manager, "antigo", time.time() - 60)
+    monkeypatch.setattr(export, "export_jobs", manager)
+    seen: list[int] = []
+    release = manager.release_reader
+
+    def release_reader(job_id: str) -> None:
+        seen.append(manager._readers.get(job_id, 0))
+        manager._trim()
+        assert manager.get(job_id) is job
+        release(job_id)
+
+    monkeypatch.setattr(manager, "release_reader", release_reader)
+    app = FastAPI()
+    app.include_router(export.router)
+    resp = TestClient(app).get("/jobs/antigo/files/mix.mp3")
+    assert resp.status_code == 200
+    assert len(resp.content) == 1024
+    assert seen == [1]
+    assert manager._readers == {}
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from backend.app.schemas.freesound import FreesoundSound
+from backend.app.services import freesound_client
+from backend.app.services.freesound_client import FreesoundClient
+from backend.app.services.freesound_scheduler import FreesoundScheduler, RequestPriority
+from backend.app.services.preview_cache import PreviewCache
+from backend.app.services.search_cache import SearchCache
+from backend.app.services.sound_index import SoundIndex
+
+
+PREVIEW_URL = "https://cdn.freesound.org/previews/1/1-lq.mp3"
+AUDIO = b"ID3" + b"\0" * 4096
+
+
+class RecordingScheduler(FreesoundScheduler):
+    def __init__(self) -> None:
+        super().__init__(rate_per_min=6000, burst=10, max_retries=1, backoff_base_s=0.0)
+        self.acquired: list[tuple[str, RequestPriority]] = []
+
+    async def _acquire(self, token: str, priority: RequestPriority) -> None:
+        self.acquired.append((token, priority))
+        await super()._acquire(token, priority)
+
+
+@pytest.fixture(autouse=True)
+def _no_peaks(monkeypatch) -> None:
+    monkeypatch.setattr(freesound_client.peak_builder, "schedule", lambda cached: None)
+
+
+def _client(tmp_path, handler) -> tuple[FreesoundClient, RecordingScheduler]:
+    index = SoundIndex(max_entries=16)
+    index.put(FreesoundSound(id=1, name="som", previews={"preview_lq_mp3": PREVIEW_URL}))
+    scheduler = RecordingScheduler()
+    client = FreesoundClient(
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        preview_cache=PreviewCache(str(tmp_path / "previews"), max_bytes=1 << 20),
+        search_cache=SearchCache(ttl_s=60, max_entries=16),
+        scheduler=scheduler,
+        sound_index=index,
+    )
+    return client, scheduler
+
+
+def test_preview_download_goes_through_token_bucket(tmp_path) -> None:
+    client, scheduler = _client(tmp_path, lambda request: httpx.Response(200, content=AUDIO))
+
+    cached, hit = asyncio.run(
+        client.fetch_preview_file(1, quality="lq", fmt="mp3", token="abc", priority=RequestPriority.BACKGROUND)
+    )
+    assert not hit
+    assert scheduler.acquired == [("abc", RequestPriority.BACKGROUND)]
+    with open(cached.path, "rb") as f:
+        assert f.read() == AUDIO
+
+
+def test_preview_429_pauses_token_bucket(tmp_path) -> None:
+    responses = iter([httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, content=AUDIO)])
+    client, scheduler = _client(tmp_path, lambda request: next(responses))
+
+    asyncio.run(client.fetch_preview_file(1, quality="lq", fmt="mp3", token="abc"))
+    assert scheduler.stats()["throttled"] == 1
+    assert len(scheduler.acquired) == 2
+    assert "abc" in scheduler._buckets
+
+
+def test_preview_streams_without_cache_when_writer_fails(tmp_path, monkeypatch) -> None:
+    client, _scheduler = _client(tmp_path, lambda request: httpx.Response(200, stream=httpx.ByteStream(AUDIO)))
+
+    def fail(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(client._preview_cache, "writer", fail)
+
+    async def run() -> tuple[bytes, bool]:
+        stream = await client.open_preview_stream(1, quality="lq", fmt="mp3", token="abc")
+        body = b"".join([chunk async for chunk in stream.iter_bytes()])
+        return body, stream.response.is_closed
+
+    body, closed = asyncio.run(run())
+    assert body == AUDIO
+    assert closed
+    assert client.peek_preview(1, quality="lq", fmt="mp3") is None
+
+
+def test_preview_response_closed_when_writer_raises(tmp_path, monkeypatch) -> None:
+    client, _scheduler = _client(tmp_path, lambda request: httpx.Response(200, stream=httpx.ByteStream(AUDIO)))
+    responses: list[httpx.Response] = []
+    send = client._scheduler.send
+
+    async def record(*args, **kwargs) -> httpx.Response:
+        resp = await send(*args, **kwargs)
+        responses.append(resp)
+        return resp
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("falha")
+
+    monkeypatch.setattr(client._scheduler, "send", record)
+    monkeypatch.setattr(client._preview_cache, "writer", fail)
+    with pytest.raises(RuntimeError):
+        asyncio.run(client.open_preview_stream(1, quality="lq", fmt="mp3", token="abc"))
+    assert responses and responses[0].is_closed
+
+
+def test_search_errors_are_not_shared_across_tokens(tmp_path) -> None:
+    calls: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        token = request.url.params["token"]
+        calls.append(token)
+        await asyncio.sleep(0.05)
+        if token == "ruim":
+            return httpx.Response(401, json={"detail": "token inválido"})
+        return httpx.Response(200, json={"count": 1, "results": [{"id": 7, "name": "chuva"}]})
+
+    client, _scheduler = _client(tmp_path, handler)
+
+    async def run() -> list:
+        first = await asyncio.gather(
+            client.search_text("chuva", token="ruim"),
+            client.search_text("chuva", token="bom"),
+            client.search_text("chuva", token="bom"),
+            return_exceptions=True,
+        )
+        return [*first, await client.search_text("chuva", token="outro")]
+
+    bad, good, joined, cached = asyncio.run(run())
+    assert isinstance(bad, httpx.HTTPStatusError)
+    assert good.results[0].id == joined.results[0].id == cached.results[0].id == 7
+    assert sorted(calls) == ["bom", "ruim"]
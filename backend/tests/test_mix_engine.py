@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from backend.app.schemas.export import TimelineProject
+from backend.app.services.mix_engine import MixPlan, SourceRef, clip_source, pan_block, transition_fades
+
+
+SR = 1000
+REF = SourceRef(sound_id=1, quality="lq", fmt="mp3")
+HALF = math.sqrt(0.5)
+
+
+def _project(*clips: dict, pan: float = 0.0, transition_s: float = 0.0) -> TimelineProject:
+    return TimelineProject.model_validate(
+        {
+            "tracks": [{"id": "t1", "pan": pan}, {"id": "t2"}],
+            "clips": [
+                {
+                    "trackId": "t1",
+                    "startS": 0.0,
+                    "durationS": 1.0,
+                    "previewUrl": "/api/freesound/sounds/1/preview?quality=lq&fmt=mp3",
+                    **clip,
+                }
+                for clip in clips
+            ],
+            "mix": {"transitionS": transition_s},
+        }
+    )
+
+
+def _render(project: TimelineProject, *, channels: int, seconds: float = 4.0) -> np.ndarray:
+    sources = {REF: np.ones((int(seconds * SR), 1), dtype=np.float32)}
+    plan = MixPlan(project, sources, sample_rate=SR, channels=channels)
+    return np.concatenate(list(plan.blocks()))
+
+
+def test_clip_source_reads_preview_url() -> None:
+    clip = _project({"id": "c1"}).clips[0]
+    assert clip_source(clip) == REF
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("", REF),
+        ("?quality=HQ&fmt=ogg", SourceRef(1, "hq", "ogg")),
+        ("?quality=ultra&fmt=wav", REF),
+        ("?quality=lq&quality=hq&fmt=%20mp3", REF),
+    ],
+)
+def test_clip_source_whitelists_quality_and_fmt(query: str, expected: SourceRef) -> None:
+    clip = _project({"id": "c1", "previewUrl": f"/api/freesound/sounds/1/preview{query}"}).clips[0]
+    assert clip_source(clip) == expected
+
+
+@pytest.mark.parametrize(
+    ("pan", "expected"),
+    [(-1.0, (1.0, 0.0)), (0.0, (HALF, HALF)), (1.0, (0.0, 1.0))],
+)
+def test_pan_block_mono_equal_power(pan: float, expected: tuple[float, float]) -> None:
+    out = pan_block(np.ones((4, 1)), pan)
+    np.testing.assert_allclose(out, np.tile(expected, (4, 1)), atol=1e-12)
+
+
+@pytest.mark.parametrize(
+    ("pan", "expected"),
+    [(-1.0, (2 * HALF, 0.0)), (0.0, (HALF, HALF)), (1.0, (0.0, 2 * HALF))],
+)
+def test_track_pan_matches_stereo_panner(pan: float, expected: tuple[float, float]) -> None:
+    out = _render(_project({"id": "c1"}, pan=pan), channels=2)
+    assert out.shape == (1000, 2)
+    np.testing.assert_allclose(out[500], expected, atol=1e-6)
+
+
+def test_gain_ramp_is_step_then_linear() -> None:
+    project = _project({"id": "c1", "durationS": 2.0, "gainAutomation": [{"t": 0.5, "v": 0.2}, {"t": 1.0, "v": 1.2}]})
+    out = _render(project, channels=1)[:, 0]
+    np.testing.assert_allclose(out[[0, 500, 999]], [1.0, 1.0, 1.0], atol=1e-6)
+    np.testing.assert_allclose(out[[1000, 1500, 1999]], [0.2, 0.7, 1.2 - 0.001], atol=1e-6)
+
+
+def test_gain_ramp_from_first_point() -> None:
+    project = _project({"id": "c1", "gainAutomation": [{"t": 0.0, "v": 0.0}, {"t": 1.0, "v": 1.0}]})
+    out = _render(project, channels=1)[:, 0]
+    np.testing.assert_allclose(out, np.arange(1000) / 1000.0, atol=1e-6)
+
+
+def test_fades_ramp_from_floor() -> None:
+    project = _project({"id": "c1", "durationS": 2.0, "fadeInS": 0.5, "fadeOutS": 0.5})
+    out = _render(project, channels=1)[:, 0]
+    assert out[0] == pytest.approx(0.0001)
+    assert out[250] == pytest.approx(0.0001 + 0.9999 * 0.5, abs=1e-6)
+    np.testing.assert_allclose(out[500:1500], 1.0, atol=1e-6)
+    assert out[1750] == pytest.approx(1.0 - 0.9999 * 0.5, abs=1e-6)
+    assert out[1999] == pytest.approx(1.0 - 0.9999 * 0.998, abs=1e-6)
+
+
+def test_fade_takes_over_gain_automation() -> None:
+    project = _project(
+        {
+            "id": "c1",
+            "durationS": 2.0,
+            "fadeInS": 0.5,
+            "fadeOutS": 0.5,
+            "gainAutomation": [{"t": 0.0, "v": 1.0}, {"t": 1.0, "v": 0.5}],
+        }
+    )
+    out = _render(project, channels=1)[:, 0]
+    np.testing.assert_allclose(out[[0, 500, 1000, 1499]], [0.0001, 1.0, 1.0, 1.0], atol=1e-6)
+    np.testing.assert_allclose(out[[1750, 1999]], [0.75, 0.501], atol=1e-6)
+
+
+def test_transition_fades_for_overlapping_clips() -> None:
+    project = _project(
+        {"id": "a", "startS": 0.0, "durationS": 2.0},
+        {"id": "b", "startS": 1.5, "durationS": 2.0, "fadeInS": 0.8},
+        {"id": "c", "startS": 4.0, "durationS": 1.0},
+        {"id": "d", "trackId": "t2", "startS": 1.0, "durationS": 1.0},
+        transition_s=1.0,
+    )
+    fades = transition_fades(project)
+    assert fades["a"] == (0.0, 0.5)
+    assert fades["b"] == (0.8, 0.0)
+    assert fades["c"] == (0.0, 0.0)
+    assert fades["d"] == (0.0, 0.0)
+
+
+def test_transition_fades_clamped_by_transition() -> None:
+    project = _project(
+        {"id": "a", "startS": 0.0, "durationS": 3.0},
+        {"id": "b", "startS": 1.0, "durationS": 3.0},
+        transition_s=0.25,
+    )
+    assert transition_fades(project) == {"a": (0.0, 0.25), "b": (0.25, 0.0)}
+
+
+def test_transition_disabled_keeps_clip_fades() -> None:
+    project = _project(
+        {"id": "a", "startS": 0.0, "durationS": 2.0, "fadeOutS": 0.1},
+        {"id": "b", "startS": 1.0, "durationS": 2.0},
+    )
+    assert transition_fades(project) == {"a": (0.0, 0.1), "b": (0.0, 0.0)}
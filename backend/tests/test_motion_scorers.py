@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import pytest
+
+from backend.app.services.motion_scorers import SCORERS, MotionScorer, create_scorer, scorer_is_stateful
+from backend.app.services.video_motion import extract_roi_shard, frame_range
+
+from .conftest import SQUARE_FRAMES, SQUARE_MOVES
+
+
+ROI = [(0.0, 0.0, 1.0, 1.0)]
+MOVING = [i - 1 for i in SQUARE_MOVES]
+
+
+def _gray_frames(path: str) -> list[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    finally:
+        cap.release()
+    return frames
+
+
+def test_motion_scorer_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        MotionScorer()
+
+
+def test_registered_scorers() -> None:
+    assert list(SCORERS) == ["frame_diff", "farneback", "lk", "mog2"]
+    assert [name for name in SCORERS if scorer_is_stateful(name)] == ["lk", "mog2"]
+
+
+@pytest.mark.parametrize("name", list(SCORERS))
+def test_scorer_detects_moving_square(moving_square_clip: str, name: str) -> None:
+    scorer = create_scorer(name)
+    frames = _gray_frames(moving_square_clip)
+    assert len(frames) == SQUARE_FRAMES
+    assert scorer.update(frames[0]) is None
+    scores = np.array([scorer.update(gray) for gray in frames[1:]])
+    assert scores.shape == (SQUARE_FRAMES - 1, 3)
+    assert np.all(scores[MOVING, 1] > 0)
+    assert np.all(scores[MOVING, 0] > 0)
+    if not scorer_is_stateful(name):
+        assert not np.any(scores[: MOVING[0], :])
+
+
+@pytest.mark.parametrize("name", list(SCORERS))
+def test_features_have_frame_count_shape(moving_square_clip: str, name: str) -> None:
+    _fps, start, end = frame_range(moving_square_clip, 0.0, None)
+    features = extract_roi_shard(moving_square_clip, start, start, end, ROI, scorer=name)[0]
+    assert features.frames == SQUARE_FRAMES - 1
+    for series in (features.times, features.diff, features.flow, features.cell):
+        assert series.shape == (features.frames,)
+    assert np.all(features.flow[MOVING] > 0)
+
+
+@pytest.mark.parametrize("name", ["lk", "mog2"])
+def test_stateful_scorers_reset_per_shard(moving_square_clip: str, name: str) -> None:
+    _fps, start, end = frame_range(moving_square_clip, 0.0, None)
+    mid = (start + end) // 2
+    fresh = extract_roi_shard(moving_square_clip, start, mid, end, ROI, scorer=name)[0]
+    extract_roi_shard(moving_square_clip, start, start, mid, ROI, scorer=name)
+    again = extract_roi_shard(moving_square_clip, start, mid, end, ROI, scorer=name)[0]
+    np.testing.assert_array_equal(again.flow, fresh.flow)
+    serial = extract_roi_shard(moving_square_clip, start, start, end, ROI, scorer=name)[0]
+    np.testing.assert_array_equal(serial.times[-fresh.frames :], fresh.times)
+    if name == "mog2":
+        assert not np.array_equal(serial.flow[-fresh.frames :], fresh.flow)
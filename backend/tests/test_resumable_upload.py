@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app.api.routes import sync
+from backend.app.storage.temp_files import TempFileStore
+
+
+CHUNK = 64 * 1024
+BASE = "/video/uploads"
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch) -> TempFileStore:
+    store = TempFileStore(str(tmp_path))
+    monkeypatch.setattr(sync, "video_store", store)
+    return store
+
+
+@pytest.fixture()
+def client(store: TempFileStore) -> TestClient:
+    app = FastAPI()
+    app.include_router(sync.router)
+    return TestClient(app)
+
+
+def _payload(size: int = 3 * CHUNK + 1000) -> bytes:
+    return os.urandom(size)
+
+
+def _begin(client: TestClient, data: bytes) -> dict:
+    resp = client.post(BASE, json={"filename": "clip.mp4", "size_bytes": len(data), "chunk_size": CHUNK})
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def _put(client: TestClient, upload_id: str, data: bytes, index: int):
+    return client.put(f"{BASE}/{upload_id}/chunks/{index}", content=data[index * CHUNK : (index + 1) * CHUNK])
+
+
+def test_out_of_order_chunks_reassemble(client: TestClient, store: TempFileStore) -> None:
+    data = _payload()
+    status = _begin(client, data)
+    assert status["total_chunks"] == 4
+    for index in (3, 1, 0, 2):
+        assert _put(client, status["upload_id"], data, index).status_code == 200
+    status = client.get(f"{BASE}/{status['upload_id']}").json()
+    assert status["complete"] and status["received_bytes"] == len(data)
+
+    resp = client.post(f"{BASE}/{status['upload_id']}/finalize", json={"sha256": hashlib.sha256(data).hexdigest()})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert not body["deduplicated"]
+    with open(store.get(body["video_id"]).path, "rb") as f:
+        assert f.read() == data
+
+
+def test_reput_of_received_chunk_is_idempotent(client: TestClient) -> None:
+    data = _payload()
+    upload_id = _begin(client, data)["upload_id"]
+    assert _put(client, upload_id, data, 1).status_code == 200
+    resp = _put(client, upload_id, data, 1)
+    assert resp.status_code == 200
+    assert resp.json()["received_chunks"] == [1]
+    assert resp.json()["received_bytes"] == CHUNK
+
+
+def test_oversized_and_invalid_chunks_rejected(client: TestClient) -> None:
+    data = _payload()
+    upload_id = _begin(client, data)["upload_id"]
+    assert client.put(f"{BASE}/{upload_id}/chunks/4", content=b"x").status_code == 400
+    assert client.put(f"{BASE}/{upload_id}/chunks/0", content=data[: CHUNK + 1]).status_code == 400
+    assert client.put(f"{BASE}/{upload_id}/chunks/0", content=data[:10]).status_code == 400
+    assert client.get(f"{BASE}/{upload_id}").json()["received_chunks"] == []
+
+
+def test_incomplete_and_sha_mismatch_keep_upload(client: TestClient) -> None:
+    data = _payload()
+    upload_id = _begin(client, data)["upload_id"]
+    for index in range(3):
+        _put(client, upload_id, data, index)
+    assert client.post(f"{BASE}/{upload_id}/finalize", json={}).status_code == 400
+    _put(client, upload_id, data, 3)
+    resp = client.post(f"{BASE}/{upload_id}/finalize", json={"sha256": "0" * 64})
+    assert resp.status_code == 400
+    assert "SHA-256" in resp.json()["detail"]
+    assert client.post(f"{BASE}/{upload_id}/finalize", json={}).status_code == 200
+
+
+def test_finalize_dedups_identical_content(client: TestClient) -> None:
+    data = _payload()
+    ids = []
+    for _ in range(2):
+        upload_id = _begin(client, data)["upload_id"]
+        for index in range(4):
+            _put(client, upload_id, data, index)
+        body = client.post(f"{BASE}/{upload_id}/finalize", json={}).json()
+        ids.append((body["video_id"], body["deduplicated"]))
+    assert ids[0][1] is False
+    assert ids[1] == (ids[0][0], True)
+
+
+def test_conflicts_while_finalizing(client: TestClient, store: TempFileStore) -> None:
+    data = _payload()
+    upload_id = _begin(client, data)["upload_id"]
+    for index in range(4):
+        _put(client, upload_id, data, index)
+    store.get_upload(upload_id).finalizing = True
+    assert client.post(f"{BASE}/{upload_id}/finalize", json={}).status_code == 409
+    assert _put(client, upload_id, data, 0).status_code == 409
+    assert client.delete(f"{BASE}/{upload_id}").status_code == 409
+    store.get_upload(upload_id).finalizing = False
+    assert client.post(f"{BASE}/{upload_id}/finalize", json={}).status_code == 200
+
+
+def test_chunk_for_vanished_upload_is_404(client: TestClient, store: TempFileStore, monkeypatch) -> None:
+    data = _payload()
+    upload_id = _begin(client, data)["upload_id"]
+    get_upload = store.get_upload
+
+    def get_then_abort(uid: str):
+        upload = get_upload(uid)
+        store.abort_upload(uid)
+        return upload
+
+    monkeypatch.setattr(store, "get_upload", get_then_abort)
+    resp = _put(client, upload_id, data, 0)
+    assert resp.status_code == 404
+    assert resp.json()["detail"] == "Upload não encontrado. Reinicie o envio."
+
+
+def test_begin_rejects_oversized_upload(client: TestClient) -> None:
+    resp = client.post(BASE, json={"filename": "big.mp4", "size_bytes": 10 * 1024**4, "chunk_size": CHUNK})
+    assert resp.status_code == 400
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from backend.app.schemas.export import TimelineProject
+from backend.app.services.stem_cache import stem_key
+
+
+def _project(preview_url: str, **clip) -> TimelineProject:
+    return TimelineProject.model_validate(
+        {
+            "tracks": [{"id": "t1"}],
+            "clips": [{"id": "c1", "trackId": "t1", "startS": 0.0, "durationS": 1.0, "previewUrl": preview_url, **clip}],
+        }
+    )
+
+
+def _key(preview_url: str, **clip) -> str:
+    return stem_key(_project(preview_url, **clip), "t1", 44100, 2)
+
+
+def test_stem_key_ignores_fs_token() -> None:
+    base = "/api/freesound/sounds/1/preview?quality=lq&fmt=mp3"
+    assert _key(base) == _key(f"{base}&fs_token=abc") == _key(f"{base}&fs_token=xyz")
+    assert _key(base) == _key("/api/freesound/sounds/1/preview")
+
+
+def test_stem_key_tracks_source_and_mix() -> None:
+    base = "/api/freesound/sounds/1/preview?quality=lq&fmt=mp3"
+    assert _key(base) != _key("/api/freesound/sounds/2/preview?quality=lq&fmt=mp3")
+    assert _key(base) != _key("/api/freesound/sounds/1/preview?quality=hq&fmt=mp3")
+    assert _key(base) != _key(base, fadeInS=0.5)
+    assert _key(base) == _key(base, name="outro nome")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import os
+
+from backend.app.storage.temp_files import TempFileStore
+
+
+def _derive(store: TempFileStore, file_id: str, name: str, size: int) -> str:
+    path = store.derived_path(file_id, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    return path
+
+
+def test_derived_files_count_towards_quota(tmp_path) -> None:
+    store = TempFileStore(str(tmp_path))
+    stored = store.put("a.mp4", b"a" * 1000)
+    _derive(store, stored.file_id, "proxy.mp4", 5000)
+    _derive(store, stored.file_id, "frame.72.10.jpg", 300)
+    with open(f"{stored.path}.seek.json", "w") as f:
+        f.write("x" * 200)
+    assert store.stats()["bytes"] == 6500
+
+
+def test_eviction_frees_derived_files(tmp_path) -> None:
+    store = TempFileStore(str(tmp_path))
+    old = store.put("old.mp4", b"o" * 1000)
+    proxy = _derive(store, old.file_id, "proxy.mp4", 8000)
+    new = store.put("new.mp4", b"n" * 1000)
+    old.last_used_at = new.last_used_at - 10
+
+    assert store.evict(max_bytes=5000) == 1
+    assert store.get(old.file_id) is None
+    assert not os.path.exists(proxy)
+    assert store.get(new.file_id) is not None
+    stats = store.stats()
+    assert stats["bytes"] == 1000
+    assert stats["evicted_bytes"] == 9000
+
+
+def test_leased_file_keeps_derived_files(tmp_path) -> None:
+    store = TempFileStore(str(tmp_path))
+    stored = store.put("a.mp4", b"a" * 1000)
+    proxy = _derive(store, stored.file_id, "proxy.mp4", 8000)
+    with store.lease(stored.file_id):
+        assert store.evict(max_bytes=100) == 0
+    assert os.path.exists(proxy)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.app.services.video_motion import (
+    extract_roi_features,
+    extract_roi_shard,
+    frame_range,
+    merge_features,
+    plan_shards,
+)
+
+
+ROIS = [(0.0, 0.0, 1.0, 1.0), (0.0, 0.3, 0.5, 0.5)]
+
+
+def test_extract_roi_features_reports_progress(moving_square_clip: str) -> None:
+    seen: list[tuple[int, int]] = []
+    features = extract_roi_features(moving_square_clip, 0.0, None, ROIS, progress=lambda d, t: seen.append((d, t)))
+    _fps, start, end = frame_range(moving_square_clip, 0.0, None)
+    assert len(features) == len(ROIS)
+    assert seen[0] == (0, end - start)
+    assert seen[-1] == (end - start, end - start)
+
+
+@pytest.mark.parametrize("scorer", ["frame_diff", "farneback"])
+def test_shards_merge_to_serial_pass(moving_square_clip: str, scorer: str) -> None:
+    serial = extract_roi_features(moving_square_clip, 0.0, None, ROIS, scorer=scorer)
+    _fps, start, end = frame_range(moving_square_clip, 0.0, None)
+    shards = plan_shards(start, end, 3, 10)
+    assert len(shards) == 3
+    parts = [extract_roi_shard(moving_square_clip, start, first, stop, ROIS, scorer=scorer) for first, stop in shards]
+    for r in range(len(ROIS)):
+        merged = merge_features([part[r] for part in parts])
+        for name in ("times", "diff", "flow", "cell"):
+            np.testing.assert_allclose(getattr(merged, name), getattr(serial[r], name))
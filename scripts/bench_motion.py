@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.app.services.motion_scorers import SCORERS  # noqa: E402
+from backend.app.services.video_motion import (  # noqa: E402
+    COARSE_FINE_MODEL,
+    analyze_motion_events,
+    extract_motion_features,
+)
+
+
+def _timed(video: str, model: str, args: argparse.Namespace) -> tuple[float, list]:
+    t0 = time.perf_counter()
+    events = analyze_motion_events(
+        video,
+        args.start,
+        args.duration,
+        args.max_events,
+        model=model,
+        frame_analysis=not args.no_frame_analysis,
+        scorer=args.scorer,
+    )
+    return time.perf_counter() - t0, events
+
+
+def _bench_scorers(args: argparse.Namespace) -> int:
+    names = list(SCORERS) if args.scorers == "all" else [n.strip() for n in args.scorers.split(",") if n.strip()]
+    print("scorer       quadros   segundos   quadros/s")
+    for name in names:
+        t0 = time.perf_counter()
+        features = extract_motion_features(args.video, args.start, args.duration, scorer=name)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:<12} {features.frames:7d} {elapsed:10.2f} {features.frames / max(elapsed, 1e-9):11.1f}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compara o modelo coarse_fine com o modelo padrão, ou a velocidade de cada scorer.")
+    parser.add_argument("video")
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, default=None)
+    parser.add_argument("--max-events", type=int, default=12)
+    parser.add_argument("--tolerance", type=float, default=None, help="segundos (padrão: 1 quadro)")
+    parser.add_argument("--no-frame-analysis", action="store_true")
+    parser.add_argument("--scorer", default=None, help=f"um de: {', '.join(SCORERS)}")
+    parser.add_argument("--scorers", default=None, help="mede só a extração: lista separada por vírgula ou 'all'")
+    args = parser.parse_args()
+    if args.scorers:
+        return _bench_scorers(args)
+
+    t_ref, ref = _timed(args.video, "default", args)
+    t_cf, cf = _timed(args.video, COARSE_FINE_MODEL, args)
+
+    import cv2
+
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    tol = args.tolerance if args.tolerance is not None else 1.0 / fps + 1e-6
+
+    matched = 0
+    offsets: list[float] = []
+    for ev in ref:
+        nearest = min((abs(ev.t_s - other.t_s) for other in cf), default=None)
+        if nearest is not None:
+            offsets.append(nearest)
+            if nearest <= tol:
+                matched += 1
+
+    print(f"default:     {t_ref:8.2f}s  {len(ref)} eventos")
+    print(f"coarse_fine: {t_cf:8.2f}s  {len(cf)} eventos")
+    print(f"aceleração:  {t_ref / max(t_cf, 1e-9):8.1f}x")
+    print(f"eventos iguais (±{tol * 1000:.0f} ms): {matched}/{len(ref)}")
+    if offsets:
+        print(f"distância média ao evento mais próximo: {sum(offsets) / len(offsets) * 1000:.1f} ms")
+    print()
+    print("   default t_s | coarse_fine t_s")
+    for i in range(max(len(ref), len(cf))):
+        a = f"{ref[i].t_s:14.3f}" if i < len(ref) else " " * 14
+        b = f"{cf[i].t_s:15.3f}" if i < len(cf) else ""
+        print(f"{a} | {b}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,6 +16,14 @@ export async function apiGet(path, params = {}) {
   return res.json();
 }
 
+export async function apiGetBinary(path, params = {}) {
+  const url = new URL(path, window.location.origin);
+  for (const [k, v] of Object.entries(params)) url.searchParams.set(k, String(v));
+  const res = await fetch(url, { headers: freesoundHeaders() });
+  if (!res.ok) throw new Error(await safeError(res));
+  return { buffer: await res.arrayBuffer(), headers: res.headers };
+}
+
 export async function apiPostJson(path, body) {
   const res = await fetch(path, {
     method: "POST",
@@ -34,6 +42,95 @@ export async function apiPostFile(path, file, fieldName = "file") {
   return res.json();
 }
 
+export async function apiPostEventStream(path, body, { onEvent } = {}) {
+  const res = await fetch(path, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "text/event-stream", ...freesoundHeaders() },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok) throw new Error(await safeError(res));
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let result = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) >= 0) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = "message";
+      const data = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+      }
+      if (!data.length) continue;
+      const payload = JSON.parse(data.join("\n"));
+      if (event === "error") throw new Error(payload.detail || "Falha na análise.");
+      if (event === "result") result = payload;
+      onEvent?.(event, payload);
+    }
+    if (done) break;
+  }
+  if (!result) throw new Error("Conexão encerrada antes do resultado.");
+  return result;
+}
+
+async function putChunkWithRetry(url, blob, retries) {
+  let lastErr = null;
+  for (let attempt = 0; attempt <= retries; attempt++) {
+    try {
+      const res = await fetch(url, { method: "PUT", headers: { "Content-Type": "application/octet-stream" }, body: blob });
+      if (res.ok) return res.json();
+      lastErr = new Error(await safeError(res));
+      if (res.status === 404) break;
+    } catch (e) {
+      lastErr = e;
+    }
+    await new Promise((r) => setTimeout(r, Math.min(8000, 500 * 2 ** attempt)));
+  }
+  throw lastErr || new Error("Falha ao enviar chunk.");
+}
+
+export async function apiUploadResumable(basePath, file, { concurrency = 4, retries = 5, onProgress } = {}) {
+  const status = await apiPostJson(basePath, { filename: file.name, size_bytes: file.size });
+  const uploadId = status.upload_id;
+  const chunkSize = status.chunk_size;
+  const total = status.total_chunks;
+
+  for (let round = 0; round <= retries; round++) {
+    const current = await apiGet(`${basePath}/${encodeURIComponent(uploadId)}`);
+    const have = new Set(current.received_chunks || []);
+    const missing = [];
+    for (let i = 0; i < total; i++) if (!have.has(i)) missing.push(i);
+    if (!missing.length) break;
+
+    let done = have.size;
+    let failed = 0;
+    const queue = missing.slice();
+    async function worker() {
+      while (queue.length) {
+        const i = queue.shift();
+        const blob = file.slice(i * chunkSize, Math.min(file.size, (i + 1) * chunkSize));
+        try {
+          await putChunkWithRetry(`${basePath}/${encodeURIComponent(uploadId)}/chunks/${i}`, blob, retries);
+          done += 1;
+          if (onProgress) onProgress({ done, total });
+        } catch {
+          failed += 1;
+        }
+      }
+    }
+    await Promise.all(Array.from({ length: Math.max(1, Math.min(concurrency, missing.length)) }, worker));
+    if (!failed) break;
+  }
+
+  return apiPostJson(`${basePath}/${encodeURIComponent(uploadId)}/finalize`, {});
+}
+
 function buildHeaders() {
   const token = window.localStorage.getItem("audioEditor.freesound.token") || "";
   const headers = {};
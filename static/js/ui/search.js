@@ -1,4 +1,4 @@
-import { apiGet } from "../api/client.js";
+import { apiGet, apiPostJson } from "../api/client.js";
 import { el, qs, toast } from "../utils/dom.js";
 
 function previewEndpointUrl(soundId, { quality = "lq", fmt = "mp3" } = {}) {
@@ -40,11 +40,18 @@ export function createSearchPanel({ statusEl }) {
       nextPage += 1;
       toast(statusEl, `${data.count} resultados (mostrando ${Math.min(data.count, (nextPage - 1) * 18)}).`);
       renderResults(data.results || [], { append: true, showMore: canLoadMore });
+      prefetchPreviews(data.results || []);
     } catch (e) {
       toast(statusEl, `Erro: ${String(e.message || e)}`);
     }
   }
 
+  function prefetchPreviews(items) {
+    const soundIds = items.map((s) => s.id).filter((id) => id != null);
+    if (!soundIds.length) return;
+    apiPostJson("/api/freesound/prefetch", { sound_ids: soundIds, quality: "lq", fmt: "mp3" }).catch(() => {});
+  }
+
   function renderResults(items, { append, showMore }) {
     if (!append) resultsRoot.textContent = "";
     const moreOld = resultsRoot.querySelector("[data-role='showMore']");
@@ -227,11 +227,8 @@ async function renderOfflineBuffer({ state, onlyTrackId = null, sampleRate, chan
 }
 
 async function postWavToMp3({ wavBlob, bitrateKbps }) {
-  const fd = new FormData();
-  const file = new File([wavBlob], "mixdown.wav", { type: "audio/wav" });
-  fd.append("file", file, file.name);
   const url = `/api/export/mp3?bitrate_kbps=${encodeURIComponent(String(bitrateKbps))}`;
-  const res = await fetch(url, { method: "POST", body: fd });
+  const res = await fetch(url, { method: "POST", headers: { "Content-Type": "audio/wav" }, body: wavBlob });
   if (!res.ok) {
     let msg = `${res.status} ${res.statusText}`;
     try {
@@ -243,6 +240,42 @@ async function postWavToMp3({ wavBlob, bitrateKbps }) {
   return res.arrayBuffer();
 }
 
+function exportProject(state) {
+  return {
+    tracks: state.tracks || [],
+    clips: (state.clips || []).map(({ waveformPeaks, ...clip }) => clip),
+    mix: state.mix || {},
+  };
+}
+
+async function renderOnServer({ state, trackId = null, fmt, bitrateKbps, sampleRate, channels, normalize }) {
+  const headers = { "Content-Type": "application/json" };
+  const token = (window.localStorage.getItem(LS.token) || "").trim();
+  if (token) headers["X-Freesound-Token"] = token;
+  const res = await fetch("/api/export/render", {
+    method: "POST",
+    headers,
+    body: JSON.stringify({
+      project: exportProject(state),
+      track_id: trackId,
+      fmt,
+      bitrate_kbps: bitrateKbps,
+      sample_rate: sampleRate,
+      channels,
+      normalize,
+    }),
+  });
+  if (!res.ok) {
+    let msg = `${res.status} ${res.statusText}`;
+    try {
+      const data = await res.json();
+      msg = data.detail || JSON.stringify(data);
+    } catch {}
+    throw new Error(msg);
+  }
+  return res.blob();
+}
+
 function downloadBlob(blob, filename) {
   const url = URL.createObjectURL(blob);
   const a = document.createElement("a");
@@ -333,6 +366,25 @@ function renderExportPanel({ root, statusEl, getState }) {
           small.textContent = "Renderizando mixdown…";
         }
 
+        const baseName = target.type === "track" ? `${project}_stem_${safeFilePart(target.track.name || "track")}` : `${project}_mixdown`;
+        const fileName = fmt === "wav" ? `${baseName}.wav` : `${baseName}_${bitrateKbps}kbps.mp3`;
+
+        try {
+          const blob = await renderOnServer({
+            state,
+            trackId: target.type === "track" ? target.track.id : null,
+            fmt,
+            bitrateKbps,
+            sampleRate,
+            channels,
+            normalize: normalize.checked,
+          });
+          downloadBlob(blob, fileName);
+          continue;
+        } catch (e) {
+          small.textContent = `Render no servidor falhou (${String(e.message || e)}); renderizando no navegador…`;
+        }
+
         const rendered = await renderOfflineBuffer({
           state,
           onlyTrackId: target.type === "track" ? target.track.id : null,
@@ -354,15 +406,13 @@ function renderExportPanel({ root, statusEl, getState }) {
         const wavAb = audioBufferToWavArrayBuffer(rendered, { scale, numChannels: channels });
         const wavBlob = new Blob([wavAb], { type: "audio/wav" });
 
-        const baseName = target.type === "track" ? `${project}_stem_${safeFilePart(target.track.name || "track")}` : `${project}_mixdown`;
-
         if (fmt === "wav") {
-          downloadBlob(wavBlob, `${baseName}.wav`);
+          downloadBlob(wavBlob, fileName);
         } else {
           small.textContent = "Convertendo para MP3…";
           const mp3Ab = await postWavToMp3({ wavBlob, bitrateKbps });
           const mp3Blob = new Blob([mp3Ab], { type: "audio/mpeg" });
-          downloadBlob(mp3Blob, `${baseName}_${bitrateKbps}kbps.mp3`);
+          downloadBlob(mp3Blob, fileName);
         }
       }
 
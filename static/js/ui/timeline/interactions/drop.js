@@ -1,5 +1,6 @@
 import { toast } from "../../../utils/dom.js";
 import { decodeAudio } from "../../../utils/audio.js";
+import { loadPeakLevel, summarizePeaks } from "../peaks.js";
 import { addClip, canPlaceClip } from "../state.js";
 import { canvasPoint, findTrackAt, timeAtX, trackIndexAtYWithScale } from "./helpers.js";
 
@@ -24,6 +25,15 @@ function computePeaks(audioBuffer, bins = 140) {
   return out.map((v) => v / max);
 }
 
+async function fetchWaveform(sourceKey, url) {
+  if (sourceKey && /^\d+$/.test(sourceKey)) {
+    const lvl = await loadPeakLevel(sourceKey).catch(() => null);
+    if (lvl) return { peaks: summarizePeaks(lvl, 160), durationS: lvl.durationS };
+  }
+  const buf = await decodeAudio(url);
+  return { peaks: computePeaks(buf, 160), durationS: Number(buf.duration || 0) };
+}
+
 async function loadWaveform({ history, sourceKey, url, requestRender, statusEl }) {
   try {
     if (!url) return;
@@ -45,9 +55,7 @@ async function loadWaveform({ history, sourceKey, url, requestRender, statusEl }
 
     if (!waveformInFlight.has(key)) {
       waveformInFlight.set(key, (async () => {
-        const buf = await decodeAudio(url);
-        const peaks = computePeaks(buf, 160);
-        const cached = { peaks, durationS: Number(buf.duration || 0) };
+        const cached = await fetchWaveform(sourceKey, url);
         waveformCache.set(key, cached);
         waveformInFlight.delete(key);
         return cached;
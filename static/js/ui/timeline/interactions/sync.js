@@ -1,10 +1,29 @@
-import { apiPostJson } from "../../../api/client.js";
+import { apiPostEventStream } from "../../../api/client.js";
 import { detectTransientTimes, decodeAudio } from "../../../utils/audio.js";
 import { el, toast } from "../../../utils/dom.js";
 import { addClip, canPlaceClip, removeSelectedClip } from "../state.js";
 import { median } from "./helpers.js";
 
-export async function syncClipToMotion({ history, statusEl, getVideoId, clipId, frameAnalysis = true, motionModel = "default", smoothWin = 5, blurKsize = 7, roiX = 0.10, roiY = 0.55, roiW = 0.80, roiH = 0.43 }) {
+function streamMotion(statusEl, body) {
+  let pct = 0;
+  let provisional = "";
+  return apiPostEventStream("/api/sync/motion/stream", body, {
+    onEvent(event, data) {
+      if (event === "progress") {
+        if (data.status === "done") return;
+        pct = Math.round(Math.max(0, Math.min(1, Number(data.progress || 0))) * 100);
+      } else if (event === "events") {
+        const n = (data.events || []).length;
+        provisional = ` · ${n} eventos provisórios até ${Number(data.until_s || 0).toFixed(1)}s`;
+      } else {
+        return;
+      }
+      toast(statusEl, `Analisando movimento… ${pct}%${provisional}`);
+    },
+  });
+}
+
+export async function syncClipToMotion({ history, statusEl, getVideoId, clipId, frameAnalysis = true, motionModel = "default", motionScorer = "", motionSource = "video", smoothWin = 5, blurKsize = 7, roiX = 0.10, roiY = 0.55, roiW = 0.80, roiH = 0.43 }) {
   const st = history.get();
   const clip = st.clips.find((c) => c.id === clipId);
   const videoId = getVideoId();
@@ -16,13 +35,15 @@ export async function syncClipToMotion({ history, statusEl, getVideoId, clipId,
   toast(statusEl, "Sincronizando por movimento…");
 
   try {
-    const motion = await apiPostJson("/api/sync/motion", {
+    const motion = await streamMotion(statusEl, {
       video_id: videoId,
       start_s: clip.startS,
       duration_s: clip.durationS,
       max_events: 12,
       frame_analysis: Boolean(frameAnalysis),
       model: String(motionModel || "default"),
+      scorer: motionScorer ? String(motionScorer) : null,
+      source: String(motionSource || "video"),
       smooth_win: Math.max(1, Number(smoothWin || 5)),
       blur_ksize: Math.max(1, Number(blurKsize || 7)),
       roi_x: Math.max(0, Math.min(1, Number(roiX || 0.10))),
@@ -137,7 +158,7 @@ function findActiveWindow({ env, hopS, durationS, tAbs, threshold, maxLeftS = 0.
   return { startS, endS };
 }
 
-export async function syncClipSegmented({ history, statusEl, getVideoId, clipId, repeatIfFew = true, frameAnalysis = true, motionModel = "default", smoothWin = 5, blurKsize = 7, roiX = 0.10, roiY = 0.55, roiW = 0.80, roiH = 0.43 }) {
+export async function syncClipSegmented({ history, statusEl, getVideoId, clipId, repeatIfFew = true, frameAnalysis = true, motionModel = "default", motionScorer = "", motionSource = "video", smoothWin = 5, blurKsize = 7, roiX = 0.10, roiY = 0.55, roiW = 0.80, roiH = 0.43 }) {
   const st = history.get();
   const clip = st.clips.find((c) => c.id === clipId);
   const videoId = getVideoId();
@@ -149,13 +170,15 @@ export async function syncClipSegmented({ history, statusEl, getVideoId, clipId,
   toast(statusEl, "Sincronizando em segmentos…");
 
   try {
-    const motion = await apiPostJson("/api/sync/motion", {
+    const motion = await streamMotion(statusEl, {
       video_id: videoId,
       start_s: clip.startS,
       duration_s: clip.durationS,
       max_events: 20,
       frame_analysis: Boolean(frameAnalysis),
       model: String(motionModel || "default"),
+      scorer: motionScorer ? String(motionScorer) : null,
+      source: String(motionSource || "video"),
       smooth_win: Math.max(1, Number(smoothWin || 5)),
       blur_ksize: Math.max(1, Number(blurKsize || 7)),
       roi_x: Math.max(0, Math.min(1, Number(roiX || 0.10))),
@@ -273,7 +296,7 @@ export async function syncClipSegmented({ history, statusEl, getVideoId, clipId,
   }
 }
 
-export async function syncClipTimeAdjust({ history, statusEl, getVideoId, clipId, frameAnalysis = true, motionModel = "default", smoothWin = 5, blurKsize = 7, roiX = 0.10, roiY = 0.55, roiW = 0.80, roiH = 0.43 }) {
+export async function syncClipTimeAdjust({ history, statusEl, getVideoId, clipId, frameAnalysis = true, motionModel = "default", motionScorer = "", motionSource = "video", smoothWin = 5, blurKsize = 7, roiX = 0.10, roiY = 0.55, roiW = 0.80, roiH = 0.43 }) {
   const st = history.get();
   const clip = st.clips.find((c) => c.id === clipId);
   const videoId = getVideoId();
@@ -283,13 +306,15 @@ export async function syncClipTimeAdjust({ history, statusEl, getVideoId, clipId
   }
   toast(statusEl, "Ajustando tempo dinamicamente…");
   try {
-    const motion = await apiPostJson("/api/sync/motion", {
+    const motion = await streamMotion(statusEl, {
       video_id: videoId,
       start_s: clip.startS,
       duration_s: clip.durationS,
       max_events: 20,
       frame_analysis: Boolean(frameAnalysis),
       model: String(motionModel || "default"),
+      scorer: motionScorer ? String(motionScorer) : null,
+      source: String(motionSource || "video"),
       smooth_win: Math.max(1, Number(smoothWin || 5)),
       blur_ksize: Math.max(1, Number(blurKsize || 7)),
       roi_x: Math.max(0, Math.min(1, Number(roiX || 0.10))),
@@ -303,7 +328,7 @@ export async function syncClipTimeAdjust({ history, statusEl, getVideoId, clipId
     const moves = (motion.events || []).map((e) => e.t_s);
     const n = Math.min(trans.length, moves.length);
     if (n < 2) {
-      await syncClipToMotion({ history, statusEl, getVideoId, clipId, frameAnalysis, motionModel, smoothWin, blurKsize, roiX, roiY, roiW, roiH });
+      await syncClipToMotion({ history, statusEl, getVideoId, clipId, frameAnalysis, motionModel, motionScorer, motionSource, smoothWin, blurKsize, roiX, roiY, roiW, roiH });
       return;
     }
     const localTrans = [];
@@ -312,7 +337,7 @@ export async function syncClipTimeAdjust({ history, statusEl, getVideoId, clipId
     for (const t of trans) if (t >= startOff && t <= endOff) localTrans.push(t - startOff);
     const m = Math.min(localTrans.length, moves.length);
     if (m < 2) {
-      await syncClipToMotion({ history, statusEl, getVideoId, clipId, frameAnalysis, motionModel, smoothWin, blurKsize, roiX, roiY, roiW, roiH });
+      await syncClipToMotion({ history, statusEl, getVideoId, clipId, frameAnalysis, motionModel, motionScorer, motionSource, smoothWin, blurKsize, roiX, roiY, roiW, roiH });
       return;
     }
     const envData = computeEnvelope(buf);
@@ -413,6 +438,25 @@ export function openSyncModal({ history, statusEl, getVideoId, audioEngine }) {
       el("option", { value: "default", text: "Padrão" }),
       el("option", { value: "high", text: "Alta precisão" }),
       el("option", { value: "fast", text: "Rápido" }),
+      el("option", { value: "coarse_fine", text: "Vídeos longos (varredura rápida + refinamento)" }),
+    ]),
+  ]);
+  const rowScorer = el("div", { class: "formRow" }, [
+    el("div", { class: "formLabel", text: "Medida de movimento" }),
+    el("select", { id: "motionScorer" }, [
+      el("option", { value: "", text: "Automática" }),
+      el("option", { value: "farneback", text: "Fluxo óptico denso (Farneback)" }),
+      el("option", { value: "lk", text: "Pontos rastreados (Lucas-Kanade, rápido)" }),
+      el("option", { value: "mog2", text: "Subtração de fundo (MOG2, rápido)" }),
+      el("option", { value: "frame_diff", text: "Diferença de quadros (mais rápido)" }),
+    ]),
+  ]);
+  const rowSource = el("div", { class: "formRow" }, [
+    el("div", { class: "formLabel", text: "Fonte dos eventos" }),
+    el("select", { id: "motionSource" }, [
+      el("option", { value: "video", text: "Movimento da imagem" }),
+      el("option", { value: "audio", text: "Áudio do vídeo (transientes, rápido)" }),
+      el("option", { value: "both", text: "Imagem + áudio" }),
     ]),
   ]);
   const rowSmooth = el("div", { class: "formRow" }, [
@@ -431,8 +475,10 @@ export function openSyncModal({ history, statusEl, getVideoId, audioEngine }) {
     statusLine.textContent = "Sincronizando clip inteiro…";
     const frameAnalysis = document.getElementById("frameAnalysis")?.checked ?? true;
     const motionModel = document.getElementById("motionModel")?.value || "default";
+    const motionScorer = document.getElementById("motionScorer")?.value || "";
+    const motionSource = document.getElementById("motionSource")?.value || "video";
     const smoothWin = Number(document.getElementById("smoothWin")?.value || 5);
-    await syncClipToMotion({ history, statusEl, getVideoId, clipId: clip.id, frameAnalysis, motionModel, smoothWin });
+    await syncClipToMotion({ history, statusEl, getVideoId, clipId: clip.id, frameAnalysis, motionModel, motionScorer, motionSource, smoothWin });
     statusLine.textContent = "Concluído.";
   };
 
@@ -440,8 +486,10 @@ export function openSyncModal({ history, statusEl, getVideoId, audioEngine }) {
     statusLine.textContent = "Sincronizando em segmentos…";
     const frameAnalysis = document.getElementById("frameAnalysis")?.checked ?? true;
     const motionModel = document.getElementById("motionModel")?.value || "default";
+    const motionScorer = document.getElementById("motionScorer")?.value || "";
+    const motionSource = document.getElementById("motionSource")?.value || "video";
     const smoothWin = Number(document.getElementById("smoothWin")?.value || 5);
-    await syncClipSegmented({ history, statusEl, getVideoId, clipId: clip.id, repeatIfFew: false, frameAnalysis, motionModel, smoothWin });
+    await syncClipSegmented({ history, statusEl, getVideoId, clipId: clip.id, repeatIfFew: false, frameAnalysis, motionModel, motionScorer, motionSource, smoothWin });
     statusLine.textContent = "Concluído.";
   };
 
@@ -449,8 +497,10 @@ export function openSyncModal({ history, statusEl, getVideoId, audioEngine }) {
     statusLine.textContent = "Ajustando tempo…";
     const frameAnalysis = document.getElementById("frameAnalysis")?.checked ?? true;
     const motionModel = document.getElementById("motionModel")?.value || "default";
+    const motionScorer = document.getElementById("motionScorer")?.value || "";
+    const motionSource = document.getElementById("motionSource")?.value || "video";
     const smoothWin = Number(document.getElementById("smoothWin")?.value || 5);
-    await syncClipTimeAdjust({ history, statusEl, getVideoId, clipId: clip.id, frameAnalysis, motionModel, smoothWin });
+    await syncClipTimeAdjust({ history, statusEl, getVideoId, clipId: clip.id, frameAnalysis, motionModel, motionScorer, motionSource, smoothWin });
     statusLine.textContent = "Concluído.";
   };
 
@@ -458,8 +508,10 @@ export function openSyncModal({ history, statusEl, getVideoId, audioEngine }) {
     statusLine.textContent = "Recalculando…";
     const frameAnalysis = document.getElementById("frameAnalysis")?.checked ?? true;
     const motionModel = document.getElementById("motionModel")?.value || "default";
+    const motionScorer = document.getElementById("motionScorer")?.value || "";
+    const motionSource = document.getElementById("motionSource")?.value || "video";
     const smoothWin = Number(document.getElementById("smoothWin")?.value || 5);
-    await syncClipSegmented({ history, statusEl, getVideoId, clipId: clip.id, repeatIfFew: false, frameAnalysis, motionModel, smoothWin });
+    await syncClipSegmented({ history, statusEl, getVideoId, clipId: clip.id, repeatIfFew: false, frameAnalysis, motionModel, motionScorer, motionSource, smoothWin });
     statusLine.textContent = "Concluído.";
   };
 
@@ -467,8 +519,10 @@ export function openSyncModal({ history, statusEl, getVideoId, audioEngine }) {
     statusLine.textContent = "Repetindo cortes para encaixar…";
     const frameAnalysis = document.getElementById("frameAnalysis")?.checked ?? true;
     const motionModel = document.getElementById("motionModel")?.value || "default";
+    const motionScorer = document.getElementById("motionScorer")?.value || "";
+    const motionSource = document.getElementById("motionSource")?.value || "video";
     const smoothWin = Number(document.getElementById("smoothWin")?.value || 5);
-    await syncClipSegmented({ history, statusEl, getVideoId, clipId: clip.id, repeatIfFew: true, frameAnalysis, motionModel, smoothWin });
+    await syncClipSegmented({ history, statusEl, getVideoId, clipId: clip.id, repeatIfFew: true, frameAnalysis, motionModel, motionScorer, motionSource, smoothWin });
     statusLine.textContent = "Concluído.";
   };
 
@@ -489,6 +543,8 @@ export function openSyncModal({ history, statusEl, getVideoId, audioEngine }) {
     precision,
     rowFrame,
     rowModel,
+    rowScorer,
+    rowSource,
     rowSmooth,
     el("div", { class: "modalSectionTitle", text: "Status" }),
     statusLine,
@@ -0,0 +1,80 @@
+import { apiGetBinary } from "../../api/client.js";
+
+const pyramids = new Map();
+
+function entry(soundId) {
+  const key = String(soundId);
+  let e = pyramids.get(key);
+  if (!e) {
+    e = { meta: null, levels: new Map(), inFlight: new Map(), failed: false };
+    pyramids.set(key, e);
+  }
+  return e;
+}
+
+function parseLevel(buffer, headers) {
+  const data = new Int8Array(buffer);
+  let peak = 1;
+  for (let i = 0; i < data.length; i++) peak = Math.max(peak, Math.abs(data[i]));
+  return {
+    level: Number(headers.get("x-peaks-level") || 0),
+    levels: Number(headers.get("x-peaks-levels") || 1),
+    sampleRate: Number(headers.get("x-peaks-sample-rate") || 22050),
+    samplesPerBin: Number(headers.get("x-peaks-samples-per-bin") || 1),
+    durationS: Number(headers.get("x-peaks-duration") || 0),
+    data,
+    peak,
+  };
+}
+
+export function loadPeakLevel(soundId, level = null) {
+  const e = entry(soundId);
+  const key = level == null ? "top" : String(level);
+  if (level != null && e.levels.has(level)) return Promise.resolve(e.levels.get(level));
+  if (!e.inFlight.has(key)) {
+    const params = level == null ? {} : { level };
+    e.inFlight.set(key, apiGetBinary(`/api/freesound/sounds/${encodeURIComponent(soundId)}/peaks`, params)
+      .then(({ buffer, headers }) => {
+        const lvl = parseLevel(buffer, headers);
+        e.levels.set(lvl.level, lvl);
+        if (!e.meta) e.meta = { levels: lvl.levels, sampleRate: lvl.sampleRate, baseSamplesPerBin: lvl.samplesPerBin >> lvl.level, durationS: lvl.durationS };
+        e.inFlight.delete(key);
+        return lvl;
+      })
+      .catch((err) => {
+        e.inFlight.delete(key);
+        e.failed = true;
+        throw err;
+      }));
+  }
+  return e.inFlight.get(key);
+}
+
+export function peaksForZoom(soundId, pixelsPerSecond, onLoad) {
+  const e = pyramids.get(String(soundId));
+  if (!e || !e.meta) return null;
+  const { levels, baseSamplesPerBin, sampleRate } = e.meta;
+  const samplesPerPixel = sampleRate / Math.max(1e-6, pixelsPerSecond);
+  const want = Math.max(0, Math.min(levels - 1, Math.floor(Math.log2(Math.max(1, samplesPerPixel / baseSamplesPerBin)))));
+  if (!e.levels.has(want) && !e.failed && onLoad) {
+    loadPeakLevel(soundId, want).then(onLoad, () => {});
+  }
+  if (e.levels.has(want)) return e.levels.get(want);
+  let best = null;
+  for (const lvl of e.levels.values()) {
+    if (!best || Math.abs(lvl.level - want) < Math.abs(best.level - want)) best = lvl;
+  }
+  return best;
+}
+
+export function summarizePeaks(lvl, bins = 160) {
+  const total = lvl.data.length / 2;
+  const out = [];
+  const step = Math.max(1, Math.ceil(total / bins));
+  for (let i = 0; i < total; i += step) {
+    let m = 0;
+    for (let k = i; k < Math.min(total, i + step); k++) m = Math.max(m, Math.abs(lvl.data[2 * k]), Math.abs(lvl.data[2 * k + 1]));
+    out.push(m / lvl.peak);
+  }
+  return out;
+}
@@ -1,5 +1,6 @@
 import { formatTime } from "../../utils/dom.js";
 import { UI, canvasHeight, timeToX, trackHeight, trackTop } from "./geometry.js";
+import { peaksForZoom } from "./peaks.js";
 
 function drawGrid(ctx, width, height, pixelsPerSecond) {
   ctx.save();
@@ -65,7 +66,30 @@ function clipRect(clip, trackIndex, pixelsPerSecond, trackScale) {
   return { x, y, w, h: trackHeight(trackScale) };
 }
 
-function drawClip(ctx, rect, clip, selected) {
+function drawPeakRange(ctx, lvl, segX0, segX1, srcOff, visDur, mid, amp) {
+  const total = lvl.data.length / 2;
+  const binsPerS = lvl.sampleRate / lvl.samplesPerBin;
+  const width = Math.max(1, Math.round(segX1 - segX0));
+  const scale = amp / lvl.peak;
+  for (let px = 0; px < width; px++) {
+    const t0 = srcOff + (px / width) * visDur;
+    const t1 = srcOff + ((px + 1) / width) * visDur;
+    const b0 = Math.max(0, Math.floor(t0 * binsPerS));
+    const b1 = Math.min(total, Math.max(b0 + 1, Math.ceil(t1 * binsPerS)));
+    if (b0 >= total) break;
+    let lo = 127;
+    let hi = -127;
+    for (let b = b0; b < b1; b++) {
+      lo = Math.min(lo, lvl.data[2 * b]);
+      hi = Math.max(hi, lvl.data[2 * b + 1]);
+    }
+    const x = segX0 + px + 0.5;
+    ctx.moveTo(x, mid - hi * scale);
+    ctx.lineTo(x, mid - lo * scale + 1);
+  }
+}
+
+function drawClip(ctx, rect, clip, selected, onAsset) {
   const r = 12;
   ctx.save();
   ctx.beginPath();
@@ -85,7 +109,10 @@ function drawClip(ctx, rect, clip, selected) {
   ctx.stroke();
 
   const peaks = clip.waveformPeaks;
-  if (Array.isArray(peaks) && peaks.length) {
+  const soundId = String(clip.source?.type) === "freesound" && clip.source?.id != null ? clip.source.id : null;
+  const pxPerSrcS = (rect.w - 20) / Math.max(0.001, Number(clip.durationS || 0));
+  const pyramid = soundId != null ? peaksForZoom(soundId, pxPerSrcS, onAsset) : null;
+  if (pyramid || (Array.isArray(peaks) && peaks.length)) {
     const x0 = rect.x + 10;
     const x1 = rect.x + rect.w - 10;
     const mid = rect.y + rect.h / 2;
@@ -99,6 +126,10 @@ function drawClip(ctx, rect, clip, selected) {
     const clipDur = Math.max(0.001, Number(clip.durationS || 0));
     const spanW = x1 - x0;
     const drawSeg = (segX0, segX1, srcOff, visDur) => {
+      if (pyramid) {
+        drawPeakRange(ctx, pyramid, segX0, segX1, srcOff, visDur, mid, amp);
+        return;
+      }
       let segLen = Math.max(2, Math.round((visDur / srcDur) * total));
       segLen = Math.min(total, segLen);
       const startIdx = Math.max(0, Math.min(total - 1, Math.round((srcOff / srcDur) * total)));
@@ -216,7 +247,7 @@ function drawPlayhead(ctx, state, height, pixelsPerSecond) {
   ctx.restore();
 }
 
-export function renderTimeline(canvas, state, { widthPx, pixelsPerSecond }) {
+export function renderTimeline(canvas, state, { widthPx, pixelsPerSecond, onAsset }) {
   const dpr = window.devicePixelRatio || 1;
   const trackScale = Number(state.trackScale || 1);
   const height = canvasHeight(state.tracks.length, trackScale);
@@ -236,7 +267,7 @@ export function renderTimeline(canvas, state, { widthPx, pixelsPerSecond }) {
     for (const clip of clips) {
       const rect = clipRect(clip, ti, pixelsPerSecond, trackScale);
       const selected = (Array.isArray(state.selection.clipIds) && state.selection.clipIds.includes(clip.id)) || state.selection.clipId === clip.id;
-      drawClip(ctx, rect, clip, selected);
+      drawClip(ctx, rect, clip, selected, onAsset);
       drawFadeHandles(ctx, rect, clip, pixelsPerSecond);
       if (state.selection.clipId === clip.id) drawAutomation(ctx, rect, clip, state.automationMode);
     }
@@ -49,7 +49,7 @@ export function createTimeline({ timelineRoot, statusEl, timeEl, video, getVideo
     for (const c of st.clips) maxEndS = Math.max(maxEndS, c.startS + c.durationS);
     const widthPx = Math.max(viewWidth, UI.GUTTER_W + maxEndS * st.pixelsPerSecond + 240);
     wrap.style.width = `${Math.ceil(widthPx)}px`;
-    renderTimeline(canvas, st, { widthPx, pixelsPerSecond: st.pixelsPerSecond });
+    renderTimeline(canvas, st, { widthPx, pixelsPerSecond: st.pixelsPerSecond, onAsset: requestRender });
     timeEl.textContent = formatTime(st.playheadS);
   }
 
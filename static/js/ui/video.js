@@ -1,5 +1,7 @@
 import { qs, toast } from "../utils/dom.js";
-import { apiPostFile } from "../api/client.js";
+import { apiPostFile, apiUploadResumable } from "../api/client.js";
+
+const RESUMABLE_MIN_BYTES = 32 * 1024 * 1024;
 
 export function createVideoController({ statusEl }) {
   const video = qs("#video");
@@ -24,7 +26,11 @@ export function createVideoController({ statusEl }) {
 
     try {
       toast(statusEl, "Enviando vídeo para sincronização…");
-      const data = await apiPostFile("/api/sync/video/upload", file, "file");
+      const data = file.size >= RESUMABLE_MIN_BYTES
+        ? await apiUploadResumable("/api/sync/video/uploads", file, {
+          onProgress: ({ done, total }) => toast(statusEl, `Enviando vídeo para sincronização… ${Math.round((done / total) * 100)}%`),
+        })
+        : await apiPostFile("/api/sync/video/upload", file, "file");
       videoId = data.video_id;
       toast(statusEl, "Vídeo pronto.");
     } catch (e) {